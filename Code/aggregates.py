@@ -0,0 +1,312 @@
+"""
+MATERIALIZED SUMMARY TABLES
+IISER TVM Mess DWBI Project – Varsha 2025
+
+---------------------------------------------------
+WHY
+---------------------------------------------------
+fact_expense is the only fact table, so every report re-aggregates the
+raw payments: O(transactions) per run. The summary tables below are kept
+next to it in mess_dw and make report queries O(days) or O(vendors).
+
+    agg_daily_mess_group    : SUM / COUNT per (date, mess unit)
+                              -> month scripts (mess_analysis)
+    agg_vendor_mess_total   : SUM / COUNT per (vendor, mess unit)
+                              -> exactly the edge list network_analysis needs
+
+agg_daily_mess_group is keyed by mess unit, not mess group: the grouping
+is applied on read (dim_mess_unit.mess_group, see mess_units.py), so
+regrouping never invalidates the table. The per-vendor / per-month
+Benford screening needs digit counts, not sums, so it is pushed down
+separately (query_builder.grouped_digit_query) and has no summary table.
+
+---------------------------------------------------
+INCREMENTAL REFRESH
+---------------------------------------------------
+agg_watermark stores, per summary table, the largest fact_expense
+expense_id already folded in. A refresh aggregates only the rows in
+(watermark, MAX(expense_id)] and adds them to the existing totals with
+INSERT ... ON DUPLICATE KEY UPDATE, then moves the watermark, all in one
+transaction. Like the snapshot, this assumes fact_expense is
+append-only; after corrections run with rebuild=True
+(python data_preprocessing.py --full).
+
+Only rows that pass the cleaning rules (query_builder.CLEAN_PREDICATES,
+as in the snapshot) are folded in; tables built before that rule need
+one rebuild.
+
+A table is fresh when its watermark equals MAX(fact_expense.expense_id);
+readers fall back to the fact table otherwise.
+"""
+
+import pandas as pd
+
+from instrumentation import traced
+import query_builder
+from query_builder import build_select
+
+# -------------------------------------------------
+# DDL (also documented in data_preprocessing.py)
+# -------------------------------------------------
+AGG_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS agg_daily_mess_group (
+        date_id INT NOT NULL,
+        mess_unit_id INT NOT NULL,
+        total_amount DECIMAL(14,2) NOT NULL,
+        n_transactions INT NOT NULL,
+        PRIMARY KEY (date_id, mess_unit_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS agg_vendor_mess_total (
+        vendor_id INT NOT NULL,
+        mess_unit_id INT NOT NULL,
+        total_amount DECIMAL(14,2) NOT NULL,
+        n_transactions INT NOT NULL,
+        PRIMARY KEY (vendor_id, mess_unit_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS agg_watermark (
+        table_name VARCHAR(64) PRIMARY KEY,
+        max_expense_id INT NOT NULL
+    )
+    """
+]
+
+# table -> (key columns, key select expressions over fact_expense f)
+AGG_TABLES = {
+    "agg_daily_mess_group": (
+        ["date_id", "mess_unit_id"],
+        ["f.date_id", "f.mess_unit_id"]
+    ),
+    "agg_vendor_mess_total": (
+        ["vendor_id", "mess_unit_id"],
+        ["f.vendor_id", "f.mess_unit_id"]
+    ),
+}
+
+
+def create_tables(conn):
+    """Apply AGG_DDL (idempotent)."""
+    cur = conn.cursor()
+    for ddl in AGG_DDL:
+        cur.execute(ddl)
+    conn.commit()
+    cur.close()
+
+
+# -------------------------------------------------
+# 1. WATERMARKS
+# -------------------------------------------------
+def _scalar(conn, sql, params=()):
+    cur = conn.cursor()
+    cur.execute(sql, params)
+    row = cur.fetchone()
+    cur.close()
+    return row[0] if row else None
+
+
+def fact_watermark(conn):
+    """MAX(expense_id) of fact_expense (0 when empty)."""
+    return int(_scalar(conn, "SELECT MAX(expense_id) FROM fact_expense") or 0)
+
+
+def read_watermarks(conn):
+    """{table_name: max_expense_id}; 0 for tables never refreshed."""
+    cur = conn.cursor()
+    cur.execute("SELECT table_name, max_expense_id FROM agg_watermark")
+    stored = {name: int(wm) for name, wm in cur.fetchall()}
+    cur.close()
+    return {table: stored.get(table, 0) for table in AGG_TABLES}
+
+
+def is_fresh(conn, tables=tuple(AGG_TABLES)):
+    """True when every table in `tables` has folded in all fact rows."""
+    try:
+        watermarks = read_watermarks(conn)
+    except Exception:
+        # agg_watermark not created yet
+        return False
+    current = fact_watermark(conn)
+    return current > 0 and all(watermarks[t] == current for t in tables)
+
+
+# -------------------------------------------------
+# 2. INCREMENTAL REFRESH
+# -------------------------------------------------
+def delta_insert_sql(table):
+    """
+    INSERT ... SELECT of the fact rows in (low, high] aggregated to the
+    table's grain, added onto existing rows. Returns (sql, n_params).
+    """
+    keys, key_exprs = AGG_TABLES[table]
+    p = query_builder.PLACEHOLDER
+
+    select, params = build_select(
+        [f"{e} AS {k}" for e, k in zip(key_exprs, keys)]
+        + ["COALESCE(SUM(f.amount), 0) AS total_amount", "COUNT(f.amount) AS n_transactions"],
+        # NULL keys are dropped, as the inner joins of the fact-table
+        # queries drop them; so are the rows the cleaning rules drop
+        where=[f"f.expense_id > {p}", f"f.expense_id <= {p}"]
+              + [f"{e} IS NOT NULL" for e in key_exprs if e.startswith("f.")]
+              + query_builder.CLEAN_PREDICATES,
+        where_params=(0, 0),
+        group_by=key_exprs
+    )
+    columns = ", ".join(keys + ["total_amount", "n_transactions"])
+
+    # Derived table: MySQL does not allow the UPDATE clause to refer to a
+    # grouped SELECT directly. Both sides have total_amount and
+    # n_transactions, so every reference is qualified (unqualified ones
+    # are ERROR 1052, and VALUES() here is deprecated since 8.0.20).
+    # WHERE TRUE is a no-op that lets SQLite parse the translated upsert
+    # (backend.translate).
+    sql = (
+        f"INSERT INTO {table} ({columns})\n"
+        f"SELECT * FROM (\n{select}\n) AS delta WHERE TRUE\n"
+        "ON DUPLICATE KEY UPDATE\n"
+        f"    {table}.total_amount = {table}.total_amount + delta.total_amount,\n"
+        f"    {table}.n_transactions = {table}.n_transactions + delta.n_transactions"
+    )
+    return sql, len(params)
+
+
+def _set_watermark(cur, table, watermark):
+    p = query_builder.PLACEHOLDER
+    cur.execute(
+        # Row alias (MySQL 8.0.19+) instead of the deprecated VALUES()
+        f"INSERT INTO agg_watermark (table_name, max_expense_id) VALUES ({p}, {p}) AS new\n"
+        "ON DUPLICATE KEY UPDATE max_expense_id = new.max_expense_id",
+        (table, watermark)
+    )
+
+
+@traced("aggregates.refresh")
+def refresh(conn, rebuild=False):
+    """
+    Fold new fact rows into every summary table.
+
+    Each table is updated together with its watermark in one transaction,
+    so an interrupted refresh never double-counts. Returns
+    {table_name: rows folded in}.
+    """
+    create_tables(conn)
+    high = fact_watermark(conn)
+    watermarks = read_watermarks(conn)
+    folded = {}
+
+    cur = conn.cursor()
+    try:
+        for table in AGG_TABLES:
+            low = 0 if rebuild else watermarks[table]
+            if rebuild:
+                cur.execute(f"DELETE FROM {table}")
+            if low >= high and not rebuild:
+                folded[table] = 0
+                continue
+
+            sql, _ = delta_insert_sql(table)
+            cur.execute(sql, (low, high))
+            _set_watermark(cur, table, high)
+            conn.commit()
+
+            folded[table] = int(_scalar(
+                conn,
+                "SELECT COUNT(*) FROM fact_expense "
+                f"WHERE expense_id > {query_builder.PLACEHOLDER} "
+                f"AND expense_id <= {query_builder.PLACEHOLDER}",
+                (low, high)
+            ))
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+    return folded
+
+
+# -------------------------------------------------
+# 3. READ QUERIES
+# -------------------------------------------------
+def _date_filter(start, end):
+    p = query_builder.PLACEHOLDER
+    clauses, params = [], []
+    if start is not None:
+        clauses.append(f"d.full_date >= {p}")
+        params.append(start)
+    if end is not None:
+        clauses.append(f"d.full_date < {p}")
+        params.append(end)
+    return clauses, params
+
+
+def daily_totals_query(start=None, end=None):
+    """Same columns as query_builder.daily_mess_totals_query."""
+    clauses, params = _date_filter(start, end)
+    sql = (
+        "SELECT\n"
+        "    d.full_date,\n"
+        "    m.mess_unit_name,\n"
+        "    a.total_amount AS amount,\n"
+        "    a.n_transactions\n"
+        "FROM agg_daily_mess_group a\n"
+        "JOIN dim_date d ON a.date_id = d.date_id\n"
+        "JOIN dim_mess_unit m ON a.mess_unit_id = m.mess_unit_id"
+    )
+    if clauses:
+        sql += "\nWHERE " + "\n  AND ".join(clauses)
+    sql += "\nORDER BY d.full_date"
+    return sql, tuple(params)
+
+
+def vendor_mess_totals_query():
+    """Same columns as query_builder.vendor_mess_totals_query."""
+    sql = (
+        "SELECT\n"
+        "    v.vendor_name,\n"
+        "    m.mess_unit_name,\n"
+        "    a.total_amount\n"
+        "FROM agg_vendor_mess_total a\n"
+        "JOIN dim_vendor v ON a.vendor_id = v.vendor_id\n"
+        "JOIN dim_mess_unit m ON a.mess_unit_id = m.mess_unit_id"
+    )
+    return sql, ()
+
+
+@traced("aggregates.read_daily_totals")
+def read_daily_totals(conn, start=None, end=None):
+    """agg_daily_mess_group for [start, end), cleaned like load_daily_totals."""
+    from mess_analysis import clean_daily_totals
+
+    query, params = daily_totals_query(start, end)
+    return clean_daily_totals(pd.read_sql(query, conn, params=params))
+
+
+@traced("aggregates.read_vendor_mess_totals")
+def read_vendor_mess_totals(conn):
+    """agg_vendor_mess_total as the network_analysis edge list."""
+    query, params = vendor_mess_totals_query()
+    df = pd.read_sql(query, conn, params=params)
+    df["total_amount"] = df["total_amount"].astype(float)
+    return df
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from backend import connect
+
+    parser = argparse.ArgumentParser(description="Refresh mess_dw summary tables")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="recompute every summary table from scratch")
+    args = parser.parse_args()
+
+    conn = connect()
+
+    for table, n in refresh(conn, rebuild=args.rebuild).items():
+        print(f"{table}: {n} new fact rows folded in")
+
+    conn.close()
@@ -0,0 +1,490 @@
+"""
+DAILY EXPENSE ANOMALY DETECTION
+IISER TVM Mess DWBI Project – Varsha 2025
+
+---------------------------------------------------
+WHY
+---------------------------------------------------
+"High wastage days" used to be `daily total > monthly mean`, computed per
+calendar month. A mean is exceeded by roughly half of all days by
+construction, one spike inflates the mean it is compared against, and
+the 1st of a month is never compared with the days just before it.
+
+Each day is now scored against its own trailing history instead:
+
+    baseline : rolling median of the last WINDOW days of the same season
+    scale    : 1.4826 * rolling MAD (median absolute deviation) of them;
+               1.2533 * mean absolute deviation when the MAD is 0
+    robust_z : (amount - baseline) / scale
+    spike    : robust_z >= THRESHOLD (3.5, Iglewicz & Hoaglin)
+
+The day itself is not part of its baseline, so a spike cannot hide
+itself. Rolling mean and EWMA are reported next to it (the EWMA is the
+forecast before the day is seen). Days need MIN_PERIODS earlier days of
+their season before they are scored; days without any recorded expense
+are not observations.
+
+---------------------------------------------------
+SEASONALITY (dim_date)
+---------------------------------------------------
+Weekend days spend differently from weekdays, so every season keeps its
+own window. SEASON picks the dim_date column the history is split on:
+
+    "is_weekend" : weekdays vs weekend days (default)
+    "day_name"   : one history per weekday; needs ~7x more calendar days
+                   to fill a window, so only for multi-semester data
+    None         : one history for all days
+
+read_calendar() takes the columns from dim_date; days missing there get
+them from the date itself (Saturday / Sunday are weekend days).
+
+---------------------------------------------------
+BATCH & STREAMING
+---------------------------------------------------
+detect()         : the whole series at once, NumPy sliding windows per
+                   season (mess_analysis uses it for high_wastage)
+RollingDetector  : one day at a time. Per season a deque of the last
+                   WINDOW values, a sorted copy (bisect) for median /
+                   MAD, a running sum for the mean and the EWMA level.
+                   Sum and EWMA are O(1) per day, median / MAD O(WINDOW)
+                   with WINDOW fixed, so a series is scored in O(n)
+
+Both give the same result (verify_streaming). The detector state is a
+few hundred integers and is kept in MESS_ANOMALY_DIR between runs:
+
+    python anomaly.py [--start DATE] [--end DATE]   batch, whole warehouse
+    python anomaly.py --stream                      score the days that
+                                                    landed since last run
+    python anomaly.py --verify                      batch == streaming
+
+The newest day in the warehouse may still be receiving rows, so the
+stream only scores days before it. Like the summary tables, this
+assumes fact_expense is append-only; after corrections run --rebuild.
+"""
+
+import bisect
+import datetime
+import json
+import os
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from dataset import day_ordinal, for_display, to_dates
+from mess_units import UNKNOWN, group_lookup, map_groups
+from query_builder import PLACEHOLDER, date_range_predicate, month_bounds
+
+STATE_DIR = os.environ.get(
+    "MESS_ANOMALY_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "mess_anomaly")
+)
+STATE_FILE = "state.json"
+STATE_VERSION = 1
+
+# Earlier days of the same season in each window
+WINDOW = 14
+MIN_PERIODS = 7
+EWMA_ALPHA = 0.2
+THRESHOLD = 3.5
+SEASON = "is_weekend"
+
+# Consistency constants of MAD / mean absolute deviation for normal data
+MAD_SCALE = 1.4826
+MEANAD_SCALE = 1.2533
+
+# Calendar days of history a month needs before its first day: enough
+# for a full window of a season that occurs once a week
+LOOKBACK_DAYS = 7 * WINDOW
+
+SCORE_COLUMNS = ["n_history", "rolling_mean", "rolling_median", "rolling_mad",
+                 "ewma", "robust_z", "spike"]
+
+
+# -------------------------------------------------
+# 1. CALENDAR & DAILY SERIES
+# -------------------------------------------------
+def calendar_query(start=None, end=None):
+    """dim_date rows in [start, end) with the seasonality columns."""
+    clauses, params = [], []
+    if start is not None and end is not None:
+        clauses.append(date_range_predicate("full_date"))
+        params += [start, end]
+    elif start is not None:
+        clauses.append(f"full_date >= {PLACEHOLDER}")
+        params.append(start)
+    elif end is not None:
+        clauses.append(f"full_date < {PLACEHOLDER}")
+        params.append(end)
+    sql = "SELECT full_date, day_name, is_weekend FROM dim_date"
+    if clauses:
+        sql += "\nWHERE " + " AND ".join(clauses)
+    sql += "\nORDER BY full_date"
+    return sql, tuple(params)
+
+
+def read_calendar(conn, start=None, end=None):
+    """day, day_name, is_weekend from dim_date."""
+    query, params = calendar_query(start, end)
+    df = pd.read_sql(query, conn, params=params)
+    return pd.DataFrame({
+        "day": day_ordinal(df["full_date"]),
+        "day_name": df["day_name"].astype(str).to_numpy(),
+        "is_weekend": df["is_weekend"].astype(bool).to_numpy(),
+    })
+
+
+def calendar_from_days(days):
+    """The dim_date seasonality columns derived from day ordinals."""
+    dates = to_dates(days)
+    return pd.DataFrame({
+        "day": np.asarray(days, dtype=np.int32),
+        "day_name": dates.day_name().to_numpy(dtype=object),
+        "is_weekend": np.asarray(dates.dayofweek >= 5),
+    })
+
+
+def with_calendar(series, calendar=None):
+    """series plus day_name / is_weekend, from calendar where it has the day."""
+    derived = calendar_from_days(series["day"])
+    if calendar is not None and len(calendar):
+        known = calendar.drop_duplicates("day").set_index("day")
+        found = derived["day"].isin(known.index).to_numpy()
+        for col in ("day_name", "is_weekend"):
+            values = derived[col].to_numpy().copy()
+            values[found] = known[col].reindex(derived["day"][found]).to_numpy()
+            derived[col] = values
+    return series.assign(
+        day_name=derived["day_name"].to_numpy(),
+        is_weekend=derived["is_weekend"].to_numpy(dtype=bool),
+    )
+
+
+def daily_series(df, groups=None, drop_unknown=True):
+    """
+    Total amount_paise per day over the mess units of df (transaction
+    rows or daily aggregates), UNKNOWN units dropped as in mess_analysis.
+    """
+    if drop_unknown:
+        df = df[map_groups(df["mess_unit_name"], groups) != UNKNOWN]
+    return (
+        df.groupby("day")["amount_paise"]
+          .sum()
+          .astype(np.int64)
+          .reset_index()
+    )
+
+
+def history_bounds(year, month, lookback_days=LOOKBACK_DAYS):
+    """[start of the history a month is scored against, end of the month)."""
+    start, end = month_bounds(year, month)
+    return start - datetime.timedelta(days=lookback_days), end
+
+
+def _season_keys(series, season):
+    if season is None:
+        return np.zeros(len(series), dtype=object)
+    return series[season].to_numpy(dtype=object)
+
+
+# -------------------------------------------------
+# 2. BATCH (WHOLE SERIES)
+# -------------------------------------------------
+def _robust_z(x, median, mad, mean_ad):
+    """
+    (x - median) / robust scale. A history without any spread gives 0
+    for the same amount and +-inf for any other.
+    """
+    scale = np.where(mad > 0, MAD_SCALE * mad, MEANAD_SCALE * mean_ad)
+    diff = x - median
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(scale > 0, diff / scale, np.where(diff == 0, 0.0, np.sign(diff) * np.inf))
+
+
+def _score_season(values, window, min_periods, alpha):
+    """Trailing-window statistics for one season's values, in day order."""
+    n = len(values)
+    x = values.astype(float)
+    # Row i of the padded view is values[i - window : i], NaN-padded
+    padded = np.concatenate([np.full(window, np.nan), x])
+    history = np.lib.stride_tricks.sliding_window_view(padded, window)[:n]
+
+    n_history = np.minimum(np.arange(n), window)
+    out = {name: np.full(n, np.nan) for name in
+           ("rolling_mean", "rolling_median", "rolling_mad", "robust_z")}
+    ok = n_history >= min_periods
+    if ok.any():
+        h = history[ok]
+        mean = np.nanmean(h, axis=1)
+        median = np.nanmedian(h, axis=1)
+        mad = np.nanmedian(np.abs(h - median[:, None]), axis=1)
+        mean_ad = np.nanmean(np.abs(h - mean[:, None]), axis=1)
+        out["rolling_mean"][ok] = mean
+        out["rolling_median"][ok] = median
+        out["rolling_mad"][ok] = mad
+        out["robust_z"][ok] = _robust_z(x[ok], median, mad, mean_ad)
+
+    # Level before the day is seen: e_t = a * x_t + (1 - a) * e_{t-1}
+    out["ewma"] = pd.Series(x).ewm(alpha=alpha, adjust=False).mean().shift(1).to_numpy()
+    out["n_history"] = n_history
+    return out
+
+
+def detect(series, calendar=None, window=WINDOW, min_periods=MIN_PERIODS,
+           alpha=EWMA_ALPHA, threshold=THRESHOLD, season=SEASON):
+    """
+    Score a daily series (day, amount_paise; one row per day) against
+    its trailing same-season history. Returns the series sorted by day
+    with day_name, is_weekend and SCORE_COLUMNS; the statistics are in
+    paise, spike marks robust_z >= threshold.
+    """
+    series = with_calendar(series.sort_values("day").reset_index(drop=True), calendar)
+    keys = _season_keys(series, season)
+    values = series["amount_paise"].to_numpy()
+
+    scores = {name: np.full(len(series), np.nan) for name in SCORE_COLUMNS[:-1]}
+    for key in pd.unique(keys):
+        rows = np.flatnonzero(keys == key)
+        for name, col in _score_season(values[rows], window, min_periods, alpha).items():
+            scores[name][rows] = col
+
+    out = series.assign(**scores)
+    out["n_history"] = out["n_history"].astype(np.int64)
+    out["spike"] = out["robust_z"] >= threshold
+    return out
+
+
+def for_report(scored):
+    """detect() output in rupees with dates, for printing."""
+    out = for_display(scored)
+    for col in ("rolling_mean", "rolling_median", "rolling_mad", "ewma"):
+        out[col] = out[col] / 100.0
+    return out
+
+
+# -------------------------------------------------
+# 3. STREAMING (ONE DAY AT A TIME)
+# -------------------------------------------------
+class _SeasonWindow:
+    """The last `window` values of one season plus its EWMA level."""
+
+    def __init__(self, window, values=(), ewma=None):
+        self.values = deque(values, maxlen=window)
+        self.sorted = sorted(self.values)
+        self.total = sum(self.values)
+        self.ewma = ewma
+
+    def stats(self):
+        """(mean, median, MAD, mean absolute deviation) of the window."""
+        n = len(self.sorted)
+        s = self.sorted
+        mean = self.total / n
+        mid = n // 2
+        median = float(s[mid]) if n % 2 else (s[mid - 1] + s[mid]) / 2
+        deviations = sorted(abs(v - median) for v in s)
+        mad = deviations[mid] if n % 2 else (deviations[mid - 1] + deviations[mid]) / 2
+        mean_ad = sum(abs(v - mean) for v in s) / n
+        return mean, median, float(mad), mean_ad
+
+    def push(self, value, alpha):
+        if len(self.values) == self.values.maxlen:
+            old = self.values[0]
+            del self.sorted[bisect.bisect_left(self.sorted, old)]
+            self.total -= old
+        self.values.append(value)
+        bisect.insort(self.sorted, value)
+        self.total += value
+        self.ewma = float(value) if self.ewma is None else alpha * value + (1 - alpha) * self.ewma
+
+
+class RollingDetector:
+    """
+    Streaming form of detect(): update() scores one day against the
+    state left by the earlier days, then adds it. Days must arrive in
+    increasing order; a day at or before last_day is ignored.
+    """
+
+    def __init__(self, window=WINDOW, min_periods=MIN_PERIODS, alpha=EWMA_ALPHA,
+                 threshold=THRESHOLD, season=SEASON):
+        self.window = window
+        self.min_periods = min_periods
+        self.alpha = alpha
+        self.threshold = threshold
+        self.season = season
+        self.seasons = {}
+        self.last_day = None
+
+    def _key(self, row):
+        return None if self.season is None else row[self.season]
+
+    def update(self, day, amount_paise, day_name=None, is_weekend=None):
+        """Score one day; returns its row as in detect(), or None if already seen."""
+        day, value = int(day), int(amount_paise)
+        if self.last_day is not None and day <= self.last_day:
+            return None
+        row = {"day": day, "amount_paise": value,
+               "day_name": day_name, "is_weekend": bool(is_weekend)}
+        state = self.seasons.setdefault(self._key(row), _SeasonWindow(self.window))
+
+        n = len(state.values)
+        row.update(n_history=n, rolling_mean=np.nan, rolling_median=np.nan,
+                   rolling_mad=np.nan, robust_z=np.nan,
+                   ewma=np.nan if state.ewma is None else state.ewma)
+        if n >= self.min_periods:
+            mean, median, mad, mean_ad = state.stats()
+            row.update(rolling_mean=mean, rolling_median=median, rolling_mad=mad,
+                       robust_z=float(_robust_z(value, median, mad, mean_ad)))
+        row["spike"] = bool(row["robust_z"] >= self.threshold)
+
+        state.push(value, self.alpha)
+        self.last_day = day
+        return row
+
+    def update_frame(self, series, calendar=None):
+        """update() every day of a daily series; returns the scored rows."""
+        series = with_calendar(series.sort_values("day"), calendar)
+        rows = [
+            self.update(r.day, r.amount_paise, r.day_name, r.is_weekend)
+            for r in series.itertuples(index=False)
+        ]
+        rows = [r for r in rows if r is not None]
+        columns = ["day", "amount_paise", "day_name", "is_weekend"] + SCORE_COLUMNS
+        out = pd.DataFrame(rows, columns=columns)
+        return out.astype({"day": np.int32, "amount_paise": np.int64,
+                           "n_history": np.int64, "is_weekend": bool, "spike": bool})
+
+    # --- state between runs ---
+    def params(self):
+        return {"window": self.window, "min_periods": self.min_periods,
+                "alpha": self.alpha, "threshold": self.threshold, "season": self.season}
+
+    def to_dict(self):
+        return {
+            "state_version": STATE_VERSION,
+            "params": self.params(),
+            "last_day": self.last_day,
+            # JSON keys are strings; keep the season key with its state
+            "seasons": [
+                {"key": key, "values": list(s.values), "ewma": s.ewma}
+                for key, s in self.seasons.items()
+            ],
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        detector = cls(**state["params"])
+        detector.last_day = state["last_day"]
+        for s in state["seasons"]:
+            detector.seasons[s["key"]] = _SeasonWindow(detector.window, s["values"], s["ewma"])
+        return detector
+
+
+def load_state(path=STATE_DIR, **params):
+    """
+    The saved detector, or None when there is none or it was built with
+    other parameters (or an older state layout).
+    """
+    fn = os.path.join(path, STATE_FILE)
+    if not os.path.exists(fn):
+        return None
+    with open(fn, encoding="utf-8") as f:
+        state = json.load(f)
+    if state.get("state_version") != STATE_VERSION:
+        return None
+    detector = RollingDetector.from_dict(state)
+    if detector.params() != RollingDetector(**params).params():
+        return None
+    return detector
+
+
+def save_state(detector, path=STATE_DIR):
+    os.makedirs(path, exist_ok=True)
+    tmp = os.path.join(path, STATE_FILE + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(detector.to_dict(), f)
+    os.replace(tmp, os.path.join(path, STATE_FILE))
+
+
+# -------------------------------------------------
+# 4. WAREHOUSE RUNS
+# -------------------------------------------------
+def load_series(conn, start=None, end=None):
+    """
+    Daily series and calendar for [start, end) (None: whole warehouse),
+    from the summary table / push-down query like the month scripts.
+    """
+    from push_down import load_daily_totals
+
+    df = load_daily_totals(conn, start, end)
+    return daily_series(df, group_lookup(conn)), read_calendar(conn, start, end)
+
+
+def stream(conn, path=STATE_DIR, rebuild=False):
+    """
+    Score the days that landed since the last run (all of them on the
+    first run or with rebuild), except the newest day, which may still
+    be receiving rows. Returns the newly scored days.
+    """
+    detector = None if rebuild else load_state(path)
+    start = None
+    if detector is None:
+        detector = RollingDetector()
+    elif detector.last_day is not None:
+        start = to_dates([detector.last_day + 1])[0].date()
+
+    series, calendar = load_series(conn, start)
+    if len(series):
+        series = series[series["day"] < series["day"].max()]
+    scored = detector.update_frame(series, calendar)
+    save_state(detector, path)
+    return scored
+
+
+def verify_streaming(series, calendar=None):
+    """Assert that detect() and RollingDetector agree on series; returns True."""
+    batch = detect(series, calendar)
+    streamed = RollingDetector().update_frame(series, calendar)
+    pd.testing.assert_frame_equal(
+        batch.reset_index(drop=True)[streamed.columns],
+        streamed,
+        check_dtype=False,
+        rtol=1e-9
+    )
+    return True
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from backend import connect
+
+    parser = argparse.ArgumentParser(description="Daily expense anomaly detection")
+    parser.add_argument("--start", help="first day (batch), default: whole warehouse")
+    parser.add_argument("--end", help="day after the last day (batch)")
+    parser.add_argument("--stream", action="store_true",
+                        help="score only the days that landed since the last --stream")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="with --stream: forget the saved state and rescore everything")
+    parser.add_argument("--verify", action="store_true",
+                        help="check batch and streaming scores agree")
+    args = parser.parse_args()
+
+    conn = connect()
+
+    if args.stream:
+        scored = stream(conn, rebuild=args.rebuild)
+        print(f"Days scored: {len(scored)}")
+    else:
+        series, calendar = load_series(conn, args.start, args.end)
+        if args.verify:
+            verify_streaming(series, calendar)
+            print("Batch and streaming scores agree")
+        scored = detect(series, calendar)
+    conn.close()
+
+    report = for_report(scored)
+    print("\nSPIKE DAYS:")
+    print(report.loc[report["spike"], ["full_date", "day_name", "amount",
+                                       "rolling_median", "robust_z"]].to_string(index=False))
+    print(f"\n{int(report['spike'].sum())} of {len(report)} days flagged "
+          f"({int(report['robust_z'].notna().sum())} with enough history)")
@@ -1,47 +1,47 @@
-import mysql.connector
-import pandas as pd
-import matplotlib.pyplot as plt
+from anomaly import history_bounds, read_calendar
+from backend import connect
+from mess_analysis import analyse, date_range, month_report, semester_bounds
+from push_down import load_daily_totals
+from rendering import figure_spec, submit
 
 # -----------------------------
 # Database connection
 # -----------------------------
-conn = mysql.connector.connect(
-    host="localhost",
-    user="root",
-    password="..........",   # replace if needed
-    database="mess_dw"
-)
+conn = connect()
 
 # -----------------------------
-# SQL query: August 2025 totals
-# -----------------------------
-query = """
-SELECT 
-    d.full_date,
-    SUM(f.amount) AS total_expense
-FROM fact_expense f
-JOIN dim_date d ON f.date_id = d.date_id
-WHERE MONTH(d.full_date) = 8
-  AND YEAR(d.full_date) = 2025
-GROUP BY d.full_date
-ORDER BY d.full_date;
-"""
-
-df_august = pd.read_sql(query, conn)
+# Load August 2025 and compute daily totals
+# -----------------------------
+# All mess units are kept here (no UNKNOWN filter), as before.
+# One semester-wide query, identical in every month script (so it runs
+# once under run_report.py); this month is sliced out of it.
+# Days before the month only seed its high wastage scores (anomaly.py);
+# month_report() drops them
+semester = semester_bounds()
+start, end = history_bounds(2025, 8)
+df = date_range(load_daily_totals(conn, *semester), start, end)
+calendar = date_range(read_calendar(conn, *semester), start, end)
 conn.close()
 
+report = month_report(analyse(df, drop_unknown=False, calendar=calendar), 2025, 8)
+df_august = report["daily"].rename(columns={"amount": "total_expense"})
+
 # -----------------------------
 # Plot: Date vs Total Expense
 # -----------------------------
-plt.figure(figsize=(10, 5))
-plt.plot(df_august["full_date"], df_august["total_expense"], marker="o")
-plt.title("Daily Total Mess Expense — August 2025")
-plt.xlabel("Date")
-plt.ylabel("Total Expense (Rs.)")
-plt.xticks(rotation=45)
-plt.grid(True)
-plt.tight_layout()
-plt.show()
+# Rendered headlessly (rendering.py), no display needed
+submit(figure_spec(
+    "daily_total_expense", "line",
+    {"x": df_august["full_date"], "y": df_august["total_expense"]},
+    title="Daily Total Mess Expense — August 2025",
+    xlabel="Date",
+    ylabel="Total Expense (Rs.)",
+    figsize=(10, 5),
+    section="august",
+    marker="o",
+    xtick_rotation=45,
+    grid=True
+))
 
 # -----------------------------
 # Optional: print table output
@@ -0,0 +1,651 @@
+"""
+WAREHOUSE BACKENDS: MySQL OR EMBEDDED (DuckDB / SQLite)
+IISER TVM Mess DWBI Project – Varsha 2025
+
+---------------------------------------------------
+WHY
+---------------------------------------------------
+Every script connected to a live MySQL server, so nothing could run,
+be checked or be benchmarked without one, and each run paid the network
+round trips. connect() returns a DB-API connection to either
+
+    "mysql"  : the mess_dw server (default)
+    "duckdb" : an embedded, columnar, vectorized engine in one local file
+    "sqlite" : the embedded engine from the standard library
+
+selected by MESS_BACKEND (or the backend argument). The embedded file
+(MESS_EMBEDDED_PATH, default mess_dw.duckdb / mess_dw.sqlite next to
+Code/) holds the same dim_date / dim_vendor / dim_mess_unit /
+fact_expense schema, filled from MySQL by load_from_mysql().
+
+---------------------------------------------------
+DIALECT
+---------------------------------------------------
+All queries are still written once, in MySQL dialect (query_builder,
+aggregates). EmbeddedConnection rewrites them per statement:
+
+    %s placeholders                 -> ?
+    ON DUPLICATE KEY UPDATE         -> ON CONFLICT DO UPDATE SET
+    VALUES(...) AS new row alias    -> dropped
+    new.col / derived.col / VALUES(col) in the update -> excluded.col
+    target.col in the update        -> col
+    CAST(... AS SIGNED INTEGER)     -> CAST(... AS BIGINT)   (DuckDB)
+
+DuckDB runs in autocommit mode; the wrapper opens a transaction before
+the first write so commit() / rollback() behave as with mysql.connector.
+One statement at a time per connection, as with mysql.connector's
+unbuffered cursors.
+
+---------------------------------------------------
+CONFIGURATION & POOLING
+---------------------------------------------------
+MySQL credentials are read from an INI file (MESS_DB_CONFIG, default
+mess_dw.ini next to Code/, see mess_dw.example.ini) and can be
+overridden per variable:
+
+    MESS_DB_HOST, MESS_DB_PORT, MESS_DB_USER, MESS_DB_PASSWORD, MESS_DB_NAME
+
+Connections come from one process-wide mysql.connector pool
+(MESS_DB_POOL_SIZE, default 8); close() hands them back to the pool.
+Embedded DuckDB connections share one database handle per file
+(MESS_EMBEDDED_READ_ONLY=1 opens it read-only; close_all() releases it).
+
+session() / prefetch() let a runner fetch many independent queries
+concurrently (one pooled connection per thread) into a result cache
+that every connection opened inside the session reads from.
+
+---------------------------------------------------
+BENCHMARK
+---------------------------------------------------
+python backend.py --load     copy mess_dw from MySQL into the embedded file
+python backend.py --bench    time every report query on MySQL and embedded,
+                             side by side
+"""
+
+import configparser
+import contextlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from query_builder import INDEX_DDL
+
+BACKEND = os.environ.get("MESS_BACKEND", "mysql")
+
+_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+EMBEDDED_PATHS = {
+    "duckdb": os.path.join(_ROOT, "mess_dw.duckdb"),
+    "sqlite": os.path.join(_ROOT, "mess_dw.sqlite"),
+}
+
+# Worker processes of run_report open embedded files read-only, so any
+# number of them can share one DuckDB file.
+EMBEDDED_READ_ONLY = os.environ.get("MESS_EMBEDDED_READ_ONLY", "0") == "1"
+
+CONFIG_FILE = os.environ.get("MESS_DB_CONFIG", os.path.join(_ROOT, "mess_dw.ini"))
+POOL_SIZE = int(os.environ.get("MESS_DB_POOL_SIZE", "8"))
+
+# connect() keyword -> environment override
+CONFIG_ENV = {
+    "host": "MESS_DB_HOST",
+    "port": "MESS_DB_PORT",
+    "user": "MESS_DB_USER",
+    "password": "MESS_DB_PASSWORD",
+    "database": "MESS_DB_NAME",
+}
+
+DEFAULT_CONFIG = {
+    "host": "localhost",
+    "port": "3306",
+    "user": "root",
+    "password": "",
+    "database": "mess_dw"
+}
+
+# -------------------------------------------------
+# EMBEDDED SCHEMA
+# -------------------------------------------------
+# Same tables and columns as the MySQL DDL in data_preprocessing.py.
+# Keys are copied from MySQL, so no AUTO_INCREMENT; foreign keys are left
+# out to keep bulk loads cheap.
+SCHEMA_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS dim_date (
+        date_id INTEGER PRIMARY KEY,
+        full_date DATE UNIQUE,
+        day INTEGER,
+        month INTEGER,
+        year INTEGER,
+        day_name VARCHAR(10),
+        is_weekend BOOLEAN
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS dim_vendor (
+        vendor_id INTEGER PRIMARY KEY,
+        vendor_name VARCHAR(255) UNIQUE,
+        canonical_vendor_name VARCHAR(255)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS dim_mess_unit (
+        mess_unit_id INTEGER PRIMARY KEY,
+        mess_unit_name VARCHAR(50) UNIQUE,
+        mess_group VARCHAR(20)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS fact_expense (
+        expense_id INTEGER PRIMARY KEY,
+        date_id INTEGER,
+        vendor_id INTEGER,
+        mess_unit_id INTEGER,
+        amount DECIMAL(12,2)
+    )
+    """
+]
+
+# table -> primary key, in load order (dimensions before facts)
+TABLES = {
+    "dim_date": "date_id",
+    "dim_vendor": "vendor_id",
+    "dim_mess_unit": "mess_unit_id",
+    "fact_expense": "expense_id",
+}
+
+
+# -------------------------------------------------
+# 1. DIALECT TRANSLATION
+# -------------------------------------------------
+_WRITE = re.compile(r"^\s*(INSERT|UPDATE|DELETE|CREATE|ALTER|DROP)\b", re.IGNORECASE)
+
+
+def translate(sql, dialect):
+    """Rewrite a MySQL-dialect statement for "duckdb" or "sqlite"."""
+    sql = sql.replace("%s", "?")
+
+    if "ON DUPLICATE KEY UPDATE" in sql:
+        head, update = sql.split("ON DUPLICATE KEY UPDATE", 1)
+        target = re.match(r"\s*INSERT INTO (\w+)", head).group(1)
+        # Row alias of INSERT ... VALUES (...) AS new, or the derived
+        # table of INSERT ... SELECT * FROM (...) AS delta [WHERE TRUE]
+        incoming = re.search(r"\bAS (\w+)(\s+WHERE TRUE)?\s*$", head)
+        if incoming:
+            if re.search(r"VALUES\s*\([^()]*\)\s+AS \w+\s*$", head):
+                head = head[:incoming.start()].rstrip() + "\n"
+            update = re.sub(rf"\b{incoming.group(1)}\.(\w+)", r"excluded.\1", update)
+        update = re.sub(rf"\b{target}\.(\w+)", r"\1", update)
+        update = re.sub(r"VALUES\((\w+)\)", r"excluded.\1", update)
+        sql = head + "ON CONFLICT DO UPDATE SET" + update
+
+    if dialect == "duckdb":
+        sql = re.sub(r"AS SIGNED INTEGER\b", "AS BIGINT", sql)
+
+    return sql
+
+
+class _Cursor:
+    """DB-API cursor that translates every statement before running it."""
+
+    def __init__(self, conn):
+        self._conn = conn
+        # DuckDB's cursor() opens a separate connection (and transaction);
+        # statements run on the connection itself instead.
+        self._cur = conn.raw if conn.dialect == "duckdb" else conn.raw.cursor()
+
+    @property
+    def description(self):
+        return self._cur.description
+
+    def execute(self, sql, params=()):
+        self._conn._begin_if_write(sql)
+        self._cur.execute(translate(sql, self._conn.dialect), tuple(params or ()))
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        self._conn._begin_if_write(sql)
+        self._cur.executemany(translate(sql, self._conn.dialect), list(seq_of_params))
+        return self
+
+    def fetchone(self):
+        return self._cur.fetchone()
+
+    def fetchmany(self, size):
+        return self._cur.fetchmany(size)
+
+    def fetchall(self):
+        return self._cur.fetchall()
+
+    def close(self):
+        if self._cur is not self._conn.raw:
+            self._cur.close()
+
+
+class EmbeddedConnection:
+    """mysql.connector-like connection over a DuckDB / SQLite database."""
+
+    def __init__(self, raw, dialect):
+        self.raw = raw
+        self.dialect = dialect
+        self._in_transaction = False
+
+    def _begin_if_write(self, sql):
+        # sqlite3 opens its own implicit transactions
+        if self.dialect == "duckdb" and not self._in_transaction and _WRITE.match(sql):
+            self.raw.begin()
+            self._in_transaction = True
+
+    def cursor(self):
+        return _Cursor(self)
+
+    def commit(self):
+        if self.dialect == "sqlite" or self._in_transaction:
+            self.raw.commit()
+        self._in_transaction = False
+
+    def rollback(self):
+        if self.dialect == "sqlite" or self._in_transaction:
+            self.raw.rollback()
+        self._in_transaction = False
+
+    def close(self):
+        self.raw.close()
+
+
+# -------------------------------------------------
+# 2. CONFIGURATION & POOLED CONNECTIONS
+# -------------------------------------------------
+def load_config(path=None):
+    """
+    MySQL connection settings: DEFAULT_CONFIG < [mysql] section of the
+    config file < MESS_DB_* environment variables.
+    """
+    config = dict(DEFAULT_CONFIG)
+
+    parser = configparser.ConfigParser()
+    if parser.read(path or CONFIG_FILE) and parser.has_section("mysql"):
+        config.update({k: v for k, v in parser.items("mysql") if k in CONFIG_ENV})
+
+    for key, var in CONFIG_ENV.items():
+        if var in os.environ:
+            config[key] = os.environ[var]
+
+    config["port"] = int(config["port"])
+    return config
+
+
+_lock = threading.Lock()
+_mysql_pool = None
+_duckdb = {}
+_schema_ready = set()
+_session_cache = None
+
+
+def _pool():
+    global _mysql_pool
+    with _lock:
+        if _mysql_pool is None:
+            from mysql.connector import pooling
+
+            _mysql_pool = pooling.MySQLConnectionPool(
+                pool_name="mess_dw", pool_size=POOL_SIZE, **load_config()
+            )
+        return _mysql_pool
+
+
+def _connect(backend, path):
+    if backend == "mysql":
+        return _pool().get_connection()
+
+    if backend not in EMBEDDED_PATHS:
+        raise ValueError(f"Unknown warehouse backend: {backend!r}")
+
+    path = path or os.environ.get("MESS_EMBEDDED_PATH") or EMBEDDED_PATHS[backend]
+    if backend == "duckdb":
+        import duckdb
+
+        with _lock:
+            if path not in _duckdb:
+                _duckdb[path] = duckdb.connect(path, read_only=EMBEDDED_READ_ONLY)
+            # cursor() is a new connection to the same database, usable
+            # from another thread; closing it leaves the database open
+            raw = _duckdb[path].cursor()
+    else:
+        raw = sqlite3.connect(path)
+
+    conn = EmbeddedConnection(raw, backend)
+    with _lock:
+        if path not in _schema_ready and not EMBEDDED_READ_ONLY:
+            create_schema(conn)
+            _schema_ready.add(path)
+    return conn
+
+
+def close_all():
+    """Close the shared embedded database handles (releases file locks)."""
+    with _lock:
+        for raw in _duckdb.values():
+            raw.close()
+        _duckdb.clear()
+        _schema_ready.clear()
+
+
+def connect(backend=None, path=None):
+    """
+    DB-API connection to the warehouse on `backend` (default MESS_BACKEND).
+
+    MySQL connections come from the shared pool. Embedded databases are
+    opened from path (default MESS_EMBEDDED_PATH or EMBEDDED_PATHS[backend])
+    and get the schema if it is missing. Inside session(), prefetched
+    query results are served from the session cache.
+    """
+    conn = _connect(backend or BACKEND, path)
+    if _session_cache is not None:
+        return CachedConnection(conn, _session_cache)
+    return conn
+
+
+# -------------------------------------------------
+# 3. SESSION CACHE & CONCURRENT PREFETCH
+# -------------------------------------------------
+class _CachedCursor:
+    """Serves cached SELECT results; anything else runs on the real cursor."""
+
+    def __init__(self, cursor, cache):
+        self._cursor = cursor
+        self._cache = cache
+        self._rows = None
+        self.description = None
+
+    def execute(self, sql, params=()):
+        hit = self._cache.get((sql, tuple(params or ())))
+        if hit is None:
+            self._rows = None
+            self._cursor.execute(sql, params)
+            self.description = self._cursor.description
+        else:
+            self.description, rows = hit
+            self._rows = iter(rows)
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        self._rows = None
+        self._cursor.executemany(sql, seq_of_params)
+        return self
+
+    def fetchone(self):
+        if self._rows is None:
+            return self._cursor.fetchone()
+        return next(self._rows, None)
+
+    def fetchmany(self, size):
+        if self._rows is None:
+            return self._cursor.fetchmany(size)
+        return [row for _, row in zip(range(size), self._rows)]
+
+    def fetchall(self):
+        if self._rows is None:
+            return self._cursor.fetchall()
+        return list(self._rows)
+
+    def close(self):
+        self._cursor.close()
+
+
+class CachedConnection:
+    """A connection opened inside session(); see _CachedCursor."""
+
+    def __init__(self, conn, cache):
+        self.conn = conn
+        self.cache = cache
+
+    def cursor(self):
+        return _CachedCursor(self.conn.cursor(), self.cache)
+
+    def commit(self):
+        self.conn.commit()
+
+    def rollback(self):
+        self.conn.rollback()
+
+    def close(self):
+        self.conn.close()
+
+
+@contextlib.contextmanager
+def session():
+    """
+    Share one result cache between every connect() inside the block.
+    Yields the cache ({(sql, params): (description, rows)}).
+    """
+    global _session_cache
+    _session_cache = {}
+    try:
+        yield _session_cache
+    finally:
+        _session_cache = None
+
+
+def _fetch(backend, sql, params):
+    conn = _connect(backend, None)
+    try:
+        cur = conn.cursor()
+        t0 = time.perf_counter()
+        cur.execute(sql, params)
+        rows = cur.fetchall()
+        # Column names only: DuckDB type codes cannot be pickled, and the
+        # cache is shipped to run_report's worker processes
+        description = [(col[0],) + (None,) * 6 for col in cur.description]
+        cur.close()
+        return description, rows, time.perf_counter() - t0
+    finally:
+        conn.close()
+
+
+def prefetch(queries, max_workers=POOL_SIZE, backend=None):
+    """
+    Run independent queries concurrently, one pooled connection per
+    worker thread, and store the results in the active session cache.
+
+    queries : {name: (sql, params)}
+    Returns {name: (rows, seconds)}.
+    """
+    if _session_cache is None:
+        raise RuntimeError("prefetch() needs an active session()")
+
+    backend = backend or BACKEND
+    timings = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            name: (key, pool.submit(_fetch, backend, *key))
+            for name, key in ((n, (sql, tuple(params))) for n, (sql, params) in queries.items())
+        }
+        for name, (key, future) in futures.items():
+            description, rows, seconds = future.result()
+            _session_cache[key] = (description, rows)
+            timings[name] = (len(rows), seconds)
+    return timings
+
+
+def create_schema(conn):
+    """SCHEMA_DDL, plus the covering indexes on SQLite (row store)."""
+    cur = conn.cursor()
+    for ddl in SCHEMA_DDL:
+        cur.execute(ddl)
+    if conn.dialect == "sqlite":
+        for ddl in INDEX_DDL:
+            cur.execute(ddl.replace("CREATE INDEX", "CREATE INDEX IF NOT EXISTS"))
+    conn.commit()
+    cur.close()
+
+
+# -------------------------------------------------
+# 4. LOADER (MySQL -> EMBEDDED)
+# -------------------------------------------------
+def _insert_frame(conn, table, df):
+    """Bulk insert a DataFrame into an embedded table."""
+    columns = ", ".join(df.columns)
+    if conn.dialect == "duckdb":
+        conn._begin_if_write("INSERT")
+        conn.raw.register("_chunk", df)
+        conn.raw.execute(f"INSERT INTO {table} ({columns}) SELECT {columns} FROM _chunk")
+        conn.raw.unregister("_chunk")
+    else:
+        # SQLite stores DATE as ISO text and cannot bind Timestamps
+        df = df.assign(**{
+            c: df[c].dt.strftime("%Y-%m-%d")
+            for c in df.columns if pd.api.types.is_datetime64_any_dtype(df[c])
+        })
+        marks = ", ".join(["?"] * len(df.columns))
+        conn.raw.executemany(
+            f"INSERT INTO {table} ({columns}) VALUES ({marks})",
+            df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+        )
+
+
+def _to_native(df):
+    """Decimal -> float and date objects -> datetime64, for bulk inserts."""
+    for c in df.columns:
+        if df[c].dtype != object:
+            continue
+        sample = df[c].dropna()
+        if sample.empty:
+            continue
+        first = sample.iloc[0]
+        if type(first).__name__ == "Decimal":
+            df[c] = df[c].astype(float)
+        elif type(first).__name__ == "date":
+            df[c] = pd.to_datetime(df[c])
+    return df
+
+
+def load_tables(target, chunks_by_table):
+    """
+    Replace the embedded tables with the given data and rebuild the
+    summary tables.
+
+    chunks_by_table : {table: iterable of DataFrames}, in TABLES order
+    Returns {table: rows}.
+    """
+    import aggregates
+
+    create_schema(target)
+    cur = target.cursor()
+    for table in reversed(list(TABLES)):
+        cur.execute(f"DELETE FROM {table}")
+    cur.close()
+
+    counts = {}
+    for table, chunks in chunks_by_table.items():
+        counts[table] = 0
+        for chunk in chunks:
+            _insert_frame(target, table, _to_native(chunk))
+            counts[table] += len(chunk)
+    target.commit()
+
+    aggregates.refresh(target, rebuild=True)
+    return counts
+
+
+def load_from_mysql(source, target, chunksize=None):
+    """
+    Replace the embedded tables with the contents of MySQL mess_dw.
+
+    Each table is streamed with streaming.iter_chunks and bulk inserted;
+    the summary tables are rebuilt afterwards. Returns {table: rows}.
+    """
+    from streaming import iter_chunks
+
+    return load_tables(target, {
+        table: iter_chunks(source, f"SELECT * FROM {table} ORDER BY {key}",
+                           chunksize=chunksize)
+        for table, key in TABLES.items()
+    })
+
+
+# -------------------------------------------------
+# 5. SIDE-BY-SIDE BENCHMARK
+# -------------------------------------------------
+def report_queries():
+    """{name: (sql, params)} for every query the analysis scripts run."""
+    import query_builder as qb
+
+    start, end = qb.month_bounds(2025, 10)
+    return {
+        "transactions (full extract)": qb.transactions_query(),
+        "month transactions": qb.mess_transactions_query(start, end),
+        "benford amounts": qb.amounts_query(),
+        "vendor–mess totals": qb.vendor_mess_totals_query(),
+        "daily mess totals (push-down)": qb.daily_mess_totals_query(start, end),
+        "digit histogram (push-down)": qb.digit_histogram_query(),
+    }
+
+
+def time_query(conn, sql, params=(), repeats=3):
+    """Best-of-repeats wall time (s) and row count to fully fetch a query."""
+    best, n_rows = float("inf"), 0
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        cur = conn.cursor()
+        cur.execute(sql, params)
+        n_rows = len(cur.fetchall())
+        cur.close()
+        best = min(best, time.perf_counter() - t0)
+    return best, n_rows
+
+
+def compare_backends(conns, queries=None, repeats=3):
+    """
+    Time every query on every connection.
+
+    conns : {backend name: connection}
+    Returns one row per query with <backend>_s and <backend>_rows
+    columns. Connections are reused, so setup cost is not included.
+    """
+    queries = queries or report_queries()
+    rows = []
+    for name, (sql, params) in queries.items():
+        row = {"query": name}
+        for backend, conn in conns.items():
+            seconds, n_rows = time_query(conn, sql, params, repeats)
+            row[f"{backend}_s"] = seconds
+            row[f"{backend}_rows"] = n_rows
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Embedded mess_dw backend")
+    parser.add_argument("--embedded", default="duckdb", choices=sorted(EMBEDDED_PATHS))
+    parser.add_argument("--load", action="store_true",
+                        help="copy mess_dw from MySQL into the embedded database")
+    parser.add_argument("--bench", action="store_true",
+                        help="time the report queries on MySQL and the embedded database")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    embedded = connect(args.embedded)
+
+    if args.load:
+        mysql_conn = connect("mysql")
+        t0 = time.perf_counter()
+        for table, n in load_from_mysql(mysql_conn, embedded).items():
+            print(f"{table}: {n} rows")
+        print(f"Loaded in {time.perf_counter() - t0:.1f} s")
+        mysql_conn.close()
+
+    if args.bench:
+        conns = {"mysql": connect("mysql"), args.embedded: embedded}
+        result = compare_backends(conns, repeats=args.repeats)
+        result["speedup"] = result["mysql_s"] / result[f"{args.embedded}_s"]
+        print(result.round(4).to_string(index=False))
+        conns["mysql"].close()
+
+    embedded.close()
@@ -0,0 +1,272 @@
+"""
+PIPELINE BENCHMARK SUITE
+IISER TVM Mess DWBI Project – Varsha 2025
+
+---------------------------------------------------
+WHAT IT MEASURES
+---------------------------------------------------
+For each scale (multiples of one semester, synthetic.py) the whole
+pipeline runs against a fresh embedded warehouse in a scratch directory:
+
+    generate   : synthetic.generate
+    load       : bulk load + summary table rebuild (backend.load_tables)
+    preprocess : extract + clean into the Parquet snapshot (run_incremental)
+    months     : the five month scripts
+    benford    : benford_analysis.py
+    network    : network_analysis.py
+    render     : every figure spec the scripts queued (rendering.render)
+
+Every stage records wall time, CPU time and the process's peak RSS so
+far; --trace-memory also records the tracemalloc peak of the stage
+(slower, so timings from such runs are not comparable). Each scale runs
+in its own child process, so peak RSS is per scale and caches start
+cold. Each scale also records the pairwise precision / recall of
+vendor_dedup against the generator's ground truth (vendor_dedup.pair_scores).
+
+---------------------------------------------------
+RESULTS & REGRESSIONS
+---------------------------------------------------
+Results go to benchmark_results/<timestamp>-<git commit>.json together
+with the machine and library versions. --compare BASELINE.json prints
+the stage-by-stage ratio against an earlier run and marks stages slower
+by more than REGRESSION_THRESHOLD.
+
+    python benchmark.py [--scales 1 10 100] [--seed 42] [--backend duckdb]
+                        [--trace-memory] [--compare BASELINE.json]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import runpy
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import pandas as pd
+
+from instrumentation import peak_rss_mb
+
+CODE_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(CODE_DIR, "..", "benchmark_results")
+
+DEFAULT_SCALES = [1, 10, 100]
+MONTH_SCRIPTS = ["august", "september", "october", "november", "december"]
+REGRESSION_THRESHOLD = 0.10
+
+
+# -------------------------------------------------
+# 1. MEASUREMENT
+# -------------------------------------------------
+def measure(func, trace_memory=False):
+    """Run func(); returns (result, {seconds, cpu_seconds, peak_rss_mb[, peak_traced_mb]})."""
+    if trace_memory:
+        tracemalloc.start()
+    t0, c0 = time.perf_counter(), time.process_time()
+    try:
+        result = func()
+    finally:
+        stats = {
+            "seconds": time.perf_counter() - t0,
+            "cpu_seconds": time.process_time() - c0,
+            "peak_rss_mb": peak_rss_mb(),
+        }
+        if trace_memory:
+            stats["peak_traced_mb"] = tracemalloc.get_traced_memory()[1] / 1024 ** 2
+            tracemalloc.stop()
+    return result, stats
+
+
+def run_script(name, specs):
+    """Run <name>_analysis.py quietly; its figure specs are added to specs."""
+    import rendering
+
+    with contextlib.redirect_stdout(io.StringIO()), rendering.batch() as queued:
+        runpy.run_path(os.path.join(CODE_DIR, f"{name}_analysis.py"), run_name="__main__")
+    specs.extend(queued)
+
+
+# -------------------------------------------------
+# 2. ONE SCALE (CHILD PROCESS)
+# -------------------------------------------------
+def run_scale(scale, seed, backend_name, workdir, trace_memory=False):
+    """
+    Time every stage at one scale. Must run in a fresh process: the
+    pipeline modules read their paths from the environment on import.
+    """
+    os.environ.update({
+        "MESS_BACKEND": backend_name,
+        "MESS_EMBEDDED_PATH": os.path.join(workdir, f"mess_dw.{backend_name}"),
+        "MESS_SNAPSHOT_DIR": os.path.join(workdir, "snapshot"),
+        "MESS_CACHE_DIR": os.path.join(workdir, "cache"),
+        "MESS_OUTPUT_DIR": os.path.join(workdir, "report"),
+    })
+    os.environ.setdefault("MESS_LAYOUT", "auto")
+
+    import backend
+    import rendering
+    import synthetic
+    from data_preprocessing import run_incremental
+    from vendor_dedup import pair_scores, resolve_vendors
+
+    stages = {}
+    specs = []
+
+    def stage(name, func):
+        result, stats = measure(func, trace_memory)
+        stages[name] = stats
+        return result
+
+    tables = stage("generate", lambda: synthetic.generate(scale, seed))
+    rows = {name: len(tables[name]) for name in backend.TABLES}
+    # Entity resolution quality against the generator's ground truth
+    labels = tables["vendor_labels"]
+    dedup = pair_scores(resolve_vendors(labels["vendor_name"]), labels)
+
+    conn = backend.connect()
+    stage("load", lambda: synthetic.write_warehouse(tables, conn))
+    del tables
+    manifest = stage("preprocess", lambda: run_incremental(conn))
+    conn.close()
+    backend.close_all()
+
+    stage("months", lambda: [run_script(name, specs) for name in MONTH_SCRIPTS])
+    stage("benford", lambda: run_script("benford", specs))
+    stage("network", lambda: run_script("network", specs))
+    stage("render", lambda: rendering.render(specs, os.environ["MESS_OUTPUT_DIR"]))
+
+    return {
+        "scale": scale,
+        "rows": rows,
+        "clean_rows": manifest["row_count"],
+        "dedup": dedup,
+        "figures": len(specs),
+        "stages": stages,
+    }
+
+
+# -------------------------------------------------
+# 3. SUITE, RESULTS & COMPARISON
+# -------------------------------------------------
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=CODE_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    import numpy as np
+
+    return {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+    }
+
+
+def run_suite(scales, seed=42, backend_name="duckdb", trace_memory=False):
+    """Each scale in its own child process; returns the results document."""
+    runs = []
+    for scale in scales:
+        with tempfile.TemporaryDirectory(prefix="mess_bench_") as workdir:
+            out = os.path.join(workdir, "result.json")
+            cmd = [sys.executable, os.path.abspath(__file__), "--child",
+                   "--scales", str(scale), "--seed", str(seed),
+                   "--backend", backend_name, "--workdir", workdir, "--out", out]
+            if trace_memory:
+                cmd.append("--trace-memory")
+            subprocess.run(cmd, check=True)
+            with open(out, encoding="utf-8") as f:
+                runs.append(json.load(f))
+        print(f"scale {scale}: {sum(s['seconds'] for s in runs[-1]['stages'].values()):.2f} s")
+
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "seed": seed,
+        "backend": backend_name,
+        "trace_memory": trace_memory,
+        "environment": environment(),
+        "runs": runs,
+    }
+
+
+def save_results(results, directory=RESULTS_DIR):
+    os.makedirs(directory, exist_ok=True)
+    stamp = results["timestamp"].replace(":", "").replace("-", "")
+    path = os.path.join(directory, f"{stamp}-{results['environment']['commit'] or 'nogit'}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    return path
+
+
+def stage_table(results):
+    """One row per (scale, stage)."""
+    return pd.DataFrame([
+        {"scale": run["scale"], "stage": stage, **stats}
+        for run in results["runs"] for stage, stats in run["stages"].items()
+    ])
+
+
+def compare(baseline, current, threshold=REGRESSION_THRESHOLD):
+    """Stage timings of current vs baseline; `regression` marks ratio > 1 + threshold."""
+    merged = stage_table(baseline).merge(
+        stage_table(current), on=["scale", "stage"], suffixes=("_baseline", "_current")
+    )
+    merged["ratio"] = merged["seconds_current"] / merged["seconds_baseline"]
+    merged["regression"] = merged["ratio"] > 1 + threshold
+    return merged[["scale", "stage", "seconds_baseline", "seconds_current", "ratio", "regression"]]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the mess DWBI pipeline")
+    parser.add_argument("--scales", type=float, nargs="+", default=DEFAULT_SCALES)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--backend", choices=["duckdb", "sqlite"], default="duckdb")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="also record tracemalloc peaks (slows every stage)")
+    parser.add_argument("--compare", metavar="BASELINE", help="earlier results JSON")
+    # internal: one scale in a child process
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    parser.add_argument("--out", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        import warnings
+
+        import matplotlib
+        matplotlib.use("Agg")
+        # pd.read_sql on a DB-API connection, expected throughout the repo
+        warnings.filterwarnings("ignore", message="pandas only supports SQLAlchemy")
+
+        result = run_scale(args.scales[0], args.seed, args.backend, args.workdir,
+                           args.trace_memory)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(result, f)
+        sys.exit(0)
+
+    results = run_suite(args.scales, args.seed, args.backend, args.trace_memory)
+    path = save_results(results)
+
+    print("\n--- BENCHMARK ---")
+    print(stage_table(results).round(3).to_string(index=False))
+    print(f"\nResults written to {os.path.abspath(path)}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"\n--- VS {os.path.basename(args.compare)} ---")
+        print(compare(baseline, results).round(3).to_string(index=False))
@@ -0,0 +1,502 @@
+"""
+VECTORIZED BENFORD DIGIT EXTRACTION
+IISER TVM Mess DWBI Project – Varsha 2025
+
+---------------------------------------------------
+WHY
+---------------------------------------------------
+benford_analysis.py used to cast every amount to str, drop '.', strip
+leading zeros and index [0] — several string allocations per row — and
+mis-read values printed in scientific notation (1e-05) or Decimal
+exponent form (0E-2).
+
+---------------------------------------------------
+METHOD
+---------------------------------------------------
+Amounts (float, int, str or decimal.Decimal) are converted once to
+integer paise by dataset.to_paise, which keeps every significant digit
+of a DECIMAL(12,2) value; missing or unparseable amounts become 0 paise
+(invalid="zero") and, like non-positive ones, are not counted. Then,
+with NumPy only:
+
+    mag       = 10 ** floor(log10(paise))       (integer-corrected)
+    first     = paise // mag                    -> 1..9
+    first_two = paise // (mag // 10)            -> 10..99 (paise >= 10)
+    second    = first_two % 10                  -> 0..9
+    last_two  = (paise // 100) % 100            -> 00..99 (rupees >= 10)
+
+Digits that are undefined for a value (first-two of a single-digit
+number, last-two of an amount below ₹10) are -1.
+
+---------------------------------------------------
+TEST SUITE
+---------------------------------------------------
+tests_from_histogram(digit_histogram(amounts)) runs, from one np.bincount
+over all digits:
+
+    first, second, first_two : Benford expectation
+    last_two                 : uniform expectation (rounding / invented
+                               amounts cluster on 00, 50, ...)
+    summation                : share of total amount per first-two group,
+                               expected equal (1/90); large single
+                               amounts stand out here
+
+Each test reports chi-square, p-value, MAD with Nigrini's conformity
+band and a per-digit z-statistic. digit_histogram() results are
+additive, so chunks can be counted separately and tested once.
+
+screen_all(df) repeats a test for every vendor, mess unit and month
+(see GROUPED SCREENING below) and ranks the groups; screen_counts does
+the same from count matrices accumulated chunk by chunk.
+"""
+
+import numpy as np
+import pandas as pd
+
+from dataset import as_float, month_keys, to_paise
+from instrumentation import traced
+
+
+def _magnitude(n):
+    """Largest power of ten <= n, for positive int64 n."""
+    mag = np.power(10, np.floor(np.log10(n)).astype(np.int64))
+    # log10 can land just below/above an exact power of ten
+    mag = np.where(n < mag, mag // 10, mag)
+    mag = np.where(n >= mag * 10, mag * 10, mag)
+    return mag
+
+
+def _digits(paise):
+    """
+    Benford digit arrays of positive int64 paise, in one pass.
+
+    Returns a dict of equal-length int64 arrays:
+      paise, first, second, first_two, last_two
+    """
+    mag = _magnitude(paise)
+    first = paise // mag
+
+    first_two = np.where(mag >= 10, paise // np.maximum(mag // 10, 1), -1)
+    second = np.where(first_two >= 0, first_two % 10, -1)
+
+    rupees = paise // 100
+    last_two = np.where(rupees >= 10, rupees % 100, -1)
+
+    return {
+        "paise": paise,
+        "first": first,
+        "second": second,
+        "first_two": first_two,
+        "last_two": last_two
+    }
+
+
+# -------------------------------------------------
+# MULTI-TEST SUITE
+# -------------------------------------------------
+# Every test's digits are offset into one shared bin range so a single
+# np.bincount pass yields all histograms:
+#   first     1..9    -> bins   1..9
+#   second    0..9    -> bins  10..19
+#   first_two 10..99  -> bins  20..109
+#   last_two  00..99  -> bins 110..209
+TESTS = {
+    # name: (digit values, bin offset)
+    "first": (np.arange(1, 10), 0),
+    "second": (np.arange(0, 10), 10),
+    "first_two": (np.arange(10, 100), 10),
+    "last_two": (np.arange(0, 100), 110),
+}
+N_BINS = 210
+
+# Nigrini (2012) MAD conformity bands: close / acceptable / marginal
+MAD_BANDS = {
+    "first": (0.006, 0.012, 0.015),
+    "second": (0.008, 0.010, 0.012),
+    "first_two": (0.0012, 0.0018, 0.0022),
+}
+
+
+def expected_proportions(test):
+    """Benford proportions for a test's digits (uniform for last-two / summation)."""
+    if test == "first":
+        d = np.arange(1, 10)
+        return np.log10(1 + 1 / d)
+    if test == "second":
+        f2 = np.arange(10, 100)
+        p = np.log10(1 + 1 / f2)
+        return np.bincount(f2 % 10, weights=p, minlength=10)
+    if test == "first_two":
+        d = np.arange(10, 100)
+        return np.log10(1 + 1 / d)
+    if test == "summation":
+        return np.full(90, 1 / 90)
+    if test == "last_two":
+        return np.full(100, 1 / 100)
+    raise ValueError(f"Unknown Benford test: {test!r}")
+
+
+def digit_histogram(amounts):
+    """
+    All digit counts plus the first-two-digit summation, in one pass.
+
+    Returns {"counts": int64[N_BINS], "sums": float[90]}; histograms of
+    several chunks / subsets can simply be added together.
+    """
+    return histogram_from_paise(to_paise(amounts, invalid="zero"))
+
+
+def histogram_from_paise(paise):
+    """digit_histogram() of int64 paise (dataset.py amount_paise), no float round-trip."""
+    paise = np.asarray(paise, dtype=np.int64)
+    d = _digits(paise[paise > 0])
+    has_f2 = d["first_two"] >= 0
+    has_l2 = d["last_two"] >= 0
+
+    index = np.concatenate([
+        d["first"],
+        10 + d["second"][has_f2],
+        10 + d["first_two"][has_f2],
+        110 + d["last_two"][has_l2],
+    ])
+    counts = np.bincount(index, minlength=N_BINS)
+
+    sums = np.bincount(
+        d["first_two"][has_f2] - 10,
+        weights=d["paise"][has_f2] / 100.0,
+        minlength=90
+    ).astype(float)
+    return {"counts": counts, "sums": sums}
+
+
+def histogram_from_groups(groups):
+    """
+    digit_histogram() from pre-aggregated rows (lead_digits, last_two, n,
+    amount), e.g. the result of query_builder.digit_histogram_query.
+    """
+    lead = as_float(groups["lead_digits"]).astype(np.int64)
+    last_two = as_float(groups["last_two"]).astype(np.int64)
+    n = as_float(groups["n"])
+    amount = as_float(groups["amount"])
+
+    has_f2 = lead >= 10
+    has_l2 = last_two >= 0
+    first = np.where(has_f2, lead // 10, lead)
+
+    index = np.concatenate([
+        first,
+        10 + lead[has_f2] % 10,
+        10 + lead[has_f2],
+        110 + last_two[has_l2],
+    ])
+    weights = np.concatenate([n, n[has_f2], n[has_f2], n[has_l2]])
+    counts = np.rint(np.bincount(index, weights=weights, minlength=N_BINS)).astype(np.int64)
+
+    sums = np.bincount(lead[has_f2] - 10, weights=amount[has_f2], minlength=90)
+    return {"counts": counts, "sums": sums}
+
+
+def _conformity(test, mad):
+    bands = MAD_BANDS.get(test)
+    if bands is None:
+        return "n/a"
+    close, acceptable, marginal = bands
+    if mad <= close:
+        return "close conformity"
+    if mad <= acceptable:
+        return "acceptable conformity"
+    if mad <= marginal:
+        return "marginal conformity"
+    return "nonconformity"
+
+
+def z_statistics(observed_prop, expected_prop, n):
+    """
+    Nigrini z per digit, with the 1/(2N) continuity correction.
+
+    n may be a scalar or an array broadcastable against the proportions.
+    """
+    n = np.maximum(np.asarray(n, dtype=float), 1)
+    diff = np.abs(observed_prop - expected_prop)
+    correction = 1 / (2 * n)
+    diff = np.where(correction < diff, diff - correction, diff)
+    se = np.sqrt(expected_prop * (1 - expected_prop) / n)
+    return diff / se
+
+
+def _single_test(test, digits, observed):
+    from scipy.stats import chi2
+
+    n = int(observed.sum())
+    expected_prop = expected_proportions(test)
+    observed_prop = observed / n if n else np.zeros_like(expected_prop)
+    expected = expected_prop * n
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        chi_stat = float(np.nansum((observed - expected) ** 2 / expected))
+    dof = len(digits) - 1
+    mad = float(np.mean(np.abs(observed_prop - expected_prop)))
+
+    table = pd.DataFrame({
+        "digit": digits,
+        "observed": observed.astype(np.int64),
+        "expected": expected,
+        "observed_prop": observed_prop,
+        "expected_prop": expected_prop,
+        "z": z_statistics(observed_prop, expected_prop, n)
+    })
+    summary = {
+        "test": test,
+        "n": n,
+        "chi2": chi_stat,
+        "dof": dof,
+        "p_value": float(chi2.sf(chi_stat, dof)),
+        "mad": mad,
+        "conformity": _conformity(test, mad)
+    }
+    return summary, table
+
+
+@traced("benford.tests")
+def tests_from_histogram(hist):
+    """
+    Run every Benford test on a digit_histogram() result.
+
+    Returns {"summary": DataFrame (one row per test),
+             "digits": {test: per-digit DataFrame}}
+    """
+    counts = hist["counts"]
+    rows, tables = [], {}
+
+    for test, (digits, offset) in TESTS.items():
+        observed = counts[offset + digits].astype(float)
+        summary, table = _single_test(test, digits, observed)
+        rows.append(summary)
+        tables[test] = table
+
+    # Summation test: share of total amount per first-two-digit group,
+    # expected to be equal (1/90) for each group
+    sums = hist["sums"]
+    total = sums.sum()
+    expected_prop = expected_proportions("summation")
+    observed_prop = sums / total if total else np.zeros(90)
+    tables["summation"] = pd.DataFrame({
+        "digit": np.arange(10, 100),
+        "amount": sums,
+        "observed_prop": observed_prop,
+        "expected_prop": expected_prop
+    })
+    mad = float(np.mean(np.abs(observed_prop - expected_prop)))
+    rows.append({
+        "test": "summation",
+        "n": int(counts[20:110].sum()),
+        "chi2": np.nan,
+        "dof": np.nan,
+        "p_value": np.nan,
+        "mad": mad,
+        "conformity": "n/a"
+    })
+
+    return {"summary": pd.DataFrame(rows), "digits": tables}
+
+
+
+# -------------------------------------------------
+# GROUPED SCREENING
+# -------------------------------------------------
+# One 2-D histogram (groups × digits) from a single np.bincount over
+# group_code * n_digits + digit, then chi-square / MAD for all groups as
+# array operations. Groups too small for the chi-square approximation
+# (expected count < MIN_EXPECTED in some cell) are reported but not
+# tested; p-values are Benjamini–Hochberg adjusted across the groups
+# that were tested.
+SCREENING_GROUPS = {
+    "vendor": ["vendor_name"],
+    "mess_unit": ["mess_unit_name"],
+    "month": ["month"],
+}
+MIN_EXPECTED = 5
+FDR_ALPHA = 0.05
+
+
+def min_sample_size(test="first"):
+    """Smallest n with every expected cell count >= MIN_EXPECTED."""
+    return int(np.ceil(MIN_EXPECTED / expected_proportions(test).min()))
+
+
+def grouped_digit_counts(codes, n_groups, amounts, test="first"):
+    """
+    Digit histogram per group as an (n_groups × n_digits) int64 matrix.
+
+    codes : int group code per amount (0..n_groups-1; negative = skip)
+    """
+    return grouped_paise_counts(codes, n_groups, to_paise(amounts, invalid="zero"), test)
+
+
+def grouped_paise_counts(codes, n_groups, paise, test="first"):
+    """grouped_digit_counts for int64 paise (dataset.py amount_paise)."""
+    digits, offset = TESTS[test]
+    lo = offset + digits[0] if test == "first" else digits[0]
+
+    codes = np.asarray(codes, dtype=np.int64)
+    paise = np.asarray(paise, dtype=np.int64)
+    keep = (paise > 0) & (codes >= 0)
+
+    d = _digits(paise[keep])[test]
+    codes = codes[keep]
+    valid = d >= 0
+
+    k = len(digits)
+    index = codes[valid] * k + (d[valid] - lo)
+    return np.bincount(index, minlength=n_groups * k).reshape(n_groups, k)
+
+
+def benjamini_hochberg(p_values):
+    """Benjamini–Hochberg q-values; NaN p-values stay NaN and are not counted."""
+    p = np.asarray(p_values, dtype=float)
+    q = np.full_like(p, np.nan)
+    tested = np.flatnonzero(~np.isnan(p))
+    m = len(tested)
+    if m == 0:
+        return q
+
+    order = tested[np.argsort(p[tested], kind="stable")]
+    ranked = p[order] * m / np.arange(1, m + 1)
+    # Enforce monotonicity from the largest p-value down
+    q[order] = np.minimum(np.minimum.accumulate(ranked[::-1])[::-1], 1.0)
+    return q
+
+
+def _conformity_bands(test, mad):
+    bands = MAD_BANDS.get(test)
+    if bands is None:
+        return np.full(len(mad), "n/a", dtype=object)
+    close, acceptable, marginal = bands
+    return np.select(
+        [mad <= close, mad <= acceptable, mad <= marginal],
+        ["close conformity", "acceptable conformity", "marginal conformity"],
+        default="nonconformity"
+    ).astype(object)
+
+
+def test_groups(counts, test="first", min_n=None, alpha=FDR_ALPHA):
+    """
+    Vectorized chi-square / MAD for every row of a grouped count matrix.
+
+    Returns a DataFrame (one row per group, same order as counts) with
+    n, chi2, p_value, q_value, mad, conformity, max_z_digit, tested and
+    flagged (q_value < alpha).
+    """
+    from scipy.stats import chi2
+
+    if min_n is None:
+        min_n = min_sample_size(test)
+
+    digits, _ = TESTS[test]
+    expected_prop = expected_proportions(test)
+    counts = np.asarray(counts, dtype=float)
+
+    n = counts.sum(axis=1)
+    tested = n >= min_n
+    safe_n = np.where(n > 0, n, 1)
+
+    observed_prop = counts / safe_n[:, None]
+    expected = n[:, None] * expected_prop
+    with np.errstate(divide="ignore", invalid="ignore"):
+        chi_stat = np.nansum((counts - expected) ** 2 / expected, axis=1)
+    mad = np.abs(observed_prop - expected_prop).mean(axis=1)
+
+    z = z_statistics(observed_prop, expected_prop, safe_n[:, None])
+    p_value = np.where(tested, chi2.sf(chi_stat, len(digits) - 1), np.nan)
+    q_value = benjamini_hochberg(p_value)
+
+    return pd.DataFrame({
+        "n": n.astype(np.int64),
+        "chi2": np.where(tested, chi_stat, np.nan),
+        "p_value": p_value,
+        "q_value": q_value,
+        "mad": np.where(n > 0, mad, np.nan),
+        "conformity": np.where(tested, _conformity_bands(test, mad), "too few"),
+        "max_z_digit": digits[np.argmax(z, axis=1)],
+        "max_z": z.max(axis=1),
+        "tested": tested,
+        "flagged": q_value < alpha
+    })
+
+
+def grouped_counts(df, by, test="first"):
+    """
+    Digit count matrix of df per group of `by`: a DataFrame indexed by the
+    group keys with one int64 column per digit of the test.
+    """
+    grouped = df.groupby(by, observed=True, sort=True)
+    codes = grouped.ngroup().to_numpy()
+    keys = grouped.size().index
+
+    if "amount_paise" in df.columns:
+        counts = grouped_paise_counts(codes, len(keys), df["amount_paise"], test)
+    else:
+        counts = grouped_digit_counts(codes, len(keys), df["amount"], test)
+    return pd.DataFrame(counts, index=keys, columns=TESTS[test][0])
+
+
+def group_labels(keys):
+    """"key1 / key2" label per entry of a group index."""
+    return keys.to_frame(index=False).astype(str).agg(" / ".join, axis=1)
+
+
+def _ranked(table):
+    return (
+        table.sort_values(["flagged", "q_value", "mad"], ascending=[False, True, False],
+                          na_position="last")
+             .reset_index(drop=True)
+    )
+
+
+def screen_groups(df, by, test="first", min_n=None, alpha=FDR_ALPHA):
+    """
+    Benford screening of every group of df (columns `by` + amount, or
+    amount_paise in the typed layout).
+
+    Returns the ranked anomaly table: group keys plus the test_groups
+    columns, flagged groups first (by q-value), then by MAD.
+    """
+    counts = grouped_counts(df, by, test)
+    keys = counts.index.to_frame(index=False)
+    return _ranked(pd.concat([keys, test_groups(counts, test, min_n, alpha)], axis=1))
+
+
+def screen_counts(counts, test="first", min_n=None, alpha=FDR_ALPHA):
+    """
+    Ranked anomaly table from {grouping: grouped_counts matrix}, stacked
+    with a `grouping` and `group` column.
+
+    The matrices are additive, so they can be summed over chunks
+    (streaming.GroupedDigitCounts) or come from a pushed-down GROUP BY
+    (push_down.load_grouped_digit_counts) instead of one big DataFrame.
+    """
+    tables = []
+    for grouping, matrix in counts.items():
+        table = test_groups(matrix, test, min_n, alpha)
+        table.insert(0, "group", group_labels(matrix.index))
+        table.insert(0, "grouping", grouping)
+        tables.append(table)
+    return _ranked(pd.concat(tables, ignore_index=True))
+
+
+@traced("benford.screen_all")
+def screen_all(df, test="first", min_n=None, alpha=FDR_ALPHA):
+    """
+    screen_groups for each SCREENING_GROUPS entry (vendor, mess unit,
+    month), stacked into one table with a `grouping` and `group` column.
+    """
+    if "month" not in df.columns and "day" in df.columns:
+        df = df.assign(month=month_keys(df["day"]))
+    elif "month" not in df.columns and "full_date" in df.columns:
+        df = df.assign(month=pd.to_datetime(df["full_date"]).dt.to_period("M").astype(str))
+
+    return screen_counts({
+        grouping: grouped_counts(df, by, test)
+        for grouping, by in SCREENING_GROUPS.items()
+        if set(by) <= set(df.columns)
+    }, test, min_n, alpha)
@@ -1,18 +1,17 @@
-import mysql.connector
 import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-from scipy.stats import chisquare, chi2
+from scipy.stats import chi2
+
+from backend import connect
+from benford import screen_counts, tests_from_histogram
+from push_down import load_digit_histogram, load_grouped_digit_counts
+from rendering import figure_spec, submit
+from snapshot import has_snapshot, is_fresh, iter_snapshot
+from streaming import BenfordCounts, GroupedDigitCounts, chunksize_for_memory, stream_aggregate
 
 # -------------------------------
 # CONNECT TO MYSQL
 # -------------------------------
-conn = mysql.connector.connect(
-    host="localhost",
-    user="root",
-    password="..........",
-    database="mess_dw"
-)
+conn = connect()
 
 print("Connected to MySQL successfully")
 
@@ -20,41 +19,43 @@ print("Connected to MySQL successfully")
 # LOAD EXPENSE DATA
 # (Vendor-level payments across Varsha 2025)
 # -------------------------------
-query = """
-SELECT amount
-FROM fact_expense
-WHERE amount > 0
-"""
-
-df = pd.read_sql(query, conn)
-
-# -------------------------------
-# EXTRACT FIRST DIGITS
-# -------------------------------
-df["first_digit"] = df["amount"].astype(str).str.replace('.', '', regex=False).str.lstrip('0').str[0]
-df = df[df["first_digit"].isin(list("123456789"))]
-df["first_digit"] = df["first_digit"].astype(int)
+# Memory-mapped read of the cleaned snapshot when it is up to date; every
+# digit histogram (first, second, first-two, last-two, summation) is then
+# accumulated per chunk in one np.bincount pass (benford.digit_histogram),
+# together with the grouped screening counts below. Otherwise the histogram is aggregated inside MySQL (push-down) and only
+# a few thousand grouped rows are fetched.
+use_snapshot = has_snapshot() and is_fresh(conn)
+
+if use_snapshot:
+    counter, grouped_counter = stream_aggregate(
+        iter_snapshot(columns=["day", "vendor_name", "mess_unit_name", "amount_paise"],
+                      batch_size=chunksize_for_memory()),
+        BenfordCounts(), GroupedDigitCounts()
+    )
+    results = counter.result()
+else:
+    results = tests_from_histogram(load_digit_histogram(conn))
 
 # -------------------------------
-# OBSERVED FREQUENCIES
+# BENFORD TEST SUITE
 # -------------------------------
-observed_counts = df["first_digit"].value_counts().sort_index()
-total_observations = observed_counts.sum()
+summary = results["summary"].set_index("test")
 
 # -------------------------------
-# EXPECTED BENFORD FREQUENCIES
+# FIRST-DIGIT FREQUENCIES
 # -------------------------------
-digits = np.arange(1, 10)
-benford_probs = np.log10(1 + 1 / digits)
-expected_counts = benford_probs * total_observations
+first = results["digits"]["first"]
+digits = first["digit"].values
+observed_counts = first["observed"]
+total_observations = int(summary.loc["first", "n"])
+benford_probs = first["expected_prop"].values
+expected_counts = first["expected"].values
 
 # -------------------------------
 # CHI-SQUARE GOODNESS-OF-FIT TEST
 # -------------------------------
-chi_stat, p_value = chisquare(
-    f_obs=observed_counts.values,
-    f_exp=expected_counts
-)
+chi_stat = summary.loc["first", "chi2"]
+p_value = summary.loc["first", "p_value"]
 
 alpha = 0.05
 df_chi = len(digits) - 1
@@ -92,21 +93,60 @@ print("\nObserved vs Expected Frequencies:")
 print(benford_df)
 
 # -------------------------------
-# PLOT BENFORD DISTRIBUTION
+# FULL SUITE: MAD CONFORMITY & SPIKES
 # -------------------------------
-plt.figure(figsize=(8, 5))
-plt.plot(digits, benford_probs * 100, marker='o', label="Benford Expected", linewidth=2)
-plt.bar(digits, benford_df["Observed_%"], alpha=0.7, label="Observed")
+print("\n--- BENFORD TEST SUITE ---")
+print(summary[["n", "chi2", "dof", "p_value", "mad", "conformity"]].round(4))
 
-plt.xlabel("First Digit")
-plt.ylabel("Percentage Frequency")
-plt.title("Benford's Law Analysis of Mess Expenditure Data")
-plt.xticks(digits)
-plt.legend()
-plt.grid(axis='y', linestyle='--', alpha=0.6)
+for test in ["first", "second", "first_two", "last_two"]:
+    spikes = results["digits"][test].query("z > 1.96")
+    if len(spikes):
+        print(f"\nSignificant {test} digits (z > 1.96):")
+        print(spikes[["digit", "observed", "expected", "z"]].round(2).to_string(index=False))
 
-plt.tight_layout()
-plt.show()
+summation = results["digits"]["summation"].nlargest(5, "observed_prop")
+print("\nLargest first-two-digit groups by amount (summation test):")
+print(summation.round(4).to_string(index=False))
+
+# -------------------------------
+# GROUPED SCREENING
+# (per vendor, mess unit and month)
+# -------------------------------
+# One grouped bincount per grouping, chi-square / MAD for all groups at
+# once, Benjamini–Hochberg adjusted; groups too small to test are kept
+# in the table but never flagged. The groups × digits count matrices are
+# additive: they are summed over snapshot batches (digits straight from
+# int64 paise), or counted inside MySQL by a GROUP BY (push-down), so
+# the row-level table is never held in memory.
+if use_snapshot:
+    anomalies = grouped_counter.result()
+else:
+    anomalies = screen_counts(load_grouped_digit_counts(conn))
+
+print("\n--- GROUPED BENFORD SCREENING (FDR 5%) ---")
+print(f"Groups screened: {int(anomalies['tested'].sum())} "
+      f"(+{int((~anomalies['tested']).sum())} below minimum sample size)")
+print(f"Groups flagged: {int(anomalies['flagged'].sum())}")
+print(
+    anomalies.head(10)[["grouping", "group", "n", "chi2", "q_value", "mad", "conformity"]]
+             .round(4)
+             .to_string(index=False)
+)
+
+# -------------------------------
+# PLOT BENFORD DISTRIBUTION
+# -------------------------------
+# Rendered headlessly (rendering.py), no display needed
+submit(figure_spec(
+    "first_digit", "benford",
+    {"digits": digits, "expected": benford_probs * 100, "observed": benford_df["Observed_%"]},
+    title="Benford's Law Analysis of Mess Expenditure Data",
+    xlabel="First Digit",
+    ylabel="Percentage Frequency",
+    figsize=(8, 5),
+    section="benford",
+    grid={"axis": "y", "linestyle": "--", "alpha": 0.6}
+))
 
 # -------------------------------
 # CLOSE CONNECTION
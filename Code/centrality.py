@@ -0,0 +1,118 @@
+"""
+SPARSE CENTRALITY & CONCENTRATION METRICS
+IISER TVM Mess DWBI Project – Varsha 2025
+
+---------------------------------------------------
+WHY
+---------------------------------------------------
+network_analysis.py computed weighted degree by walking G.edges(node)
+for every node in Python and then walked the graph again for
+nx.degree_centrality.
+
+Everything here works on the bipartite vendor × mess weight matrix W
+from vendor_graph.bipartite_matrix, as vectorized row / column
+reductions:
+
+- degree             : non-zeros per row (vendor) / column (mess)
+- degree_centrality  : degree / (n_nodes - 1), same as nx.degree_centrality
+- weighted_degree    : row / column sums of W
+- share_of_mess_spend: W[i, j] / column sum j (vendor i's share of mess j)
+- HHI                : Σ_i share² per mess unit (Herfindahl–Hirschman
+                       index, 0–1; 1 = a single vendor supplies everything)
+"""
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from instrumentation import traced
+
+
+def _degree(W):
+    """Non-zero entries per row and per column."""
+    B = (W != 0).astype(np.int64)
+    return np.asarray(B.sum(axis=1)).ravel(), np.asarray(B.sum(axis=0)).ravel()
+
+
+def _inverse_column_totals(W):
+    """1 / mess-unit total spend (0 for mess units with no spend)."""
+    total = np.asarray(W.sum(axis=0)).ravel().astype(float)
+    return np.divide(1.0, total, out=np.zeros_like(total), where=total != 0)
+
+
+@traced("node_metrics")
+def node_metrics(W, vendors, messes):
+    """
+    One row per node: node, node_type, degree, degree_centrality,
+    weighted_degree, sorted by weighted_degree (descending).
+    """
+    v_deg, m_deg = _degree(W)
+    v_w = np.asarray(W.sum(axis=1)).ravel()
+    m_w = np.asarray(W.sum(axis=0)).ravel()
+
+    df = pd.DataFrame({
+        "node": np.concatenate([np.asarray(vendors), np.asarray(messes)]),
+        "node_type": ["vendor"] * len(vendors) + ["mess"] * len(messes),
+        "degree": np.concatenate([v_deg, m_deg]),
+        "weighted_degree": np.concatenate([v_w, m_w])
+    })
+
+    # A name on both sides is a single graph node (typed as mess)
+    df = (
+        df.groupby("node", sort=False)
+          .agg(node_type=("node_type", "last"),
+               degree=("degree", "sum"),
+               weighted_degree=("weighted_degree", "sum"))
+          .reset_index()
+    )
+
+    n_nodes = len(df)
+    df["degree_centrality"] = df["degree"] / (n_nodes - 1) if n_nodes > 1 else 0.0
+
+    return (
+        df[["node", "node_type", "degree", "degree_centrality", "weighted_degree"]]
+        .sort_values("weighted_degree", ascending=False)
+        .reset_index(drop=True)
+    )
+
+
+def vendor_shares(W, vendors, messes):
+    """
+    Long table of every non-zero edge with the vendor's share of that
+    mess unit's total spend.
+    """
+    A = W.tocoo()
+    inv = _inverse_column_totals(W)
+
+    shares = pd.DataFrame({
+        "vendor_name": np.asarray(vendors)[A.row],
+        "mess_unit_name": np.asarray(messes)[A.col],
+        "total_amount": A.data,
+        "share_of_mess_spend": A.data * inv[A.col]
+    })
+    return (
+        shares.sort_values(["mess_unit_name", "share_of_mess_spend"], ascending=[True, False])
+              .reset_index(drop=True)
+    )
+
+
+@traced("mess_concentration")
+def mess_concentration(W, vendors, messes):
+    """
+    Supplier concentration per mess unit: total spend, number of vendors,
+    largest single-vendor share and HHI.
+    """
+    mess_total = np.asarray(W.sum(axis=0)).ravel()
+    S = (W @ sparse.diags(_inverse_column_totals(W))).tocsc()
+
+    _, n_vendors = _degree(W)
+    hhi = np.asarray(S.multiply(S).sum(axis=0)).ravel()
+    top_share = S.max(axis=0).toarray().ravel()
+
+    return pd.DataFrame({
+        "mess_unit_name": np.asarray(messes),
+        "total_amount": mess_total,
+        "n_vendors": n_vendors,
+        "top_vendor_share": top_share,
+        "hhi": hhi
+    }).sort_values("hhi", ascending=False).reset_index(drop=True)
@@ -0,0 +1,249 @@
+"""
+COMMUNITY DETECTION WITH CACHING AND WARM START
+IISER TVM Mess DWBI Project – Varsha 2025
+
+---------------------------------------------------
+BACKENDS
+---------------------------------------------------
+"greedy"  : networkx greedy_modularity_communities (the original method;
+            slow on large graphs)
+"louvain" : networkx louvain_communities with a fixed seed (default)
+
+---------------------------------------------------
+CACHING
+---------------------------------------------------
+Results (communities + modularity_score) are stored as JSON under
+mess_cache/communities/ (MESS_CACHE_DIR overrides the root), keyed by a
+hash of the weighted edge list plus backend, seed and resolution. An
+unchanged edge list is never re-clustered.
+
+---------------------------------------------------
+WARM START
+---------------------------------------------------
+The last partition and its edge list are kept as well. When only a
+small fraction of edges changed (≤ WARM_START_MAX_CHANGE), the previous
+partition is reused: new nodes join their heaviest neighbour's community
+and the nodes touching changed edges are re-optimised with Louvain-style
+local moves (modularity gain), instead of clustering from scratch.
+"""
+
+import hashlib
+import json
+import os
+from collections import defaultdict
+
+import networkx as nx
+from networkx.algorithms.community import greedy_modularity_communities
+from networkx.algorithms.community.quality import modularity
+
+from instrumentation import traced
+
+CACHE_DIR = os.path.join(
+    os.environ.get(
+        "MESS_CACHE_DIR",
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "mess_cache")
+    ),
+    "communities"
+)
+
+SEED = 42
+RESOLUTION = 1.0
+WARM_START_MAX_CHANGE = 0.10
+MAX_LOCAL_PASSES = 10
+
+
+# -------------------------------------------------
+# 1. EDGE LIST HASH
+# -------------------------------------------------
+def _edge_weights(G, weight="weight"):
+    """{(u, v): weight} with u <= v, weights rounded to paise."""
+    edges = {}
+    for u, v, w in G.edges(data=weight, default=1.0):
+        a, b = sorted((str(u), str(v)))
+        edges[(a, b)] = round(float(w), 2)
+    return edges
+
+
+def edge_list_hash(G, weight="weight"):
+    """Stable SHA-256 of the weighted edge list."""
+    h = hashlib.sha256()
+    for (a, b), w in sorted(_edge_weights(G, weight).items()):
+        h.update(f"{a}\x1f{b}\x1f{w:.2f}\n".encode("utf-8"))
+    return h.hexdigest()
+
+
+# -------------------------------------------------
+# 2. BACKENDS
+# -------------------------------------------------
+def _run_backend(G, backend, seed, resolution, weight):
+    if backend == "greedy":
+        return list(greedy_modularity_communities(G, weight=weight, resolution=resolution))
+    if backend == "louvain":
+        return list(nx.community.louvain_communities(
+            G, weight=weight, resolution=resolution, seed=seed
+        ))
+    raise ValueError(f"Unknown community backend: {backend!r}")
+
+
+def _sorted(communities):
+    """Largest community first, as greedy_modularity_communities returns them."""
+    return sorted(
+        (set(c) for c in communities if c),
+        key=lambda c: (-len(c), sorted(map(str, c)))
+    )
+
+
+# -------------------------------------------------
+# 3. WARM START (LOCAL MOVES)
+# -------------------------------------------------
+def _local_moves(G, membership, nodes, resolution, weight):
+    """
+    Move each node in `nodes` to the neighbouring community with the
+    largest modularity gain; repeat (adding neighbours of moved nodes)
+    until nothing moves or MAX_LOCAL_PASSES is reached.
+    """
+    strength = dict(G.degree(weight=weight))
+    two_m = sum(strength.values())
+    if two_m == 0:
+        return membership
+
+    total = defaultdict(float)
+    for n, c in membership.items():
+        total[c] += strength[n]
+
+    queue = set(nodes)
+    for _ in range(MAX_LOCAL_PASSES):
+        moved = set()
+        for n in sorted(queue, key=str):
+            own = membership[n]
+            k = strength[n]
+
+            links = defaultdict(float)
+            for nbr, data in G[n].items():
+                if nbr != n:
+                    links[membership[nbr]] += data.get(weight, 1.0)
+
+            total[own] -= k
+            best, best_gain = own, links.get(own, 0.0) - resolution * k * total[own] / two_m
+            for c, w in links.items():
+                gain = w - resolution * k * total[c] / two_m
+                if gain > best_gain + 1e-12:
+                    best, best_gain = c, gain
+            total[best] += k
+
+            if best != own:
+                membership[n] = best
+                moved.add(n)
+
+        if not moved:
+            break
+        queue = set(moved)
+        for n in moved:
+            queue.update(G[n])
+
+    return membership
+
+
+def warm_start(G, previous, previous_edges, resolution=RESOLUTION, weight="weight"):
+    """
+    Update a previous partition for a slightly changed graph.
+
+    previous       : {node: community_id} from the last run
+    previous_edges : {(u, v): weight} the last run was computed on
+    """
+    edges = _edge_weights(G, weight)
+    changed = {e for e in set(edges) | set(previous_edges)
+               if edges.get(e) != previous_edges.get(e)}
+
+    membership = {n: previous[str(n)] for n in G if str(n) in previous}
+    next_id = max(previous.values(), default=-1) + 1
+
+    # New nodes: heaviest neighbour's community, else a community of their own
+    for n in G:
+        if n in membership:
+            continue
+        known = [
+            (d.get(weight, 1.0), membership[nbr])
+            for nbr, d in G[n].items() if nbr in membership
+        ]
+        if known:
+            membership[n] = max(known)[1]
+        else:
+            membership[n] = next_id
+            next_id += 1
+
+    endpoints = {x for e in changed for x in e}
+    touched = {n for n in G if str(n) in endpoints or str(n) not in previous}
+    membership = _local_moves(G, membership, touched, resolution, weight)
+
+    groups = defaultdict(set)
+    for n, c in membership.items():
+        groups[c].add(n)
+    return _sorted(groups.values())
+
+
+# -------------------------------------------------
+# 4. CACHED ENTRY POINT
+# -------------------------------------------------
+def _load(fn):
+    if not os.path.exists(fn):
+        return None
+    with open(fn, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save(fn, payload):
+    os.makedirs(os.path.dirname(fn), exist_ok=True)
+    tmp = fn + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(payload, f)
+    os.replace(tmp, fn)
+
+
+@traced("detect_communities")
+def detect_communities(G, backend="louvain", seed=SEED, resolution=RESOLUTION,
+                       weight="weight", cache_dir=CACHE_DIR, warm=True):
+    """
+    Communities and modularity score for G, reusing cached results.
+
+    Returns (communities, modularity_score, source) where source is
+    "cache", "warm_start" or the backend name.
+    """
+    key = f"{backend}-{seed}-{resolution}-{edge_list_hash(G, weight)}"
+    cached = _load(os.path.join(cache_dir, key + ".json"))
+
+    if cached is not None:
+        lookup = {str(n): n for n in G}
+        communities = [{lookup[n] for n in c} for c in cached["communities"]]
+        return communities, cached["modularity_score"], "cache"
+
+    latest = _load(os.path.join(cache_dir, f"latest-{backend}.json"))
+    communities = None
+    source = backend
+
+    if warm and latest is not None:
+        previous_edges = {tuple(e[:2]): e[2] for e in latest["edges"]}
+        edges = _edge_weights(G, weight)
+        changed = sum(
+            1 for e in set(edges) | set(previous_edges)
+            if edges.get(e) != previous_edges.get(e)
+        )
+        if changed <= WARM_START_MAX_CHANGE * max(len(edges), 1):
+            communities = warm_start(G, latest["membership"], previous_edges, resolution, weight)
+            source = "warm_start"
+
+    if communities is None:
+        communities = _sorted(_run_backend(G, backend, seed, resolution, weight))
+
+    score = modularity(G, communities, weight=weight, resolution=resolution)
+
+    _save(os.path.join(cache_dir, key + ".json"), {
+        "communities": [sorted(map(str, c)) for c in communities],
+        "modularity_score": score
+    })
+    _save(os.path.join(cache_dir, f"latest-{backend}.json"), {
+        "membership": {str(n): i for i, c in enumerate(communities) for n in c},
+        "edges": [[a, b, w] for (a, b), w in _edge_weights(G, weight).items()]
+    })
+
+    return communities, score, source
@@ -39,6 +39,56 @@ CREATE TABLE fact_expense (
     FOREIGN KEY (mess_unit_id) REFERENCES dim_mess_unit(mess_unit_id)
 );
 
+-- Covering Indexes (see query_builder.INDEX_DDL)
+-- Date-range reports filter d.full_date >= ? AND d.full_date < ? (served by
+-- the UNIQUE index on dim_date.full_date) and then join on date_id.
+CREATE INDEX idx_fact_date_mess_vendor_amount
+    ON fact_expense (date_id, mess_unit_id, vendor_id, amount);
+
+-- Vendor–mess aggregation for the network analysis
+CREATE INDEX idx_fact_vendor_mess_amount
+    ON fact_expense (vendor_id, mess_unit_id, amount);
+
+-- Verify with: python query_builder.py  (EXPLAIN of every report query)
+
+-- Vendor Entity Resolution (filled by vendor_dedup.py)
+-- Spelling variants of one supplier share a canonical name, kept here for
+-- SQL / BI queries. The Python analyses do not read it: network_analysis.py
+-- resolves the names of its own extract (vendor_dedup.resolve_vendors).
+ALTER TABLE dim_vendor
+    ADD COLUMN canonical_vendor_name VARCHAR(255),
+    ADD INDEX idx_vendor_canonical (canonical_vendor_name);
+
+-- Mess Groups (read by mess_units.py)
+-- MAIN_MESS / CAFE / ... as an attribute of the unit; NULL falls back to
+-- mess_groups.json (python mess_units.py --sync fills NULLs from it).
+ALTER TABLE dim_mess_unit
+    ADD COLUMN mess_group VARCHAR(20);
+
+-- Summary Tables (maintained by aggregates.py, see aggregates.AGG_DDL)
+-- Refreshed incrementally from fact rows above each table's watermark.
+CREATE TABLE agg_daily_mess_group (
+    date_id INT NOT NULL,
+    mess_unit_id INT NOT NULL,
+    total_amount DECIMAL(14,2) NOT NULL,
+    n_transactions INT NOT NULL,
+    PRIMARY KEY (date_id, mess_unit_id)
+);
+
+CREATE TABLE agg_vendor_mess_total (
+    vendor_id INT NOT NULL,
+    mess_unit_id INT NOT NULL,
+    total_amount DECIMAL(14,2) NOT NULL,
+    n_transactions INT NOT NULL,
+    PRIMARY KEY (vendor_id, mess_unit_id)
+);
+
+-- Largest fact_expense.expense_id folded into each summary table
+CREATE TABLE agg_watermark (
+    table_name VARCHAR(64) PRIMARY KEY,
+    max_expense_id INT NOT NULL
+);
+
 ---------------------------------------------------
 PYTHON ROLE
 ---------------------------------------------------
@@ -46,111 +96,191 @@ Python is used ONLY to:
 1. Extract data from the warehouse
 2. Clean and standardize text fields
 3. Remove invalid records
-4. Prepare analysis-ready datasets
+4. Prepare analysis-ready datasets in the typed layout of dataset.py
+   (int64 paise, int32 day ordinals, shared categorical names)
+5. Save the cleaned dataset as a local Parquet snapshot (snapshot.py)
+   so downstream scripts can skip the four-way join
+6. Keep that snapshot current incrementally: only fact rows above the
+   stored expense_id watermark are extracted, cleaned and merged
+   (python data_preprocessing.py --full rebuilds from scratch)
+7. Fold the same new fact rows into the summary tables above
+   (aggregates.refresh), which the analysis scripts read when fresh
 
-No warehouse creation or loading is done here.
+Apart from the summary tables, no warehouse creation or loading is
+done here.
 """
 
 import pandas as pd
-import mysql.connector
 
-# -------------------------------------------------
-# 1. Connect to MySQL Data Warehouse
-# -------------------------------------------------
+import aggregates
+from backend import connect
+from dataset import to_typed
+from instrumentation import traced
+from normalization import normalize_frame
+from query_builder import transactions_query
+from snapshot import SNAPSHOT_DIR, append_snapshot, init_snapshot, read_manifest
+from streaming import MAX_MEMORY_MB, chunksize_for_memory, iter_chunks
 
-conn = mysql.connector.connect(
-    host="localhost",
-    user="root",
-    password="..........",
-    database="mess_dw"
-)
 
 # -------------------------------------------------
 # 2. Extract Transaction-Level Data
 # -------------------------------------------------
 
-query = """
-SELECT
-    d.full_date,
-    v.vendor_name,
-    m.mess_unit_name,
-    f.amount
-FROM fact_expense f
-JOIN dim_date d ON f.date_id = d.date_id
-JOIN dim_vendor v ON f.vendor_id = v.vendor_id
-JOIN dim_mess_unit m ON f.mess_unit_id = m.mess_unit_id
-"""
+@traced("extract")
+def extract(conn, after_expense_id=None):
+    """
+    Pull fact_expense joined with all three dimensions.
 
-df = pd.read_sql(query, conn)
+    With after_expense_id set, only rows above that watermark are read
+    (incremental mode).
+    """
+    query, params = transactions_query(after_expense_id=after_expense_id)
+    return pd.read_sql(query, conn, params=params)
 
-# -------------------------------------------------
-# 3. Handle Missing Values
-# -------------------------------------------------
-# Missing values here represent INCOMPLETE TRANSACTIONS.
-# Imputation is NOT appropriate for identifiers or monetary values.
-# Hence, such records are removed.
 
-df = df.dropna(subset=[
-    "full_date",
-    "vendor_name",
-    "mess_unit_name",
-    "amount"
-])
+@traced("clean")
+def clean(df, aliases=None):
+    """
+    Steps 3–8: turn raw extracted rows into the analysis-ready dataset.
 
-# -------------------------------------------------
-# 4. Remove Invalid Expense Records
-# -------------------------------------------------
+    aliases defaults to the rules in name_aliases.json.
+    """
 
-df = df[df["amount"] > 0]
+    # -------------------------------------------------
+    # 3. Handle Missing Values
+    # -------------------------------------------------
+    # Missing values here represent INCOMPLETE TRANSACTIONS.
+    # Imputation is NOT appropriate for identifiers or monetary values.
+    # Hence, such records are removed.
 
-# -------------------------------------------------
-# 5. Standardize Text Fields
-# -------------------------------------------------
+    # (Only the columns present are checked, so pre-aggregated extracts
+    # such as vendor–mess totals can go through the same rules.)
 
-df["vendor_name"] = (
-    df["vendor_name"]
-    .str.strip()
-    .str.upper()
-)
+    df = df.dropna(subset=[c for c in [
+        "full_date",
+        "vendor_name",
+        "mess_unit_name",
+        "amount"
+    ] if c in df.columns])
 
-df["mess_unit_name"] = (
-    df["mess_unit_name"]
-    .str.strip()
-    .str.upper()
-)
+    # -------------------------------------------------
+    # 4. Remove Invalid Expense Records
+    # -------------------------------------------------
 
-# -------------------------------------------------
-# 6. Normalize Known Naming Variations
-# -------------------------------------------------
+    df = df[df["amount"] > 0].copy()
 
-df["mess_unit_name"] = df["mess_unit_name"].replace({
-    "CDH 1": "CDH-1",
-    "CDH I": "CDH-1",
-    "CDH-01": "CDH-1",
-    "CDH 2": "CDH-2",
-    "CDH II": "CDH-2",
-    "CDH-02": "CDH-2",
-    "CAFE-1": "CAFE",
-    "CAFE 1": "CAFE",
-    "CAFÉ": "CAFE"
-})
+    # -------------------------------------------------
+    # 5. Standardize Text Fields
+    # 6. Normalize Known Naming Variations
+    # -------------------------------------------------
+    # strip + upper-case + alias rules (name_aliases.json), evaluated once
+    # per distinct name on dictionary-encoded columns; the result columns
+    # are categorical.
 
-# -------------------------------------------------
-# 7. Date Formatting
-# -------------------------------------------------
+    df = normalize_frame(df, aliases=aliases)
 
-df["full_date"] = pd.to_datetime(df["full_date"])
+    # -------------------------------------------------
+    # 7. Typed Columns
+    # -------------------------------------------------
+    # Compact layout shared by every analysis (dataset.SCHEMA): int32 day
+    # ordinals instead of dates, int64 paise instead of Decimal objects,
+    # names as codes into the shared dictionaries.
 
-# -------------------------------------------------
-# 8. Final Clean Dataset
-# -------------------------------------------------
+    df = to_typed(df)
 
-df = df.sort_values("full_date").reset_index(drop=True)
+    # -------------------------------------------------
+    # 8. Final Clean Dataset
+    # -------------------------------------------------
 
-# -------------------------------------------------
-# 9. Close Connection
-# -------------------------------------------------
+    if "day" in df.columns:
+        df = df.sort_values("day", kind="stable")
+
+    df = df.reset_index(drop=True)
+
+    return df
+
+
+@traced("run_incremental")
+def run_incremental(conn, path=SNAPSHOT_DIR, max_memory_mb=MAX_MEMORY_MB):
+    """
+    Watermark-based load: extract and clean only fact rows newer than the
+    snapshot's max expense_id, then merge them into the snapshot.
+
+    Rows are streamed in chunks sized to max_memory_mb; each chunk is
+    cleaned and appended on its own, so peak memory stays bounded and
+    cost is proportional to the number of new rows, not the history.
+    Starts an empty snapshot when none exists yet.
+
+    The upper bound is read from fact_expense before extracting (as in
+    aggregates.refresh) and stored as the watermark at the end, so fact
+    rows the join drops (e.g. a NULL vendor_id) cannot hold it back.
+    """
+    manifest = read_manifest(path)
+    if manifest is None:
+        manifest = init_snapshot(path)
+
+    low = manifest["max_expense_id"]
+    high = aggregates.fact_watermark(conn)
+    if high <= low:
+        return manifest
+
+    query, params = transactions_query(after_expense_id=low, upto_expense_id=high)
+    chunksize = chunksize_for_memory(max_memory_mb)
+
+    for raw in iter_chunks(conn, query, params, chunksize):
+        # Watermark from the raw chunk: rows dropped by cleaning stay dropped
+        watermark = int(raw["expense_id"].max())
+        manifest = append_snapshot(clean(raw), watermark, path)
+
+    if manifest["max_expense_id"] < high:
+        manifest = append_snapshot(pd.DataFrame(), high, path)
+
+    return manifest
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Mess DW preprocessing")
+    parser.add_argument(
+        "--full", action="store_true",
+        help="re-extract and re-clean all history (and rebuild the summary "
+             "tables) instead of processing the new rows only"
+    )
+    args = parser.parse_args()
+
+    # -------------------------------------------------
+    # 1. Connect to MySQL Data Warehouse
+    # -------------------------------------------------
+
+    conn = connect()
+
+    # -------------------------------------------------
+    # 9. Save Columnar Snapshot
+    # -------------------------------------------------
+    # Month-partitioned Parquet + manifest; downstream scripts read this
+    # (memory-mapped) instead of re-running the join. By default only
+    # rows above the stored expense_id watermark are extracted and merged.
+
+    if args.full:
+        init_snapshot()
+    manifest = run_incremental(conn)
+
+    # -------------------------------------------------
+    # 10. Refresh Summary Tables
+    # -------------------------------------------------
+    # Same watermark idea inside MySQL: only new fact rows are added to
+    # agg_daily_mess_group / agg_vendor_mess_total.
+
+    folded = aggregates.refresh(conn, rebuild=args.full)
 
-conn.close()
+    # -------------------------------------------------
+    # 11. Close Connection
+    # -------------------------------------------------
 
+    conn.close()
 
+    print(f"Snapshot holds {manifest['row_count']} rows, "
+          f"max expense_id {manifest['max_expense_id']}")
+    for table, n in folded.items():
+        print(f"{table}: {n} new fact rows folded in")
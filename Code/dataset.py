@@ -0,0 +1,250 @@
+"""
+TYPED TRANSACTION DATASET
+IISER TVM Mess DWBI Project – Varsha 2025
+
+---------------------------------------------------
+WHY
+---------------------------------------------------
+After cleaning, every transaction row carried a Python str per name, a
+decimal.Decimal amount (MySQL DECIMAL(12,2)) and a datetime64 date.
+Object columns cost ~50–100 bytes per value and every sum over Decimal
+objects runs in the interpreter.
+
+clean(), the snapshot, the summary-table readers and the push-down
+loaders now all hand over the same compact layout, and the analyses
+(mess_analysis, benford, streaming aggregates, network) compute on it
+directly; dates and rupees are only produced for printing / plotting
+(for_display).
+
+---------------------------------------------------
+SCHEMA
+---------------------------------------------------
+    expense_id      int64     fact_expense key (incremental watermark)
+    day             int32     day ordinal: days since 1970-01-01
+    vendor_name     category  codes into the shared vendor dictionary
+    mess_unit_name  category  codes into the shared mess unit dictionary
+    amount_paise    int64     amount * 100, exact for DECIMAL(12,2)
+    n_transactions  int64     aggregated frames only (daily totals)
+
+Raw columns are converted by to_typed(): full_date -> day, amount ->
+amount_paise. Other columns pass through unchanged, so pre-aggregated
+extracts use the same rules as transaction rows.
+
+---------------------------------------------------
+SHARED DICTIONARIES
+---------------------------------------------------
+Each name column is categorical over ONE dictionary per process, so
+chunks, snapshot partitions and SQL extracts share a CategoricalDtype
+and concat / groupby / Series.add stay on integer codes. Dictionaries
+only grow (new names are appended), so a code never changes meaning.
+The snapshot persists them (_dictionaries.json) and every reader loads
+them first, so all processes of a report run use the same codes.
+"""
+
+import decimal
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+SCHEMA_VERSION = 2
+
+SCHEMA = {
+    "expense_id": "int64",
+    "day": "int32",
+    "vendor_name": "category",
+    "mess_unit_name": "category",
+    "amount_paise": "int64",
+    "n_transactions": "int64",
+}
+
+# Transaction-level columns, in snapshot order
+COLUMNS = ["expense_id", "day", "vendor_name", "mess_unit_name", "amount_paise"]
+
+DICTIONARY_COLUMNS = ("vendor_name", "mess_unit_name")
+DICTIONARY_FILE = "_dictionaries.json"
+
+EPOCH = np.datetime64("1970-01-01", "D")
+
+_dictionaries = {col: pd.Index([], dtype=object) for col in DICTIONARY_COLUMNS}
+_dtypes = {}
+
+
+# -------------------------------------------------
+# 1. DAYS & PAISE
+# -------------------------------------------------
+def day_ordinal(dates):
+    """int32 days since 1970-01-01 for dates / Timestamps / ISO strings."""
+    days = pd.to_datetime(pd.Series(dates)).to_numpy().astype("datetime64[D]")
+    return (days - EPOCH).astype(np.int32)
+
+
+def to_dates(days):
+    """datetime64 DatetimeIndex for day ordinals."""
+    return pd.to_datetime(np.asarray(days, dtype=np.int64), unit="D")
+
+
+def month_keys(days):
+    """"YYYY-MM" per day ordinal, formatted once per distinct day."""
+    distinct, inverse = np.unique(np.asarray(days), return_inverse=True)
+    return to_dates(distinct).strftime("%Y-%m").to_numpy(dtype=object)[inverse]
+
+
+def as_float(amounts):
+    """float64 array, same length as amounts; unparseable values are NaN."""
+    values = pd.Series(amounts)
+    try:
+        # Decimal / str objects convert through float() inside NumPy's C loop
+        return np.asarray(values, dtype=float)
+    except (TypeError, ValueError, decimal.InvalidOperation):
+        return pd.to_numeric(values, errors="coerce").to_numpy(dtype=float)
+
+
+def to_paise(amounts, invalid="raise"):
+    """
+    int64 paise for numeric / Decimal / numeric-string amounts (also in
+    exponent form: 1e-05, 0E-2).
+
+    Exact for DECIMAL(12,2): float64 carries 15+ significant digits and
+    the product is rounded to the nearest paisa. invalid is the policy
+    for missing, non-finite or unparseable values:
+
+      "raise" : ValueError (default). Typed tables must not lose or
+                invent rows; data_preprocessing.clean drops them first.
+      "zero"  : 0 paise, so the result keeps the input's length. Zero
+                has no leading digit, so Benford counts skip it.
+    """
+    if invalid not in ("raise", "zero"):
+        raise ValueError(f"Unknown invalid-amount policy: {invalid!r}")
+    values = as_float(amounts)
+    bad = ~np.isfinite(values)
+    if bad.any():
+        if invalid == "raise":
+            raise ValueError("Missing or non-finite amounts; clean the rows first")
+        values = np.where(bad, 0.0, values)
+    return np.rint(values * 100).astype(np.int64)
+
+
+def rupees(paise):
+    """float64 rupees for display and plotting."""
+    return np.asarray(paise, dtype=np.int64) / 100.0
+
+
+# -------------------------------------------------
+# 2. SHARED DICTIONARIES
+# -------------------------------------------------
+def dictionary_dtype(column):
+    """The CategoricalDtype of column's shared dictionary right now."""
+    if column not in _dtypes:
+        _dtypes[column] = pd.CategoricalDtype(_dictionaries[column])
+    return _dtypes[column]
+
+
+def _extend(column, names):
+    """Append names not in the dictionary yet; existing codes are kept."""
+    names = pd.Index(names, dtype=object).dropna()
+    new = names[_dictionaries[column].get_indexer(names) < 0].unique()
+    if len(new):
+        _dictionaries[column] = _dictionaries[column].append(new)
+        _dtypes.pop(column, None)
+
+
+def categorize(series, column):
+    """
+    series as a categorical over the shared dictionary of column. Names
+    are looked up once per distinct value; rows are remapped by code.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        if series.dtype == dictionary_dtype(column):
+            return series
+        codes, names = series.cat.codes.to_numpy(), series.cat.categories
+    else:
+        codes, names = pd.factorize(series)
+
+    _extend(column, names)
+    remap = _dictionaries[column].get_indexer(pd.Index(names, dtype=object))
+    new_codes = np.where(codes >= 0, remap[np.maximum(codes, 0)], -1)
+    return pd.Series(
+        pd.Categorical.from_codes(new_codes, dtype=dictionary_dtype(column)),
+        index=series.index,
+        name=series.name
+    )
+
+
+def load_dictionaries(path):
+    """
+    Merge the dictionaries stored in directory path into this process's:
+    stored names keep their codes, names only known here go after them.
+    """
+    fn = os.path.join(path, DICTIONARY_FILE)
+    if not os.path.exists(fn):
+        return
+    with open(fn, encoding="utf-8") as f:
+        stored = json.load(f)
+    for col in DICTIONARY_COLUMNS:
+        names = pd.Index(stored.get(col, []), dtype=object)
+        known = _dictionaries[col]
+        merged = names.append(known[names.get_indexer(known) < 0])
+        if not merged.equals(known):
+            _dictionaries[col] = merged
+            _dtypes.pop(col, None)
+
+
+def save_dictionaries(path):
+    """Write this process's dictionaries to directory path."""
+    tmp = os.path.join(path, DICTIONARY_FILE + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({col: _dictionaries[col].tolist() for col in DICTIONARY_COLUMNS},
+                  f, ensure_ascii=False)
+    os.replace(tmp, os.path.join(path, DICTIONARY_FILE))
+
+
+# -------------------------------------------------
+# 3. CONVERSION & CHECKS
+# -------------------------------------------------
+def to_typed(df):
+    """
+    df in the typed layout: full_date -> day, amount -> amount_paise,
+    names onto the shared dictionaries, schema columns cast to their
+    dtype. Already-typed frames only get their categories conformed.
+    """
+    out = {}
+    for col in df.columns:
+        if col == "full_date":
+            out["day"] = day_ordinal(df[col])
+        elif col == "amount":
+            out["amount_paise"] = to_paise(df[col])
+        elif col in DICTIONARY_COLUMNS:
+            out[col] = categorize(df[col], col)
+        elif col in SCHEMA:
+            out[col] = df[col].astype(SCHEMA[col])
+        else:
+            out[col] = df[col]
+    return pd.DataFrame(out, index=df.index)
+
+
+def validate(df, columns=None):
+    """Raise TypeError unless every schema column of df has its schema dtype."""
+    columns = [c for c in (columns or df.columns) if c in SCHEMA]
+    wrong = {
+        col: str(df[col].dtype) for col in columns
+        if (SCHEMA[col] == "category") != isinstance(df[col].dtype, pd.CategoricalDtype)
+        or (SCHEMA[col] != "category" and df[col].dtype != SCHEMA[col])
+    }
+    if wrong:
+        raise TypeError(f"Columns do not match dataset.SCHEMA: {wrong}")
+    return df
+
+
+def for_display(df):
+    """day -> full_date and amount_paise -> amount (rupees), for output only."""
+    out = {}
+    for col in df.columns:
+        if col == "day":
+            out["full_date"] = to_dates(df[col]).to_numpy()
+        elif col == "amount_paise":
+            out["amount"] = rupees(df[col])
+        else:
+            out[col] = df[col]
+    return pd.DataFrame(out, index=df.index)
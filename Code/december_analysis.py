@@ -1,104 +1,74 @@
-import mysql.connector
-import pandas as pd
-import matplotlib.pyplot as plt
+from anomaly import history_bounds, read_calendar
+from backend import connect
+from mess_analysis import analyse, date_range, month_report, semester_bounds
+from mess_units import group_lookup
+from push_down import load_daily_totals
+from rendering import figure_spec, submit
 
 # ---------------------------------
 # CONNECT TO MYSQL
 # ---------------------------------
-conn = mysql.connector.connect(
-    host="localhost",
-    user="root",
-    password="...........",
-    database="mess_dw"
-)
+conn = connect()
 
 print("Connected to MySQL successfully")
 
 # ---------------------------------
-# LOAD DECEMBER 2025 DATA
-# ---------------------------------
-query = """
-SELECT
-    d.full_date,
-    m.mess_unit_name,
-    v.vendor_name,
-    f.amount
-FROM fact_expense f
-JOIN dim_date d ON f.date_id = d.date_id
-JOIN dim_mess_unit m ON f.mess_unit_id = m.mess_unit_id
-JOIN dim_vendor v ON f.vendor_id = v.vendor_id
-WHERE MONTH(d.full_date) = 12
-  AND YEAR(d.full_date) = 2025
-"""
-
-df = pd.read_sql(query, conn)
+# LOAD DECEMBER 2025 DATA (+ HISTORY FOR SPIKES)
+# ---------------------------------
+# One semester-wide query, identical in every month script (so it runs
+# once under run_report.py); this month is sliced out of it.
+# Days before the month are the trailing history its high wastage
+# days are scored against (anomaly.py); month_report() drops them
+semester = semester_bounds()
+start, end = history_bounds(2025, 12)
+df = date_range(load_daily_totals(conn, *semester), start, end)
+# dim_mess_unit.mess_group, else mess_groups.json
+groups = group_lookup(conn)
+# dim_date.day_name / is_weekend
+calendar = date_range(read_calendar(conn, *semester), start, end)
+conn.close()
 
 # ---------------------------------
-# MAP MESS GROUPS
+# MONTH ANALYSIS (SHARED ENGINE)
 # ---------------------------------
-def map_mess_group(mess):
-    if mess in ["CDH-1", "CDH-2"]:
-        return "MAIN_MESS"
-    elif mess == "CAFE":
-        return "CAFE"
-    else:
-        return "UNKNOWN"
-
-df["mess_group"] = df["mess_unit_name"].apply(map_mess_group)
-
-# Remove UNKNOWN
-df = df[df["mess_group"] != "UNKNOWN"]
+# Mess group mapping and UNKNOWN removal happen inside analyse()
+report = month_report(analyse(df, groups=groups, calendar=calendar), 2025, 12)
 
 # ---------------------------------
 # DAILY TOTAL EXPENSE
 # ---------------------------------
-daily_df = (
-    df.groupby("full_date")["amount"]
-    .sum()
-    .reset_index()
-    .sort_values("full_date")
-)
+daily_df = report["daily"]
 
 print("\nDAILY TOTAL EXPENSE:")
-print(daily_df)
+print(daily_df[["full_date", "amount"]])
 
 # ---------------------------------
 # AVERAGE DAILY EXPENSE
 # ---------------------------------
-avg_daily_expense = daily_df["amount"].mean()
+avg_daily_expense = report["avg_daily_expense"]
 print("\nAVERAGE DAILY EXPENSE:")
 print(avg_daily_expense)
 
 # ---------------------------------
 # HIGH WASTAGE DAYS
 # ---------------------------------
-high_wastage_days = daily_df[daily_df["amount"] > avg_daily_expense]
+high_wastage_days = report["high_wastage_days"]
 
 print("\nHIGH WASTAGE DAYS:")
 print(high_wastage_days)
+if len(report["unscored_days"]):
+    print(f"Not scored (too little history): {len(report['unscored_days'])} days")
 
 # ---------------------------------
-# ESTIMATED WASTAGE (PROXY)
+# ESTIMATED WASTAGE (100 kg/day baseline)
 # ---------------------------------
-daily_df["estimated_wastage_kg"] = (
-    daily_df["amount"] / avg_daily_expense
-) * 100
-
 print("\nDAILY EXPENSE WITH ESTIMATED WASTAGE:")
 print(daily_df)
 
 # ---------------------------------
 # MESS vs CAFE COMPARISON
 # ---------------------------------
-group_avg = (
-    df.groupby("mess_group")["amount"]
-    .mean()
-    .reset_index()
-)
-
-group_avg["estimated_wastage_kg"] = (
-    group_avg["amount"] / avg_daily_expense
-) * 100
+group_avg = report["group_summary"]
 
 print("\nAVERAGE DAILY EXPENSE BY MESS GROUP:")
 print(group_avg)
@@ -106,25 +76,28 @@ print(group_avg)
 # ---------------------------------
 # PLOT 1: DAILY TOTAL EXPENSE vs DATE
 # ---------------------------------
-plt.figure(figsize=(10,5))
-plt.plot(daily_df["full_date"], daily_df["amount"], marker='o')
-plt.xticks(rotation=45)
-plt.xlabel("Date")
-plt.ylabel("Total Expense (Rs.)")
-plt.title("Daily Total Mess Expense — December 2025")
-plt.tight_layout()
-plt.show()
+# Queued as figure specs and rendered headlessly (rendering.py).
+submit(figure_spec(
+    "daily_total_expense", "line",
+    {"x": daily_df["full_date"], "y": daily_df["amount"]},
+    title="Daily Total Mess Expense — December 2025",
+    xlabel="Date",
+    ylabel="Total Expense (Rs.)",
+    figsize=(10, 5),
+    section="december",
+    marker="o",
+    xtick_rotation=45
+))
 
 # ---------------------------------
 # PLOT 2: ESTIMATED WASTAGE — MAIN MESS vs CAFE
 # ---------------------------------
-plt.figure(figsize=(6,4))
-plt.bar(
-    group_avg["mess_group"],
-    group_avg["estimated_wastage_kg"]
-)
-plt.xlabel("Mess Group")
-plt.ylabel("Estimated Wastage (kg/day)")
-plt.title("Estimated Food Wastage: Main Mess vs Café (December 2025)")
-plt.tight_layout()
-plt.show()
+submit(figure_spec(
+    "wastage_by_mess_group", "bar",
+    {"x": group_avg["mess_group"], "height": group_avg["estimated_wastage_kg"]},
+    title="Estimated Food Wastage: Main Mess vs Café (December 2025)",
+    xlabel="Mess Group",
+    ylabel="Estimated Wastage (kg/day)",
+    figsize=(6, 4),
+    section="december"
+))
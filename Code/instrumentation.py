@@ -0,0 +1,319 @@
+"""
+PIPELINE INSTRUMENTATION
+IISER TVM Mess DWBI Project – Varsha 2025
+
+---------------------------------------------------
+WHY
+---------------------------------------------------
+A slow report run could not be broken down: was it the SQL join, the
+pd.read_sql materialization, string cleaning, community detection, the
+layout or matplotlib? Every pipeline stage is now wrapped in a span:
+
+    with span("sql.execute") as s:         @traced("clean")
+        ...                                def clean(df, ...):
+        s.rows_out = n                         ...
+
+Each span records wall time, CPU time, rows in / out (taken from the
+first DataFrame argument and the DataFrame result for @traced) and the
+process's peak RSS, nested under the span that was open when it started.
+
+---------------------------------------------------
+MODES (MESS_TRACE)
+---------------------------------------------------
+""  / "0"      : off. span() returns one shared no-op object and @traced
+                 functions pay a single flag check per call
+"1"/"timing"   : spans as above
+"tracemalloc"  : + peak Python memory per span (tracemalloc; slower)
+"cprofile"     : + a cProfile of every top-level span, written to
+                 MESS_TRACE_DIR as .prof and summarised in the trace
+
+At the end of the run report() prints a summary table (per span name)
+and writes a JSON trace in Chrome trace-event format to MESS_TRACE_DIR
+(default ../mess_trace); open it in chrome://tracing or Perfetto.
+Scripts run on their own report at exit; run_report.py merges the spans
+of its worker processes and reports once.
+"""
+
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+import pandas as pd
+
+MODES = {"": None, "0": None, "1": "timing", "timing": "timing",
+         "tracemalloc": "tracemalloc", "cprofile": "cprofile"}
+TRACE_DIR = os.environ.get(
+    "MESS_TRACE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "mess_trace")
+)
+PROFILE_TOP = 10
+
+_mode = None
+_records = []
+_local = threading.local()
+_profiled = 0
+
+
+def peak_rss_mb():
+    """High-water resident set size of this process (None on Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 ** 2 if sys.platform == "darwin" else 1024)
+
+
+def _rows(obj):
+    shape = getattr(obj, "shape", None)
+    return int(shape[0]) if shape else None
+
+
+# -------------------------------------------------
+# 1. SPANS
+# -------------------------------------------------
+class Span:
+    """One timed stage; set rows_in / rows_out inside the block."""
+
+    def __init__(self, name, rows_in=None):
+        self.name = name
+        self.rows_in = rows_in
+        self.rows_out = None
+        self._child_peak = 0
+        self._profile = None
+
+    def __enter__(self):
+        stack = _stack()
+        self.parent = stack[-1] if stack else None
+        self.depth = len(stack)
+        stack.append(self)
+
+        if _mode == "tracemalloc":
+            # Save the parent's peak so far before resetting the counter
+            if self.parent is not None:
+                self.parent._child_peak = max(self.parent._child_peak,
+                                              tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        if _mode == "cprofile" and self.depth == 0:
+            import cProfile
+
+            self._profile = cProfile.Profile()
+            try:
+                self._profile.enable()
+            except ValueError:
+                # another profiler is active (python -m cProfile ...)
+                self._profile = None
+
+        # Epoch start, so spans from worker processes share one timeline
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self._cpu = time.process_time()
+        return self
+
+    def __exit__(self, *exc):
+        wall = time.perf_counter() - self.start
+        cpu = time.process_time() - self._cpu
+        if self._profile is not None:
+            self._profile.disable()
+        _stack().pop()
+
+        record = {
+            "name": self.name,
+            "parent": self.parent.name if self.parent else None,
+            "depth": self.depth,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "start": self.started_at,
+            "wall_s": wall,
+            "cpu_s": cpu,
+            "rows_in": self.rows_in,
+            "rows_out": self.rows_out,
+            "peak_rss_mb": peak_rss_mb(),
+        }
+        if _mode == "tracemalloc":
+            peak = max(self._child_peak, tracemalloc.get_traced_memory()[1])
+            record["peak_traced_mb"] = peak / 1024 ** 2
+            if self.parent is not None:
+                self.parent._child_peak = max(self.parent._child_peak, peak)
+        if self._profile is not None:
+            record.update(_save_profile(self._profile, self.name))
+        _records.append(record)
+        return False
+
+
+class _NoSpan:
+    """Shared stand-in while tracing is off; ignores everything."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+def _stack():
+    # Per thread, so backend.prefetch's worker threads nest correctly
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+def span(name, rows_in=None):
+    """Context manager timing one stage (a no-op while tracing is off)."""
+    if _mode is None:
+        return _NO_SPAN
+    return Span(name, rows_in)
+
+
+def traced(name=None):
+    """
+    Decorator form of span(). Rows in / out are the length of the first
+    DataFrame-like argument and of the result.
+    """
+    def decorate(func):
+        label = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _mode is None:
+                return func(*args, **kwargs)
+            rows_in = next((r for r in map(_rows, args) if r is not None), None)
+            with Span(label, rows_in) as s:
+                result = func(*args, **kwargs)
+                s.rows_out = _rows(result)
+            return result
+        return wrapper
+    return decorate
+
+
+def _save_profile(profile, name):
+    """Dump a cProfile to TRACE_DIR; returns {profile, top_functions}."""
+    import pstats
+
+    global _profiled
+    _profiled += 1
+    os.makedirs(TRACE_DIR, exist_ok=True)
+    path = os.path.join(TRACE_DIR, f"{name}-{os.getpid()}-{_profiled}.prof")
+    profile.dump_stats(path)
+
+    stats = pstats.Stats(profile)
+    top = sorted(stats.stats.items(), key=lambda kv: kv[1][3], reverse=True)[:PROFILE_TOP]
+    return {
+        "profile": path,
+        "top_functions": [
+            {"function": f"{fn}:{line}({func})", "calls": nc, "cumulative_s": ct}
+            for (fn, line, func), (_, nc, _, ct, _) in top
+        ],
+    }
+
+
+# -------------------------------------------------
+# 2. SWITCHING
+# -------------------------------------------------
+def enable(mode="timing"):
+    """Turn tracing on (see MODES); also sets MESS_TRACE for child processes."""
+    global _mode
+    _mode = MODES[mode]
+    os.environ["MESS_TRACE"] = mode
+    if _mode == "tracemalloc" and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def disable():
+    global _mode
+    _mode = None
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def enabled():
+    return _mode is not None
+
+
+# -------------------------------------------------
+# 3. TRACE & SUMMARY
+# -------------------------------------------------
+def drain():
+    """Return and forget the spans recorded so far in this process."""
+    records = list(_records)
+    _records.clear()
+    return records
+
+
+def add_records(records):
+    """Merge spans recorded in another process (run_report workers)."""
+    _records.extend(records)
+
+
+def _sum_rows(values):
+    # empty, not 0, for spans that never report rows
+    return values.sum(min_count=1)
+
+
+def summary(records=None):
+    """Spans aggregated per name, slowest first."""
+    df = pd.DataFrame(_records if records is None else records)
+    if df.empty:
+        return df
+    agg = {"calls": ("wall_s", "size"), "wall_s": ("wall_s", "sum"),
+           "cpu_s": ("cpu_s", "sum"), "rows_in": ("rows_in", _sum_rows),
+           "rows_out": ("rows_out", _sum_rows), "peak_rss_mb": ("peak_rss_mb", "max")}
+    if "peak_traced_mb" in df.columns:
+        agg["peak_traced_mb"] = ("peak_traced_mb", "max")
+    return (
+        df.groupby("name", sort=False).agg(**agg)
+          .sort_values("wall_s", ascending=False)
+          .reset_index()
+    )
+
+
+def write_trace(path=None, records=None):
+    """Chrome trace-event JSON of the spans; returns the path."""
+    records = _records if records is None else records
+    if path is None:
+        os.makedirs(TRACE_DIR, exist_ok=True)
+        path = os.path.join(TRACE_DIR, f"trace-{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}.json")
+    events = [
+        {
+            "name": r["name"], "ph": "X", "pid": r["pid"], "tid": r["tid"],
+            "ts": r["start"] * 1e6, "dur": r["wall_s"] * 1e6,
+            "args": {k: v for k, v in r.items()
+                     if k not in ("name", "pid", "tid", "start", "wall_s")},
+        }
+        for r in records
+    ]
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, default=str)
+    return path
+
+
+def report(path=None):
+    """Print the summary table, write the trace and clear the spans."""
+    if not _records:
+        return None
+    table = summary()
+    trace = write_trace(path)
+    _records.clear()
+
+    print("\n--- TRACE SUMMARY ---")
+    print(table.round(4).to_string(index=False))
+    print(f"Trace written to {os.path.abspath(trace)}")
+    return trace
+
+
+if MODES.get(os.environ.get("MESS_TRACE", "")):
+    enable(os.environ["MESS_TRACE"])
+    atexit.register(report)
@@ -0,0 +1,150 @@
+"""
+CACHED NETWORK LAYOUTS
+IISER TVM Mess DWBI Project – Varsha 2025
+
+---------------------------------------------------
+WHY
+---------------------------------------------------
+nx.spring_layout(G, seed=42, k=0.25) was recomputed from scratch on every
+run; at O(n²) per iteration it dominates once the vendor graph grows.
+
+---------------------------------------------------
+LAYOUT METHODS
+---------------------------------------------------
+"spring"      : nx.spring_layout (networkx switches to its sparse
+                Fruchterman–Reingold solver above 500 nodes)
+"forceatlas2" : nx.forceatlas2_layout (networkx >= 3.4); tends to
+                separate hub neighbourhoods more clearly than spring
+"bipartite"   : mess hubs in one column, vendors in the other; O(n),
+                the option for very large vendor sets
+"auto"        : spring up to AUTO_SPRING_MAX_NODES nodes, else bipartite
+
+---------------------------------------------------
+CACHE
+---------------------------------------------------
+Positions are stored under mess_cache/layouts/ keyed by a hash of the
+graph structure (nodes + weighted edges) and the layout parameters. The
+last layout per method is also kept: when nodes are added, the old
+positions seed the new layout (new nodes start at their neighbours'
+centroid) and only WARM_ITERATIONS are run.
+"""
+
+import hashlib
+import json
+import os
+
+import networkx as nx
+import numpy as np
+
+from communities import edge_list_hash
+from instrumentation import traced
+
+CACHE_DIR = os.path.join(
+    os.environ.get(
+        "MESS_CACHE_DIR",
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "mess_cache")
+    ),
+    "layouts"
+)
+
+SEED = 42
+SPRING_K = 0.25
+WARM_ITERATIONS = 15
+AUTO_SPRING_MAX_NODES = 2000
+
+
+def structure_hash(G, method, **params):
+    """Hash of nodes, weighted edges and layout parameters."""
+    h = hashlib.sha256()
+    h.update(method.encode())
+    h.update(json.dumps(params, sort_keys=True).encode())
+    for n in sorted(map(str, G.nodes())):
+        h.update(n.encode("utf-8") + b"\n")
+    h.update(edge_list_hash(G).encode())
+    return h.hexdigest()
+
+
+# -------------------------------------------------
+# 1. LAYOUT ALGORITHMS
+# -------------------------------------------------
+def _resolve(method, G):
+    if method != "auto":
+        return method
+    return "spring" if G.number_of_nodes() <= AUTO_SPRING_MAX_NODES else "bipartite"
+
+
+def _initial_positions(G, previous, seed):
+    """Old positions for known nodes, neighbour centroid (+ jitter) for new ones."""
+    rng = np.random.default_rng(seed)
+    pos = {n: np.asarray(previous[str(n)]) for n in G if str(n) in previous}
+    for n in G:
+        if n in pos:
+            continue
+        known = [pos[nbr] for nbr in G[n] if nbr in pos]
+        centre = np.mean(known, axis=0) if known else np.zeros(2)
+        pos[n] = centre + rng.normal(scale=0.05, size=2)
+    return pos
+
+
+def _run_layout(G, method, seed, init=None):
+    warm = init is not None
+    if method == "spring":
+        return nx.spring_layout(
+            G, seed=seed, k=SPRING_K, pos=init,
+            iterations=WARM_ITERATIONS if warm else 50
+        )
+    if method == "forceatlas2":
+        return nx.forceatlas2_layout(
+            G, pos=init, seed=seed, weight="weight",
+            max_iter=WARM_ITERATIONS if warm else 100
+        )
+    if method == "bipartite":
+        mess = [n for n, t in G.nodes(data="node_type") if t == "mess"]
+        return nx.bipartite_layout(G, mess)
+    raise ValueError(f"Unknown layout method: {method!r}")
+
+
+# -------------------------------------------------
+# 2. CACHED ENTRY POINT
+# -------------------------------------------------
+def _load(fn):
+    if not os.path.exists(fn):
+        return None
+    with open(fn, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save(fn, pos):
+    os.makedirs(os.path.dirname(fn), exist_ok=True)
+    tmp = fn + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({str(n): [float(x) for x in p] for n, p in pos.items()}, f)
+    os.replace(tmp, fn)
+
+
+@traced("compute_layout")
+def compute_layout(G, method="spring", seed=SEED, cache_dir=CACHE_DIR, warm=True):
+    """
+    Node positions for G, from cache when the structure is unchanged.
+
+    Returns (pos, source) where source is "cache", "warm_start" or the
+    layout method that was run.
+    """
+    method = _resolve(method, G)
+    key = structure_hash(G, method, seed=seed, k=SPRING_K)
+    fn = os.path.join(cache_dir, f"{method}-{key}.json")
+
+    cached = _load(fn)
+    if cached is not None and all(str(n) in cached for n in G):
+        return {n: np.asarray(cached[str(n)]) for n in G}, "cache"
+
+    latest = _load(os.path.join(cache_dir, f"latest-{method}.json"))
+    init = None
+    if warm and latest and method != "bipartite":
+        init = _initial_positions(G, latest, seed)
+
+    pos = _run_layout(G, method, seed, init)
+
+    _save(fn, pos)
+    _save(os.path.join(cache_dir, f"latest-{method}.json"), pos)
+    return pos, ("warm_start" if init is not None else method)
@@ -0,0 +1,239 @@
+"""
+SEMESTER ANALYSIS ENGINE
+IISER TVM Mess DWBI Project – Varsha 2025
+
+---------------------------------------------------
+PURPOSE
+---------------------------------------------------
+The month scripts (august ... december) used to open their own connection
+and re-run the same fact_expense ⋈ dim_date ⋈ dim_mess_unit join once per
+month. This module pulls the whole semester ONCE and derives every
+month-level result from that single extract in one grouped pass:
+
+1. Daily total expense (per month)
+2. Average daily expense (per month)
+3. High wastage days (spikes against the trailing same-season history,
+   see anomaly.py; no longer "above the monthly average")
+4. Estimated wastage (proxy, 100 kg/day baseline)
+5. Average expense and estimated wastage by mess group (the group is an
+   attribute of the mess unit, see mess_units.py)
+
+Any month or date range is then a cheap slice of the in-memory result.
+
+All results are derived from SUM / COUNT per day and mess unit, so
+analyse() accepts either transaction rows or those daily aggregates
+computed inside MySQL (push_down.load_daily_totals).
+
+Inputs are in the typed layout of dataset.py (day ordinals, int64
+paise, categorical mess units); sums run on int64 paise and the results
+are converted to dates and rupees once, per day.
+"""
+
+import pandas as pd
+
+from anomaly import LOOKBACK_DAYS, detect
+from data_preprocessing import clean
+from dataset import day_ordinal, for_display, to_dates
+from instrumentation import traced
+from mess_units import UNKNOWN, map_groups
+from query_builder import mess_transactions_query
+from snapshot import has_snapshot, is_fresh, read_snapshot
+
+# -------------------------------------------------
+# SEMESTER WINDOW (half-open: [start, end))
+# -------------------------------------------------
+SEMESTER_START = "2025-08-01"
+SEMESTER_END = "2026-01-01"
+
+# Baseline wastage assumed for an average day (kg)
+BASELINE_WASTAGE_KG = 100
+
+# -------------------------------------------------
+# 1. EXTRACT (ONE SCAN FOR THE WHOLE SEMESTER)
+# -------------------------------------------------
+@traced("load_semester")
+def load_semester(conn, start=SEMESTER_START, end=SEMESTER_END, use_snapshot=True):
+    """
+    Load every transaction in [start, end) with a single query.
+
+    If data_preprocessing.py has written a snapshot that is still fresh
+    (or conn is None), the rows are memory-mapped from Parquet instead
+    and MySQL is not queried at all. Either way the rows have been
+    through the same cleaning rules (data_preprocessing.clean).
+    """
+    if use_snapshot and has_snapshot() and (conn is None or is_fresh(conn)):
+        return read_snapshot(
+            start=start, end=end,
+            columns=["day", "mess_unit_name", "amount_paise"]
+        )
+
+    query, params = mess_transactions_query(start, end)
+    return clean(pd.read_sql(query, conn, params=params))
+
+
+def clean_daily_totals(df):
+    """
+    Daily totals read from SQL (push-down query or agg_daily_mess_group)
+    with the snapshot's name rules applied: spellings of one mess unit
+    that normalize to the same name are summed into one row.
+    """
+    return aggregate_daily(clean(df))
+
+
+def map_mess_groups(df, groups=None):
+    """
+    Attach a mess_group column (MAIN_MESS / CAFE / UNKNOWN).
+
+    groups is a mess_units.group_lookup() (dim_mess_unit.mess_group plus
+    mess_groups.json); by default the rule file alone. Mapped once per
+    distinct mess unit, rows by category code.
+    """
+    return df.assign(mess_group=map_groups(df["mess_unit_name"], groups))
+
+
+def aggregate_daily(df):
+    """
+    SUM(amount_paise) and COUNT(amount) per day and mess unit – the
+    pandas equivalent of query_builder.daily_mess_totals_query.
+    """
+    grouped = df.groupby(["day", "mess_unit_name"], observed=True)
+    if "n_transactions" in df.columns:
+        # Daily aggregates carry their own count
+        daily = grouped[["amount_paise", "n_transactions"]].sum()
+    else:
+        daily = grouped["amount_paise"].agg(amount_paise="sum", n_transactions="count")
+    return daily.reset_index()
+
+
+# -------------------------------------------------
+# 2. SINGLE GROUPED PASS OVER ALL MONTHS
+# -------------------------------------------------
+@traced("analyse")
+def analyse(df, drop_unknown=True, groups=None, calendar=None, start=None):
+    """
+    Compute the month-level results for every month present in df.
+
+    df is either transaction rows or daily aggregates (aggregate_daily /
+    a push-down query, recognised by the n_transactions column); every
+    result below is derived from the daily aggregates. groups: see
+    map_mess_groups. calendar: anomaly.read_calendar() (dim_date
+    day_name / is_weekend), by default derived from the dates.
+
+    high_wastage comes from anomaly.detect() over all days of df, so
+    load some history before the month to score its first days. Days
+    with too little same-season history to be scored get <NA> (nullable
+    boolean), not False. With start set, days before it are history
+    only: they seed the detector and are left out of every result.
+
+    Returns a dict of DataFrames, each carrying a "month" column
+    (pandas Period, e.g. 2025-10):
+      daily         -> full_date, amount, estimated_wastage_kg, high_wastage,
+                       baseline (rolling median), robust_z
+      monthly       -> avg_daily_expense
+      group_summary -> mess_group, amount, estimated_wastage_kg
+    """
+    # Idempotent on daily aggregates (n_transactions is summed)
+    df = aggregate_daily(df)
+
+    df = map_mess_groups(df, groups)
+
+    if drop_unknown:
+        df = df[df["mess_group"] != UNKNOWN]
+
+    df = df.assign(month=to_dates(df["day"]).to_period("M"))
+
+    # Daily totals for all months at once (int64 paise), then dates and
+    # rupees once per day
+    daily = (
+        df.groupby(["month", "day"], observed=True)["amount_paise"]
+          .sum()
+          .reset_index()
+    )
+
+    # Spikes against the trailing history, across month boundaries
+    scores = detect(daily[["day", "amount_paise"]], calendar)
+    daily = daily.merge(scores[["day", "rolling_median", "robust_z", "spike"]], on="day")
+    if start is not None:
+        first_day = day_ordinal([start])[0]
+        daily = daily[daily["day"] >= first_day]
+        df = df[df["day"] >= first_day]
+    daily = for_display(daily)
+    daily["baseline"] = daily.pop("rolling_median") / 100
+
+    # Monthly average of daily totals, broadcast back to each day
+    avg = daily.groupby("month", observed=True)["amount"].transform("mean")
+
+    daily["estimated_wastage_kg"] = (daily["amount"] / avg) * BASELINE_WASTAGE_KG
+    # Unscored (insufficient history) is <NA>, so it never reads as "no spike"
+    daily["high_wastage"] = daily.pop("spike").astype("boolean").mask(daily["robust_z"].isna())
+
+    monthly = (
+        daily.groupby("month", observed=True)["amount"]
+             .mean()
+             .rename("avg_daily_expense")
+             .reset_index()
+    )
+
+    # Average transaction amount by mess group, scaled by the month average
+    group_summary = (
+        df.groupby(["month", "mess_group"], observed=True)[["amount_paise", "n_transactions"]]
+          .sum()
+          .reset_index()
+    )
+    group_summary["amount"] = (
+        group_summary.pop("amount_paise") / 100 / group_summary.pop("n_transactions")
+    )
+    group_summary = group_summary.merge(monthly, on="month")
+    group_summary["estimated_wastage_kg"] = (
+        group_summary["amount"] / group_summary["avg_daily_expense"]
+    ) * BASELINE_WASTAGE_KG
+    group_summary = group_summary.drop(columns="avg_daily_expense")
+
+    return {
+        "daily": daily,
+        "monthly": monthly,
+        "group_summary": group_summary
+    }
+
+
+# -------------------------------------------------
+# 3. SLICING RESULTS
+# -------------------------------------------------
+def month_report(result, year, month):
+    """Pick one month out of an analyse() result."""
+    period = pd.Period(year=year, month=month, freq="M")
+
+    daily = result["daily"]
+    daily = daily[daily["month"] == period].drop(columns="month")
+    daily = daily.reset_index(drop=True)
+
+    monthly = result["monthly"]
+    avg = monthly.loc[monthly["month"] == period, "avg_daily_expense"]
+
+    group_summary = result["group_summary"]
+    group_summary = group_summary[group_summary["month"] == period]
+    group_summary = group_summary.drop(columns="month").reset_index(drop=True)
+
+    return {
+        "daily": daily[["full_date", "amount", "estimated_wastage_kg"]],
+        "avg_daily_expense": avg.iloc[0] if len(avg) else float("nan"),
+        "high_wastage_days": daily.loc[daily["high_wastage"].fillna(False),
+                                       ["full_date", "amount", "baseline", "robust_z"]],
+        "unscored_days": daily.loc[daily["high_wastage"].isna(), ["full_date", "amount"]],
+        "group_summary": group_summary
+    }
+
+
+def semester_bounds(start=SEMESTER_START, end=SEMESTER_END, lookback_days=LOOKBACK_DAYS):
+    """
+    [start of the history the semester's first month is scored against,
+    end of the semester): the one range every month script loads.
+    """
+    return ((pd.Timestamp(start) - pd.Timedelta(days=lookback_days)).date(),
+            pd.Timestamp(end).date())
+
+
+def date_range(df, start, end):
+    """Restrict an already-loaded extract to [start, end) without re-querying."""
+    lo, hi = day_ordinal([start, end])
+    return df[(df["day"] >= lo) & (df["day"] < hi)]
@@ -0,0 +1,204 @@
+"""
+MESS UNIT DIMENSION: MESS GROUPS
+IISER TVM Mess DWBI Project – Varsha 2025
+
+---------------------------------------------------
+WHY
+---------------------------------------------------
+The MAIN_MESS / CAFE / UNKNOWN grouping was a dict in mess_analysis.py
+(MESS_GROUPS), so a new mess unit or a regrouping needed a code change,
+and dirty spellings in daily totals read straight from the warehouse
+("CDH 1", "Café") silently fell into UNKNOWN.
+
+The group is now an attribute of the mess unit:
+
+1. dim_mess_unit.mess_group  (column DDL in data_preprocessing.py)
+2. mess_groups.json           for units whose mess_group is NULL, or
+                              when the column does not exist yet
+                              (override with MESS_GROUPS_FILE)
+3. UNKNOWN                    everything else (admin / cash vouchers)
+
+Both sources are keyed by the normalized name (strip + upper-case +
+name_aliases.json), so raw warehouse spellings and cleaned snapshot
+names land in the same group.
+
+---------------------------------------------------
+MAPPING
+---------------------------------------------------
+group_lookup() builds {normalized unit name: group} once. map_groups()
+resolves each CATEGORY of the mess_unit_name column (a few units) and
+maps rows by their category code, so the cost is O(distinct units)
+plus one NumPy take over the codes; no Python call per row.
+
+Regroup with an UPDATE on dim_mess_unit or by editing mess_groups.json;
+`python mess_units.py --sync` copies the rule file into the NULL
+mess_group entries of dim_mess_unit.
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from normalization import load_aliases, normalize_names
+from query_builder import PLACEHOLDER
+
+GROUPS_FILE = os.environ.get(
+    "MESS_GROUPS_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "mess_groups.json")
+)
+
+UNKNOWN = "UNKNOWN"
+
+
+# -------------------------------------------------
+# 1. SOURCES
+# -------------------------------------------------
+def load_group_rules(path=GROUPS_FILE):
+    """{canonical mess unit name: group} from the rule file."""
+    with open(path, encoding="utf-8") as f:
+        rules = json.load(f)
+    return rules["mess_group"]
+
+
+def mess_groups_query():
+    """dim_mess_unit rows with their mess_group attribute."""
+    return "SELECT mess_unit_name, mess_group FROM dim_mess_unit", ()
+
+
+def has_group_column(conn):
+    """True once dim_mess_unit has the mess_group column."""
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT mess_group FROM dim_mess_unit WHERE 1 = 0")
+        cur.fetchall()
+        return True
+    except Exception:
+        # column (or table) not created yet
+        return False
+    finally:
+        cur.close()
+
+
+def read_mess_groups(conn):
+    """
+    mess_unit_name, mess_group for every dim_mess_unit row with a group
+    set; empty when the column does not exist.
+    """
+    if not has_group_column(conn):
+        return pd.DataFrame(columns=["mess_unit_name", "mess_group"])
+    query, params = mess_groups_query()
+    df = pd.read_sql(query, conn, params=params)
+    return df.dropna(subset=["mess_group"])
+
+
+def _canonical(names):
+    """Normalized names (normalization.py rules) as a list of str."""
+    aliases = load_aliases().get("mess_unit_name")
+    return normalize_names(pd.Series(names, dtype=object), aliases).astype(str).tolist()
+
+
+def group_lookup(conn=None, path=GROUPS_FILE):
+    """
+    {normalized mess unit name: group} as a Series: dim_mess_unit first
+    (when conn is given), the rule file for units without a group there.
+    """
+    lookup = pd.Series(load_group_rules(path), dtype=object)
+    if conn is not None:
+        dim = read_mess_groups(conn)
+        if len(dim):
+            from_dim = pd.Series(dim["mess_group"].to_numpy(), index=_canonical(dim["mess_unit_name"]))
+            from_dim = from_dim[~from_dim.index.duplicated()]
+            lookup = from_dim.combine_first(lookup)
+    return lookup.rename("mess_group")
+
+
+# -------------------------------------------------
+# 2. MAPPING BY CATEGORY CODE
+# -------------------------------------------------
+def map_groups(names, lookup=None):
+    """
+    mess_group for each row of a mess_unit_name Series, as a categorical
+    Series on the same index. Only the distinct units are looked up.
+    """
+    if lookup is None:
+        lookup = group_lookup()
+    if not isinstance(names.dtype, pd.CategoricalDtype):
+        names = names.astype("category")
+
+    units = names.cat.categories
+    per_unit = lookup.reindex(_canonical(units)).fillna(UNKNOWN).to_numpy(dtype=object)
+
+    group_codes, groups = pd.factorize(np.append(per_unit, UNKNOWN))
+    codes = names.cat.codes.to_numpy()
+    # code -1 (missing unit) takes the trailing UNKNOWN entry
+    row_codes = group_codes[np.where(codes >= 0, codes, len(units))]
+
+    return pd.Series(
+        pd.Categorical.from_codes(row_codes, categories=groups),
+        index=names.index,
+        name="mess_group"
+    )
+
+
+def unit_groups(names, lookup=None):
+    """One row per distinct unit name: mess_unit_name, mess_group."""
+    units = pd.Series(pd.unique(pd.Series(names).dropna()), name="mess_unit_name")
+    return pd.DataFrame({
+        "mess_unit_name": units,
+        "mess_group": map_groups(units, lookup).astype(str)
+    })
+
+
+# -------------------------------------------------
+# 3. WRITING THE DIMENSION
+# -------------------------------------------------
+def sync_dimension(conn, path=GROUPS_FILE):
+    """
+    Fill NULL dim_mess_unit.mess_group from the rule file; units the rule
+    file does not know stay NULL. Returns the number of rows updated.
+    """
+    cur = conn.cursor()
+    cur.execute("SELECT mess_unit_name FROM dim_mess_unit WHERE mess_group IS NULL")
+    names = [row[0] for row in cur.fetchall()]
+
+    rules = load_group_rules(path)
+    updates = [
+        (rules[canonical], name)
+        for name, canonical in zip(names, _canonical(names))
+        if canonical in rules
+    ]
+    if updates:
+        cur.executemany(
+            f"UPDATE dim_mess_unit SET mess_group = {PLACEHOLDER} "
+            f"WHERE mess_unit_name = {PLACEHOLDER}",
+            updates
+        )
+    conn.commit()
+    cur.close()
+    return len(updates)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from backend import connect
+
+    parser = argparse.ArgumentParser(description="Mess unit -> mess group mapping")
+    parser.add_argument("--sync", action="store_true",
+                        help="write mess_groups.json into NULL dim_mess_unit.mess_group")
+    args = parser.parse_args()
+
+    conn = connect()
+
+    if args.sync:
+        print(f"dim_mess_unit rows updated: {sync_dimension(conn)}")
+
+    cur = conn.cursor()
+    cur.execute("SELECT mess_unit_name FROM dim_mess_unit")
+    names = [row[0] for row in cur.fetchall()]
+    cur.close()
+
+    print(unit_groups(names, group_lookup(conn)).to_string(index=False))
+    conn.close()
@@ -2,53 +2,69 @@
 # Mess–Vendor Network Analysis (Varsha 2025)
 # =========================
 
-import mysql.connector
+import os
+
 import pandas as pd
-import networkx as nx
-import matplotlib.pyplot as plt
-from networkx.algorithms.community import greedy_modularity_communities
-from networkx.algorithms.community.quality import modularity
+
+import aggregates
+from backend import connect
+from query_builder import vendor_mess_totals_query
+from data_preprocessing import clean
+from snapshot import has_snapshot, is_fresh, iter_snapshot
+from streaming import EdgeWeights, chunksize_for_memory, iter_chunks
+from vendor_dedup import apply_mapping, resolve_vendors
+from vendor_graph import bipartite_matrix, build_graph
+from centrality import mess_concentration, node_metrics, vendor_shares
+from communities import detect_communities
+from layout import compute_layout
+from rendering import figure_spec, submit
 
 # -------------------------
 # 1. DATABASE CONNECTION
 # -------------------------
-conn = mysql.connector.connect(
-    host="localhost",
-    user="root",
-    password="...........",
-    database="mess_dw"
-)
-
-query = """
-SELECT
-    v.vendor_name,
-    m.mess_unit_name,
-    SUM(f.amount) AS total_amount
-FROM fact_expense f
-JOIN dim_vendor v ON f.vendor_id = v.vendor_id
-JOIN dim_mess_unit m ON f.mess_unit_id = m.mess_unit_id
-GROUP BY v.vendor_name, m.mess_unit_name
-"""
-
-df = pd.read_sql(query, conn)
+conn = connect()
+
+# Read the agg_vendor_mess_total summary table when it is fresh (one row
+# per edge). Otherwise aggregate the cleaned snapshot when it is up to
+# date, or let the warehouse do the GROUP BY and stream its result in
+# bounded chunks. Rows are name-normalised before being summed, so
+# spelling variants of one mess unit / vendor end up on the same edge.
+weights = EdgeWeights()
+
+if aggregates.is_fresh(conn, ["agg_vendor_mess_total"]):
+    edges = aggregates.read_vendor_mess_totals(conn)
+    weights.update(clean(edges.rename(columns={"total_amount": "amount"})))
+elif has_snapshot() and is_fresh(conn):
+    columns = ["vendor_name", "mess_unit_name", "amount_paise"]
+    for chunk in iter_snapshot(columns=columns, batch_size=chunksize_for_memory()):
+        weights.update(chunk)
+else:
+    query, params = vendor_mess_totals_query()
+    for chunk in iter_chunks(conn, query, params, chunksize_for_memory()):
+        weights.update(clean(chunk.rename(columns={"total_amount": "amount"})))
+
+df = weights.result()
 conn.close()
 
+# Merge spelling variants of one supplier into a single vendor node
+# (blocked fuzzy matching, see vendor_dedup.py) and re-sum their edges.
+vendor_spend = df.groupby("vendor_name", observed=True)["total_amount"].sum()
+vendor_mapping = resolve_vendors(vendor_spend.index, weights=vendor_spend)
+df = (
+    apply_mapping(df, vendor_mapping)
+    .groupby(["vendor_name", "mess_unit_name"], observed=True)["total_amount"]
+    .sum()
+    .reset_index()
+)
+
 # -------------------------
 # 2. BUILD WEIGHTED GRAPH
 # -------------------------
-G = nx.Graph()
-
-for _, row in df.iterrows():
-    vendor = row["vendor_name"]
-    mess = row["mess_unit_name"]
-    weight = row["total_amount"]
-
-    # Add nodes with type
-    G.add_node(vendor, node_type="vendor")
-    G.add_node(mess, node_type="mess")
+# Bulk build from the aggregated edge list (no per-row add_node/add_edge)
+G = build_graph(df)
 
-    # Add weighted edge
-    G.add_edge(vendor, mess, weight=weight)
+# Sparse vendor × mess weight matrix for loop-free per-node metrics
+W, vendor_index, mess_index = bipartite_matrix(df)
 
 print(f"\nTotal nodes: {G.number_of_nodes()}")
 print(f"Total edges: {G.number_of_edges()}")
@@ -56,30 +72,37 @@ print(f"Total edges: {G.number_of_edges()}")
 # -------------------------
 # 3. CENTRALITY METRICS
 # -------------------------
-degree_centrality = nx.degree_centrality(G)
-
-weighted_degree = {
-    node: sum(data["weight"] for _, _, data in G.edges(node, data=True))
-    for node in G.nodes()
-}
-
-centrality_df = pd.DataFrame({
-    "node": list(G.nodes()),
-    "degree_centrality": [degree_centrality[n] for n in G.nodes()],
-    "weighted_degree": [weighted_degree[n] for n in G.nodes()]
-}).sort_values(by="weighted_degree", ascending=False)
+# Vectorized row / column reductions over the vendor × mess matrix:
+# degree, degree centrality (as nx.degree_centrality) and weighted degree
+centrality_df = node_metrics(W, vendor_index, mess_index)
 
 print("\nTop high-dependency nodes:")
 print(centrality_df.head(10))
 
+# Supplier concentration per mess unit (share of spend, HHI)
+concentration_df = mess_concentration(W, vendor_index, mess_index)
+
+print("\nSupplier concentration by mess unit (HHI):")
+print(concentration_df)
+
+# Each vendor's share of the mess unit's spend, largest first per unit
+shares_df = vendor_shares(W, vendor_index, mess_index)
+
+print("\nLargest vendor shares of mess unit spend:")
+print(shares_df.groupby("mess_unit_name", sort=False).head(3).to_string(index=False))
+
 # -------------------------
 # 4. COMMUNITY DETECTION
 # -------------------------
-communities = list(greedy_modularity_communities(G, weight="weight"))
-
-modularity_score = modularity(G, communities, weight="weight")
+# Seeded Louvain by default (MESS_COMMUNITY_BACKEND=greedy for the old
+# greedy modularity method); results are cached per edge-list hash and
+# warm-started from the last partition when only a few edges changed.
+communities, modularity_score, community_source = detect_communities(
+    G, backend=os.environ.get("MESS_COMMUNITY_BACKEND", "louvain")
+)
 
-print(f"\nModularity score: {modularity_score:.3f}")
+print(f"\nCommunity detection: {community_source}")
+print(f"Modularity score: {modularity_score:.3f}")
 print(f"Number of communities: {len(communities)}")
 
 for i, c in enumerate(communities):
@@ -98,73 +121,47 @@ colors = [community_map[n] for n in G.nodes()]
 # -------------------------
 # 6. NETWORK VISUALIZATION
 # -------------------------
-plt.figure(figsize=(14, 10))
-pos = nx.spring_layout(G, seed=42, k=0.25)
-
-nx.draw_networkx_edges(
-    G, pos,
-    alpha=0.3,
-    width=0.8
-)
-
-nodes = nx.draw_networkx_nodes(
-    G, pos,
-    node_color=colors,
-    cmap=plt.cm.tab10,
-    node_size=140,
-    alpha=0.9
-)
-
-plt.title(
-    f"Community Structure of Mess–Vendor Network (Varsha 2025)\n"
-    f"Modularity Score = {modularity_score:.3f}",
-    fontsize=14
-)
-
-# -------------------------
-# 7. COMMUNITY LEGEND
-# -------------------------
-handles = []
-for i in range(len(communities)):
-    handles.append(
-        plt.Line2D(
-            [0], [0],
-            marker='o',
-            linestyle='',
-            color=plt.cm.tab10(i),
-            label=f"Community {i}"
-        )
-    )
-
-plt.legend(
-    handles=handles,
-    title="Detected Communities",
-    loc="best",
-    fontsize=10
-)
-
-plt.axis("off")
-plt.tight_layout()
-plt.show()
-
-# -------------------------
-# 8. TOP FINANCIAL DEPENDENCY BARPLOT
+# Cached per graph structure, warm-started when nodes are added.
+# MESS_LAYOUT=bipartite / forceatlas2 / auto for large vendor graphs.
+pos, layout_source = compute_layout(G, method=os.environ.get("MESS_LAYOUT", "spring"))
+print(f"\nLayout: {layout_source}")
+
+# Queued as a figure spec and rendered headlessly (rendering.py); the
+# community legend is drawn by the "network" renderer.
+submit(figure_spec(
+    "network_communities", "network",
+    {
+        "nodes": list(G.nodes()),
+        "edges": list(G.edges()),
+        "pos": {n: tuple(p) for n, p in pos.items()},
+        "colors": colors,
+        "n_communities": len(communities),
+    },
+    title=(
+        f"Community Structure of Mess–Vendor Network (Varsha 2025)\n"
+        f"Modularity Score = {modularity_score:.3f}"
+    ),
+    figsize=(14, 10),
+    section="network",
+    title_size=14
+))
+
+# -------------------------
+# 7. TOP FINANCIAL DEPENDENCY BARPLOT
 # -------------------------
 top_nodes = centrality_df.head(10)
 
-plt.figure(figsize=(8, 5))
-plt.barh(
-    top_nodes["node"],
-    top_nodes["weighted_degree"]
-)
-plt.xlabel("Total Expense (₹)")
-plt.title("Top Financial Dependency Nodes (Varsha 2025)")
-plt.gca().invert_yaxis()
-plt.tight_layout()
-plt.show()
+submit(figure_spec(
+    "top_dependency_nodes", "barh",
+    {"y": top_nodes["node"], "width": top_nodes["weighted_degree"]},
+    title="Top Financial Dependency Nodes (Varsha 2025)",
+    xlabel="Total Expense (₹)",
+    figsize=(8, 5),
+    section="network"
+))
 
 # -------------------------
-# 9. INTERPRETATION SUMMARY
+# 8. INTERPRETATION SUMMARY
 # -------------------------
 print("\nINTERPRETATION:")
 print("- High modularity → strong separation between mess ecosystems")
@@ -0,0 +1,102 @@
+"""
+DICTIONARY-ENCODED NAME NORMALIZATION
+IISER TVM Mess DWBI Project – Varsha 2025
+
+---------------------------------------------------
+WHY
+---------------------------------------------------
+Steps 5/6 of data_preprocessing.py used to run .str.strip().str.upper()
+and an alias .replace() over every row, although the warehouse only has
+a few hundred distinct vendors and a handful of mess units.
+
+Here each column is dictionary-encoded first (codes + distinct values),
+the string rules run once per DISTINCT value, and the row codes are
+mapped onto the normalized dictionary. Cleaning cost scales with
+cardinality, not with the number of transactions.
+
+---------------------------------------------------
+ALIAS RULES
+---------------------------------------------------
+name_aliases.json (override with MESS_ALIASES_FILE) maps known spelling
+variants to canonical names per column, e.g.
+
+    "mess_unit_name": {"CDH 1": "CDH-1", "CAFÉ": "CAFE", ...}
+
+Keys are matched after strip + upper-case.
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import traced
+
+ALIASES_FILE = os.environ.get(
+    "MESS_ALIASES_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "name_aliases.json")
+)
+
+
+def load_aliases(path=ALIASES_FILE):
+    """Return {column: {variant: canonical}} from the rule file."""
+    with open(path, encoding="utf-8") as f:
+        rules = json.load(f)
+    return {col: mapping for col, mapping in rules.items() if not col.startswith("_")}
+
+
+def _encode(series):
+    """(codes, distinct values) for a Series; missing values get code -1."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy(), series.cat.categories
+    codes, uniques = pd.factorize(series)
+    return codes, pd.Index(uniques)
+
+
+def map_distinct(series, func):
+    """
+    Apply func to the distinct values of series (as a str Series) and map
+    the rows onto the result. Returns a categorical Series, same index.
+    """
+    codes, uniques = _encode(series)
+
+    names = func(pd.Series(uniques.astype(str), dtype=object))
+
+    # Several raw values may collapse onto one result value
+    remap, categories = pd.factorize(pd.Series(names, dtype=object))
+    new_codes = np.where(codes >= 0, remap[np.maximum(codes, 0)], -1)
+
+    return pd.Series(
+        pd.Categorical.from_codes(new_codes, categories=categories),
+        index=series.index,
+        name=series.name
+    )
+
+
+def normalize_names(series, aliases=None):
+    """
+    Strip, upper-case and alias-map a name column, once per distinct value.
+
+    Returns a categorical Series (same index) whose categories are the
+    normalized names.
+    """
+    def rules(names):
+        names = names.str.strip().str.upper()
+        if aliases:
+            names = names.replace(aliases)
+        return names
+
+    return map_distinct(series, rules)
+
+
+@traced("normalize_frame")
+def normalize_frame(df, columns=("vendor_name", "mess_unit_name"), aliases=None):
+    """Apply normalize_names to every listed column present in df."""
+    if aliases is None:
+        aliases = load_aliases()
+    df = df.copy()
+    for col in columns:
+        if col in df.columns:
+            df[col] = normalize_names(df[col], aliases.get(col))
+    return df
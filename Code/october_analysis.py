@@ -1,115 +1,83 @@
-import mysql.connector
-import pandas as pd
-import matplotlib.pyplot as plt
+from anomaly import history_bounds, read_calendar
+from backend import connect
+from mess_analysis import analyse, date_range, month_report, semester_bounds
+from mess_units import group_lookup, unit_groups
+from push_down import load_daily_totals
+from rendering import figure_spec, submit
 
 # --------------------------------
 # CONNECT TO MYSQL
 # --------------------------------
-conn = mysql.connector.connect(
-    host="localhost",
-    user="root",
-    password="..........",
-    database="mess_dw"
-)
+conn = connect()
 
 print("Connected to MySQL successfully")
 
 # --------------------------------
-# LOAD OCTOBER 2025 DATA ONLY
+# LOAD OCTOBER 2025 DATA (+ HISTORY FOR SPIKES)
 # --------------------------------
-query = """
-SELECT
-    d.full_date,
-    m.mess_unit_name,
-    v.vendor_name,
-    f.amount
-FROM fact_expense f
-JOIN dim_date d ON f.date_id = d.date_id
-JOIN dim_mess_unit m ON f.mess_unit_id = m.mess_unit_id
-JOIN dim_vendor v ON f.vendor_id = v.vendor_id
-WHERE MONTH(d.full_date) = 10
-  AND YEAR(d.full_date) = 2025
-ORDER BY d.full_date
-"""
-
-df = pd.read_sql(query, conn)
+# Daily totals per mess unit come from the agg_daily_mess_group summary
+# table when it is fresh, otherwise they are aggregated inside MySQL
+# (push-down); with MESS_PUSH_DOWN=0 the rows are grouped in pandas.
+# One semester-wide query, identical in every month script (so it runs
+# once under run_report.py); this month is sliced out of it.
+# Days before the month are the trailing history its high wastage
+# days are scored against (anomaly.py); month_report() drops them
+semester = semester_bounds()
+start, end = history_bounds(2025, 10)
+df = date_range(load_daily_totals(conn, *semester), start, end)
+# Mess groups come from dim_mess_unit.mess_group (mess_groups.json for
+# units without one), so regrouping needs no code change
+groups = group_lookup(conn)
+# dim_date.day_name / is_weekend
+calendar = date_range(read_calendar(conn, *semester), start, end)
+conn.close()
 
 # --------------------------------
-# MAP MESS GROUP
+# MONTH ANALYSIS (SHARED ENGINE)
 # --------------------------------
-def map_mess_group(mess):
-    if mess in ["CDH-1", "CDH-2"]:
-        return "MAIN_MESS"
-    elif mess == "CAFE":
-        return "CAFE"
-    else:
-        return "UNKNOWN"
-
-df["mess_group"] = df["mess_unit_name"].apply(map_mess_group)
-
-# REMOVE UNKNOWN (ADMIN / CASH VOUCHERS)
-df = df[df["mess_group"] != "UNKNOWN"]
+# Mess group mapping, UNKNOWN removal (admin / cash vouchers), daily
+# totals, high wastage days and the wastage proxy all come from
+# mess_analysis so every month is computed the same way.
+report = month_report(analyse(df, groups=groups, calendar=calendar), 2025, 10)
 
 print("\nMess group mapping:")
-print(df[["mess_unit_name", "mess_group"]].drop_duplicates())
+print(unit_groups(df["mess_unit_name"], groups))
 
 # --------------------------------
 # DAILY TOTAL EXPENSE
 # --------------------------------
-daily_expense = (
-    df.groupby("full_date")["amount"]
-      .sum()
-      .reset_index()
-)
+daily_expense = report["daily"]
 
 print("\nDAILY TOTAL EXPENSE:")
-print(daily_expense)
+print(daily_expense[["full_date", "amount"]])
 
 # --------------------------------
 # AVERAGE DAILY EXPENSE (MONTH)
 # --------------------------------
-avg_daily_expense = daily_expense["amount"].mean()
+avg_daily_expense = report["avg_daily_expense"]
 print("\nAVERAGE DAILY EXPENSE:")
 print(avg_daily_expense)
 
 # --------------------------------
-# HIGH WASTAGE DAYS (ABOVE AVERAGE)
+# HIGH WASTAGE DAYS (SPIKES VS ROLLING HISTORY)
 # --------------------------------
-high_wastage_days = daily_expense[
-    daily_expense["amount"] > avg_daily_expense
-]
+high_wastage_days = report["high_wastage_days"]
 
 print("\nHIGH WASTAGE DAYS:")
 print(high_wastage_days)
+if len(report["unscored_days"]):
+    print(f"Not scored (too little history): {len(report['unscored_days'])} days")
 
 # --------------------------------
 # ESTIMATED WASTAGE (PROXY)
 # --------------------------------
-daily_expense["estimated_wastage_kg"] = (
-    daily_expense["amount"] / avg_daily_expense
-) * 100
-
 print("\nDAILY EXPENSE WITH ESTIMATED WASTAGE:")
 print(daily_expense)
 
-# --------------------------------
-# AVERAGE DAILY EXPENSE BY MESS GROUP
-# --------------------------------
-group_summary = (
-    df.groupby("mess_group")["amount"]
-      .mean()
-      .reset_index()
-)
-
-print("\nAVERAGE DAILY EXPENSE BY MESS GROUP:")
-print(group_summary)
-
 # --------------------------------
 # ESTIMATED WASTAGE BY MESS GROUP
 # --------------------------------
-group_summary["estimated_wastage_kg"] = (
-    group_summary["amount"] / avg_daily_expense
-) * 100
+group_summary = report["group_summary"]
 
 print("\nESTIMATED WASTAGE BY MESS GROUP:")
 print(group_summary)
@@ -117,46 +85,45 @@ print(group_summary)
 # --------------------------------
 # PLOT 1: DATE vs TOTAL EXPENSE
 # --------------------------------
-plt.figure(figsize=(8,4))
-plt.plot(
-    daily_expense["full_date"],
-    daily_expense["amount"],
-    marker="o"
-)
-plt.xlabel("Date")
-plt.ylabel("Total Expense (₹)")
-plt.title("October 2025: Daily Total Mess Expense")
-plt.xticks(rotation=45)
-plt.tight_layout()
-plt.show()
+# Figures are queued as specs and rendered headlessly (rendering.py):
+# in one batch under run_report.py, or straight to report_output/.
+submit(figure_spec(
+    "daily_total_expense", "line",
+    {"x": daily_expense["full_date"], "y": daily_expense["amount"]},
+    title="October 2025: Daily Total Mess Expense",
+    xlabel="Date",
+    ylabel="Total Expense (₹)",
+    figsize=(8, 4),
+    section="october",
+    marker="o",
+    xtick_rotation=45
+))
 
 # --------------------------------
 # PLOT 2: DATE vs ESTIMATED WASTAGE
 # --------------------------------
-plt.figure(figsize=(8,4))
-plt.plot(
-    daily_expense["full_date"],
-    daily_expense["estimated_wastage_kg"],
-    marker="o"
-)
-plt.xlabel("Date")
-plt.ylabel("Estimated Wastage (kg)")
-plt.title("October 2025: Estimated Daily Food Wastage")
-plt.xticks(rotation=45)
-plt.tight_layout()
-plt.show()
+submit(figure_spec(
+    "daily_estimated_wastage", "line",
+    {"x": daily_expense["full_date"], "y": daily_expense["estimated_wastage_kg"]},
+    title="October 2025: Estimated Daily Food Wastage",
+    xlabel="Date",
+    ylabel="Estimated Wastage (kg)",
+    figsize=(8, 4),
+    section="october",
+    marker="o",
+    xtick_rotation=45
+))
 
 # --------------------------------
 # PLOT 3: BAR PLOT – ESTIMATED WASTAGE
 # MAIN MESS vs CAFE
 # --------------------------------
-plt.figure(figsize=(6,4))
-plt.bar(
-    group_summary["mess_group"],
-    group_summary["estimated_wastage_kg"]
-)
-plt.xlabel("Mess Group")
-plt.ylabel("Estimated Wastage (kg/day)")
-plt.title("October 2025: Estimated Food Wastage – Main Mess vs Café")
-plt.tight_layout()
-plt.show()
+submit(figure_spec(
+    "wastage_by_mess_group", "bar",
+    {"x": group_summary["mess_group"], "height": group_summary["estimated_wastage_kg"]},
+    title="October 2025: Estimated Food Wastage – Main Mess vs Café",
+    xlabel="Mess Group",
+    ylabel="Estimated Wastage (kg/day)",
+    figsize=(6, 4),
+    section="october"
+))
@@ -0,0 +1,181 @@
+"""
+PUSH-DOWN AGGREGATION
+IISER TVM Mess DWBI Project – Varsha 2025
+
+---------------------------------------------------
+WHY
+---------------------------------------------------
+The month scripts fetched every transaction row just to groupby
+full_date in pandas, and benford_analysis.py fetched every amount just
+to count digits. With push-down the aggregation runs inside MySQL and
+only the aggregates cross the wire:
+
+    daily totals    -> SUM / COUNT per (day, mess_unit_name)
+                       (query_builder.daily_mess_totals_query)
+    digit histogram -> COUNT / SUM per (leading two digits of the
+                       amount in paise, last two rupee digits)
+                       (query_builder.digit_histogram_query)
+    grouped digits  -> COUNT per (vendor, mess unit, month, first digit)
+                       (query_builder.grouped_digit_query)
+
+Mess units are mapped to mess groups in Python on the aggregated rows,
+so the group mapping stays in one place (mess_analysis); vendor and mess
+names of grouped rows go through the same normalization as clean().
+
+When the agg_daily_mess_group summary table is fresh (aggregates.py),
+load_daily_totals reads it instead of aggregating fact_expense at all.
+
+---------------------------------------------------
+FALLBACK & CHECK
+---------------------------------------------------
+push_down=False computes the same aggregates in pandas / NumPy from the
+row-level extract (mess_analysis.load_semester, streaming.iter_chunks),
+chunk by chunk where the result is additive.
+verify_push_down() runs both paths and raises AssertionError if they
+disagree; tests/test_push_down.py runs the same comparison on a small
+synthetic warehouse (DuckDB and SQLite) under pytest.
+
+MESS_PUSH_DOWN=0 disables push-down by default.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+import aggregates
+from benford import (
+    SCREENING_GROUPS, TESTS, digit_histogram, group_labels, histogram_from_groups
+)
+from instrumentation import traced
+from mess_analysis import (
+    SEMESTER_END, SEMESTER_START, aggregate_daily, clean_daily_totals, load_semester
+)
+from normalization import normalize_frame
+from query_builder import (
+    amounts_query, daily_mess_totals_query, digit_histogram_query, grouped_digit_query,
+    transactions_query
+)
+from streaming import GroupedDigitCounts, chunksize_for_memory, iter_chunks, iter_clean_chunks
+
+PUSH_DOWN = os.environ.get("MESS_PUSH_DOWN", "1") != "0"
+
+
+# -------------------------------------------------
+# 1. DAILY TOTALS (mess_analysis)
+# -------------------------------------------------
+@traced("load_daily_totals")
+def load_daily_totals(conn, start=SEMESTER_START, end=SEMESTER_END, push_down=PUSH_DOWN,
+                      use_aggregates=True):
+    """
+    day, mess_unit_name, amount_paise, n_transactions (dataset.SCHEMA)
+    for [start, end); mess_analysis.analyse accepts the result directly.
+
+    Read from agg_daily_mess_group when that summary table is fresh
+    (aggregates.py), otherwise aggregated from fact_expense. Every path
+    applies the snapshot's cleaning rules (mess_analysis.clean_daily_totals).
+    """
+    if use_aggregates and aggregates.is_fresh(conn, ["agg_daily_mess_group"]):
+        return aggregates.read_daily_totals(conn, start, end)
+
+    if not push_down:
+        return aggregate_daily(load_semester(conn, start, end, use_snapshot=False))
+
+    query, params = daily_mess_totals_query(start, end)
+    return clean_daily_totals(pd.read_sql(query, conn, params=params))
+
+
+# -------------------------------------------------
+# 2. DIGIT HISTOGRAM (benford_analysis)
+# -------------------------------------------------
+@traced("load_digit_histogram")
+def load_digit_histogram(conn, start=None, end=None, push_down=PUSH_DOWN):
+    """
+    benford.digit_histogram() of the positive amounts in [start, end);
+    pass the result to benford.tests_from_histogram.
+    """
+    if push_down:
+        query, params = digit_histogram_query(start, end)
+        return histogram_from_groups(pd.read_sql(query, conn, params=params))
+
+    query, params = amounts_query(start, end)
+    hist = digit_histogram([])
+    for chunk in iter_chunks(conn, query, params, chunksize_for_memory()):
+        part = digit_histogram(chunk["amount"])
+        hist["counts"] += part["counts"]
+        hist["sums"] += part["sums"]
+    return hist
+
+
+# -------------------------------------------------
+# 3. GROUPED DIGIT COUNTS (benford_analysis screening)
+# -------------------------------------------------
+@traced("load_grouped_digit_counts")
+def load_grouped_digit_counts(conn, start=None, end=None, push_down=PUSH_DOWN):
+    """
+    {grouping: first-digit count matrix} per vendor, mess unit and month
+    in [start, end); pass the result to benford.screen_counts.
+    """
+    if not push_down:
+        query, params = transactions_query(start, end)
+        counter = GroupedDigitCounts()
+        for chunk in iter_clean_chunks(conn, query, params, chunksize_for_memory()):
+            counter.update(chunk)
+        return counter.counts
+
+    query, params = grouped_digit_query(start, end)
+    rows = normalize_frame(pd.read_sql(query, conn, params=params))
+    rows["month"] = (rows["year"].astype(int).astype(str) + "-"
+                     + rows["month"].astype(int).astype(str).str.zfill(2))
+    rows["digit"] = rows["digit"].astype(int)
+    rows["n"] = rows["n"].astype(np.int64)
+
+    digits, _ = TESTS["first"]
+    counts = {}
+    for grouping, by in SCREENING_GROUPS.items():
+        matrix = (rows.groupby(by + ["digit"], observed=True)["n"].sum()
+                      .unstack("digit", fill_value=0)
+                      .reindex(columns=digits, fill_value=0))
+        matrix.index = pd.Index(group_labels(matrix.index), name="group")
+        counts[grouping] = matrix.sort_index()
+    return counts
+
+
+# -------------------------------------------------
+# 4. PUSH-DOWN VS PANDAS CHECK
+# -------------------------------------------------
+def verify_push_down(conn, start=SEMESTER_START, end=SEMESTER_END):
+    """Assert that both paths give the same aggregates; returns True."""
+    keys = ["day", "mess_unit_name"]
+    pushed = load_daily_totals(conn, start, end, push_down=True, use_aggregates=False)
+    local = load_daily_totals(conn, start, end, push_down=False, use_aggregates=False)
+    pd.testing.assert_frame_equal(
+        pushed.sort_values(keys).reset_index(drop=True),
+        local.sort_values(keys).reset_index(drop=True)[pushed.columns],
+        check_dtype=False,
+        check_categorical=False,
+        check_exact=True
+    )
+
+    pushed = load_digit_histogram(conn, start, end, push_down=True)
+    local = load_digit_histogram(conn, start, end, push_down=False)
+    np.testing.assert_array_equal(pushed["counts"], local["counts"])
+    np.testing.assert_allclose(pushed["sums"], local["sums"], rtol=1e-9)
+
+    pushed = load_grouped_digit_counts(conn, start, end, push_down=True)
+    local = load_grouped_digit_counts(conn, start, end, push_down=False)
+    for grouping in SCREENING_GROUPS:
+        pd.testing.assert_frame_equal(pushed[grouping], local[grouping].sort_index(),
+                                      check_dtype=False, check_names=False)
+    return True
+
+
+if __name__ == "__main__":
+    from backend import connect
+
+    conn = connect()
+
+    verify_push_down(conn)
+    print("Push-down and pandas aggregates agree")
+
+    conn.close()
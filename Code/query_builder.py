@@ -0,0 +1,312 @@
+"""
+QUERY BUILDER FOR THE mess_dw WAREHOUSE
+IISER TVM Mess DWBI Project – Varsha 2025
+
+---------------------------------------------------
+WHY
+---------------------------------------------------
+Filtering with MONTH(d.full_date) = 10 AND YEAR(d.full_date) = 2025 wraps
+the column in functions, so MySQL cannot use the UNIQUE index on
+dim_date.full_date and ends up scanning dim_date and fact_expense in full.
+
+Every analysis module builds its SQL here instead. Date filters are
+emitted as half-open ranges on the bare column
+
+    d.full_date >= %s AND d.full_date < %s
+
+with the bounds passed as bound parameters, which the optimizer can turn
+into an index range scan.
+
+---------------------------------------------------
+INDEX PLAN (see also data_preprocessing.py)
+---------------------------------------------------
+INDEX_DDL below lists the composite / covering indexes the queries in this
+module are written against. EXPLAIN-based checks (check_index_usage) show
+whether MySQL actually picks them.
+"""
+
+import datetime
+
+import pandas as pd
+
+# mysql.connector uses the "format" paramstyle; backend.EmbeddedConnection
+# rewrites it to "?" for DuckDB / SQLite.
+PLACEHOLDER = "%s"
+
+# -------------------------------------------------
+# INDEX DDL
+# -------------------------------------------------
+# dim_date.full_date is already UNIQUE; InnoDB secondary indexes carry the
+# primary key, so (full_date) -> date_id is covered without a new index.
+INDEX_DDL = [
+    # Date-range reports: join on date_id, then mess unit / vendor / amount
+    # all come from the index, the clustered rows are never touched.
+    """
+    CREATE INDEX idx_fact_date_mess_vendor_amount
+        ON fact_expense (date_id, mess_unit_id, vendor_id, amount)
+    """,
+    # Vendor–mess network aggregation (GROUP BY vendor, mess_unit)
+    """
+    CREATE INDEX idx_fact_vendor_mess_amount
+        ON fact_expense (vendor_id, mess_unit_id, amount)
+    """
+]
+
+# -------------------------------------------------
+# JOIN FRAGMENTS
+# -------------------------------------------------
+JOINS = {
+    "d": "JOIN dim_date d ON f.date_id = d.date_id",
+    "v": "JOIN dim_vendor v ON f.vendor_id = v.vendor_id",
+    "m": "JOIN dim_mess_unit m ON f.mess_unit_id = m.mess_unit_id"
+}
+
+
+# The cleaning rules of data_preprocessing.clean, as predicates: rows the
+# snapshot drops (missing date / vendor / mess unit / amount, amount <= 0)
+# are dropped by every report query too, so the snapshot, SQL, push-down
+# and summary-table paths all see the same transactions.
+CLEAN_PREDICATES = [
+    "d.full_date IS NOT NULL",
+    "v.vendor_name IS NOT NULL",
+    "m.mess_unit_name IS NOT NULL",
+    "f.amount > 0"
+]
+
+
+def month_bounds(year, month):
+    """Half-open [first day of month, first day of next month)."""
+    start = datetime.date(year, month, 1)
+    if month == 12:
+        end = datetime.date(year + 1, 1, 1)
+    else:
+        end = datetime.date(year, month + 1, 1)
+    return start, end
+
+
+def date_range_predicate(column="d.full_date"):
+    """Sargable half-open range on a bare column (two placeholders)."""
+    return f"{column} >= {PLACEHOLDER} AND {column} < {PLACEHOLDER}"
+
+
+def _joins_for(columns):
+    """Pick the dimension joins needed by the aliases used in columns."""
+    aliases = {c.split(".", 1)[0].strip() for c in columns if "." in c}
+    return [JOINS[a] for a in ("d", "m", "v") if a in aliases]
+
+
+def build_select(columns, start=None, end=None, where=None, where_params=(),
+                 group_by=None, order_by=None, extra_joins=()):
+    """
+    Build a SELECT over fact_expense f and the dimensions it needs.
+
+    columns     : list of select expressions, e.g. ["d.full_date", "f.amount"]
+    start/end   : optional half-open date range on d.full_date
+    where       : optional list of extra predicates
+    where_params: values for any placeholders used in `where`, in order
+
+    Returns (sql, params) ready for pd.read_sql(sql, conn, params=params).
+    """
+    clauses = []
+    params = []
+
+    joins = _joins_for(list(columns) + list(where or []) + list(group_by or []))
+    if start is not None or end is not None:
+        if JOINS["d"] not in joins:
+            joins.insert(0, JOINS["d"])
+
+    if start is not None and end is not None:
+        clauses.append(date_range_predicate())
+        params += [start, end]
+    elif start is not None:
+        clauses.append(f"d.full_date >= {PLACEHOLDER}")
+        params.append(start)
+    elif end is not None:
+        clauses.append(f"d.full_date < {PLACEHOLDER}")
+        params.append(end)
+
+    clauses += list(where or [])
+    params += list(where_params)
+
+    sql = "SELECT\n    " + ",\n    ".join(columns) + "\nFROM fact_expense f"
+    for j in list(joins) + list(extra_joins):
+        sql += "\n" + j
+    if clauses:
+        sql += "\nWHERE " + "\n  AND ".join(clauses)
+    if group_by:
+        sql += "\nGROUP BY " + ", ".join(group_by)
+    if order_by:
+        sql += "\nORDER BY " + ", ".join(order_by)
+
+    return sql, tuple(params)
+
+
+# -------------------------------------------------
+# QUERIES USED BY THE ANALYSIS MODULES
+# -------------------------------------------------
+def transactions_query(start=None, end=None, after_expense_id=None,
+                       upto_expense_id=None):
+    """
+    Cleaning input for data_preprocessing.py.
+
+    after_expense_id is the incremental-load watermark: only fact rows
+    with a larger expense_id (newer AUTO_INCREMENT keys) are returned,
+    which the PRIMARY KEY turns into a range scan. upto_expense_id closes
+    the range, so rows inserted during the load wait for the next one.
+    """
+    where, where_params = [], ()
+    if after_expense_id is not None:
+        where.append(f"f.expense_id > {PLACEHOLDER}")
+        where_params += (after_expense_id,)
+    if upto_expense_id is not None:
+        where.append(f"f.expense_id <= {PLACEHOLDER}")
+        where_params += (upto_expense_id,)
+
+    # Ordered by the key so a chunked (streaming) load can advance the
+    # watermark chunk by chunk.
+    return build_select(
+        ["f.expense_id", "d.full_date", "v.vendor_name", "m.mess_unit_name", "f.amount"],
+        start, end,
+        where=where, where_params=where_params,
+        order_by=["f.expense_id"]
+    )
+
+
+def mess_transactions_query(start, end):
+    """Month / semester input for mess_analysis.py."""
+    return build_select(
+        ["d.full_date", "m.mess_unit_name", "f.amount"],
+        start, end,
+        where=CLEAN_PREDICATES,
+        order_by=["d.full_date"]
+    )
+
+
+def amounts_query(start=None, end=None):
+    """Positive payment amounts for benford_analysis.py."""
+    return build_select(["f.amount"], start, end, where=CLEAN_PREDICATES)
+
+
+def daily_mess_totals_query(start=None, end=None):
+    """
+    Push-down input for mess_analysis.py: SUM and COUNT per day and mess
+    unit, computed in MySQL (a few hundred rows per semester).
+    """
+    return build_select(
+        ["d.full_date", "m.mess_unit_name",
+         "COALESCE(SUM(f.amount), 0) AS amount", "COUNT(f.amount) AS n_transactions"],
+        start, end,
+        where=CLEAN_PREDICATES,
+        group_by=["d.full_date", "m.mess_unit_name"],
+        order_by=["d.full_date"]
+    )
+
+
+# Amount in integer paise, as text. Integer paise has no leading zeros,
+# so SUBSTR gives exact leading digits; FLOOR(LOG10(x)) can be off by one
+# at exact powers of ten in floating point.
+PAISE_TEXT = "CAST(CAST(ROUND(f.amount * 100) AS SIGNED INTEGER) AS CHAR)"
+
+
+def digit_histogram_query(start=None, end=None):
+    """
+    Push-down input for benford_analysis.py: COUNT and SUM per leading
+    two digits (one digit for amounts below ₹0.10) and last two rupee
+    digits (-1 below ₹10). At most ~9,000 rows, whatever the fact size.
+    """
+    return build_select(
+        [f"SUBSTR({PAISE_TEXT}, 1, 2) AS lead_digits",
+         "CASE WHEN f.amount >= 10 THEN MOD(FLOOR(f.amount), 100) ELSE -1 END AS last_two",
+         "COUNT(*) AS n",
+         "SUM(f.amount) AS amount"],
+        start, end,
+        where=CLEAN_PREDICATES,
+        group_by=["lead_digits", "last_two"]
+    )
+
+
+def grouped_digit_query(start=None, end=None):
+    """
+    Push-down input for the grouped Benford screening: COUNT per vendor,
+    mess unit, month and leading digit of the amount in paise. At most
+    nine rows per vendor–mess–month, whatever the fact size.
+    """
+    keys = ["v.vendor_name", "m.mess_unit_name", "d.year", "d.month"]
+    return build_select(
+        keys + [f"SUBSTR({PAISE_TEXT}, 1, 1) AS digit", "COUNT(*) AS n"],
+        start, end,
+        where=CLEAN_PREDICATES,
+        group_by=keys + ["digit"]
+    )
+
+
+def vendor_mess_totals_query(start=None, end=None):
+    """Edge list for network_analysis.py."""
+    return build_select(
+        ["v.vendor_name", "m.mess_unit_name", "SUM(f.amount) AS total_amount"],
+        start, end,
+        where=CLEAN_PREDICATES,
+        group_by=["v.vendor_name", "m.mess_unit_name"]
+    )
+
+
+# -------------------------------------------------
+# EXPLAIN-BASED INDEX CHECK
+# -------------------------------------------------
+def explain(conn, sql, params=()):
+    """Run EXPLAIN on a query and return the plan as a DataFrame."""
+    cur = conn.cursor()
+    cur.execute("EXPLAIN " + sql, params)
+    cols = [c[0] for c in cur.description]
+    plan = pd.DataFrame(cur.fetchall(), columns=cols)
+    cur.close()
+    return plan
+
+
+def check_index_usage(conn, sql, params=(), tables=("f", "d")):
+    """
+    EXPLAIN a query and flag tables that are read without an index.
+
+    A row with type = 'ALL' (full table scan), type = 'index' (full
+    index scan: every index entry is read, e.g. an unbounded query on a
+    covering index) or no chosen key means the predicate or join on that
+    table is not narrowing the read through an index. Only the aliases
+    in `tables` are judged: scanning the handful of rows in
+    dim_mess_unit is cheaper than any index lookup.
+    Returns (ok, plan) where plan has an added "uses_index" column.
+    """
+    plan = explain(conn, sql, params)
+    plan["uses_index"] = plan["key"].notna() & ~plan["type"].isin(["ALL", "index"])
+    judged = plan[plan["table"].isin(tables)]
+    return bool(judged["uses_index"].all()), plan
+
+
+def create_indexes(conn):
+    """Apply INDEX_DDL (one-off, run by hand against mess_dw)."""
+    cur = conn.cursor()
+    for ddl in INDEX_DDL:
+        cur.execute(ddl)
+    conn.commit()
+    cur.close()
+
+
+if __name__ == "__main__":
+    from backend import connect
+
+    conn = connect("mysql")
+
+    start, end = month_bounds(2025, 10)
+    for name, (sql, params) in {
+        "month transactions": mess_transactions_query(start, end),
+        "vendor–mess totals": vendor_mess_totals_query(),
+        "benford amounts": amounts_query(),
+        "daily mess totals (push-down)": daily_mess_totals_query(start, end),
+        "digit histogram (push-down)": digit_histogram_query(),
+        "grouped digits (push-down)": grouped_digit_query()
+    }.items():
+        ok, plan = check_index_usage(conn, sql, params)
+        print(f"\n--- EXPLAIN: {name} ---")
+        print(plan[["table", "type", "key", "rows", "Extra", "uses_index"]])
+        print("Indexes used on every table" if ok else "WARNING: full table / index scan detected")
+
+    conn.close()
@@ -0,0 +1,335 @@
+"""
+HEADLESS BATCHED FIGURE RENDERING
+IISER TVM Mess DWBI Project – Varsha 2025
+
+---------------------------------------------------
+WHY
+---------------------------------------------------
+Every analysis script ended in plt.figure(); ...; plt.show() blocks.
+plt.show() blocks the process and needs a display, so unattended runs on
+the server hung or failed. Scripts now describe each plot as a figure
+spec (a plain, picklable dict) and hand it to submit():
+
+    kind        data
+    "line"      x, y                       (month daily totals / wastage)
+    "bar"       x, height                  (wastage per mess group)
+    "barh"      y, width                   (top dependency nodes)
+    "benford"   digits, expected, observed (percentages)
+    "network"   nodes, edges, pos, colors, n_communities
+
+---------------------------------------------------
+BATCHES
+---------------------------------------------------
+Inside `with batch() as specs:` submit() only queues the spec; the
+caller renders the whole queue later with render(). run_report.py
+collects the specs of every analysis and renders the whole semester in
+one batch step, followed by a single report.html.
+
+Outside a batch (a script run on its own) the spec is rendered at once
+to MESS_OUTPUT_DIR (default ../report_output).
+
+---------------------------------------------------
+RENDERING
+---------------------------------------------------
+Matplotlib's object API on the Agg canvas, never pyplot, so no display
+and no global figure state. Each worker process keeps one figure + axes
+per figure size and clears the axes between specs instead of creating
+new figures; specs are sorted by size so reuse is maximal. Batches are
+split across a ProcessPoolExecutor. Every figure is written in each of
+FORMATS (MESS_FIGURE_FORMATS, default "png,svg").
+"""
+
+import html
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+from instrumentation import add_records, drain, span
+
+OUTPUT_DIR = os.environ.get(
+    "MESS_OUTPUT_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "report_output")
+)
+FORMATS = tuple(os.environ.get("MESS_FIGURE_FORMATS", "png,svg").split(","))
+DPI = 150
+
+_queue = None
+
+
+# -------------------------------------------------
+# 1. FIGURE SPECS & QUEUE
+# -------------------------------------------------
+def figure_spec(name, kind, data, title="", xlabel=None, ylabel=None,
+                figsize=(8, 4), section=None, **options):
+    """
+    One plot, described as data.
+
+    name    : file stem, unique within its section
+    kind    : key of RENDERERS
+    data    : {field: list / array} for that kind
+    section : sub-directory and report heading (e.g. "october")
+    options : kind-specific styling (marker, grid, xtick_rotation, ...)
+    """
+    return {
+        "name": name,
+        "kind": kind,
+        "data": {k: _plain(v) for k, v in data.items()},
+        "title": title,
+        "xlabel": xlabel,
+        "ylabel": ylabel,
+        "figsize": tuple(figsize),
+        "section": section,
+        "options": options,
+    }
+
+
+def _plain(values):
+    """pandas objects -> NumPy arrays, so specs pickle small and fast."""
+    return values.to_numpy() if hasattr(values, "to_numpy") else values
+
+
+@contextmanager
+def batch():
+    """Queue every submit() inside the block; yields the list of specs."""
+    global _queue
+    previous, _queue = _queue, []
+    try:
+        yield _queue
+    finally:
+        _queue = previous
+
+
+def submit(spec):
+    """Queue spec in the active batch, or render it now to OUTPUT_DIR."""
+    if _queue is not None:
+        _queue.append(spec)
+        return None
+    entry = _render_chunk([spec], OUTPUT_DIR, FORMATS)[0]
+    for path in entry["files"].values():
+        print(f"Figure written to {path}")
+    return entry
+
+
+# -------------------------------------------------
+# 2. RENDERERS (one per kind)
+# -------------------------------------------------
+def _draw_line(ax, data, opts):
+    ax.plot(data["x"], data["y"], marker=opts.get("marker"))
+
+
+def _draw_bar(ax, data, opts):
+    ax.bar(data["x"], data["height"])
+
+
+def _draw_barh(ax, data, opts):
+    ax.barh(data["y"], data["width"])
+    if opts.get("invert_y", True):
+        ax.invert_yaxis()
+
+
+def _draw_benford(ax, data, opts):
+    ax.plot(data["digits"], data["expected"], marker="o", label="Benford Expected", linewidth=2)
+    ax.bar(data["digits"], data["observed"], alpha=0.7, label="Observed")
+    ax.set_xticks(data["digits"])
+    ax.legend()
+
+
+def _draw_network(ax, data, opts):
+    import matplotlib
+    import networkx as nx
+    from matplotlib.lines import Line2D
+
+    G = nx.Graph()
+    G.add_nodes_from(data["nodes"])
+    G.add_edges_from(data["edges"])
+    cmap = matplotlib.colormaps["tab10"]
+
+    nx.draw_networkx_edges(G, data["pos"], ax=ax, alpha=0.3, width=0.8)
+    nx.draw_networkx_nodes(
+        G, data["pos"], ax=ax,
+        node_color=list(data["colors"]), cmap=cmap,
+        # community i gets tab10 colour i, matching the legend
+        vmin=0, vmax=cmap.N - 1,
+        node_size=140, alpha=0.9
+    )
+
+    handles = [
+        Line2D([0], [0], marker="o", linestyle="", color=cmap(i), label=f"Community {i}")
+        for i in range(data["n_communities"])
+    ]
+    ax.legend(handles=handles, title="Detected Communities", loc="best", fontsize=10)
+    ax.set_axis_off()
+
+
+RENDERERS = {
+    "line": _draw_line,
+    "bar": _draw_bar,
+    "barh": _draw_barh,
+    "benford": _draw_benford,
+    "network": _draw_network,
+}
+
+
+# -------------------------------------------------
+# 3. BATCH RENDERING (Agg, reused canvases)
+# -------------------------------------------------
+_canvases = {}
+
+
+def _canvas(figsize):
+    """The figure + axes for this size in this process, cleared for reuse."""
+    if figsize not in _canvases:
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        fig = Figure(figsize=figsize)
+        FigureCanvasAgg(fig)
+        _canvases[figsize] = (fig, fig.add_subplot())
+    fig, ax = _canvases[figsize]
+    ax.cla()
+    return fig, ax
+
+
+def _render_chunk(specs, output_dir, formats):
+    """Render specs in this process; returns one report entry per spec."""
+    entries = []
+    for spec in specs:
+        with span(f"render.{spec['kind']}"):
+            entries.append(_render_one(spec, output_dir, formats))
+    return entries
+
+
+def _render_one(spec, output_dir, formats):
+    """Draw one spec on a reused canvas and write it in every format."""
+    fig, ax = _canvas(spec["figsize"])
+    opts = spec["options"]
+    RENDERERS[spec["kind"]](ax, spec["data"], opts)
+
+    if "title_size" in opts:
+        ax.set_title(spec["title"], fontsize=opts["title_size"])
+    else:
+        ax.set_title(spec["title"])
+    if spec["xlabel"]:
+        ax.set_xlabel(spec["xlabel"])
+    if spec["ylabel"]:
+        ax.set_ylabel(spec["ylabel"])
+    if opts.get("xtick_rotation"):
+        ax.tick_params(axis="x", labelrotation=opts["xtick_rotation"])
+    if opts.get("grid"):
+        ax.grid(True, **({} if opts["grid"] is True else opts["grid"]))
+    fig.tight_layout()
+
+    directory = os.path.join(output_dir, spec["section"] or "")
+    os.makedirs(directory, exist_ok=True)
+    files = {}
+    for fmt in formats:
+        path = os.path.join(directory, f"{spec['name']}.{fmt}")
+        # No timestamp in the SVG, so unchanged figures give unchanged files
+        fig.savefig(path, dpi=DPI, bbox_inches="tight",
+                    metadata={"Date": None} if fmt == "svg" else None)
+        files[fmt] = path
+
+    return {
+        "name": spec["name"],
+        "section": spec["section"],
+        "title": spec["title"],
+        "files": files,
+    }
+
+
+def _render_chunk_traced(specs, output_dir, formats):
+    """_render_chunk in a pool worker, returning its spans too."""
+    return _render_chunk(specs, output_dir, formats), drain()
+
+
+def render(specs, output_dir=OUTPUT_DIR, formats=FORMATS, processes=None):
+    """
+    Render a batch of specs headlessly, split across worker processes.
+    Returns the report entries in submission order.
+    """
+    if not specs:
+        return []
+    if processes is None:
+        processes = os.cpu_count() or 1
+    processes = max(1, min(processes, len(specs)))
+
+    order = sorted(range(len(specs)), key=lambda i: specs[i]["figsize"])
+    if processes == 1:
+        chunks = [order]
+    else:
+        chunks = [order[i::processes] for i in range(processes)]
+
+    entries = [None] * len(specs)
+    if processes == 1:
+        results = [_render_chunk([specs[i] for i in order], output_dir, formats)]
+    else:
+        import multiprocessing
+
+        with ProcessPoolExecutor(max_workers=processes,
+                                 mp_context=multiprocessing.get_context("spawn")) as pool:
+            traced_results = list(pool.map(
+                _render_chunk_traced,
+                [[specs[i] for i in chunk] for chunk in chunks],
+                [output_dir] * len(chunks),
+                [formats] * len(chunks)
+            ))
+        results = []
+        for rendered, spans in traced_results:
+            # Spans recorded in the render workers join this process's trace
+            add_records(spans)
+            results.append(rendered)
+    for chunk, rendered in zip(chunks, results):
+        for i, entry in zip(chunk, rendered):
+            entries[i] = entry
+    return entries
+
+
+# -------------------------------------------------
+# 4. HTML REPORT
+# -------------------------------------------------
+def write_html(entries, output_dir=OUTPUT_DIR, title="Mess DWBI Report – Varsha 2025",
+               texts=None):
+    """
+    One report.html with every figure grouped by section (PNG inline,
+    SVG linked), plus an optional preformatted text block per section.
+    Returns the path.
+    """
+    texts = texts or {}
+    sections = list(dict.fromkeys([e["section"] for e in entries] + list(texts)))
+
+    def rel(path):
+        return html.escape(os.path.relpath(path, output_dir))
+
+    parts = [
+        "<!DOCTYPE html>",
+        "<html><head><meta charset=\"utf-8\">",
+        f"<title>{html.escape(title)}</title>",
+        "<style>body{font-family:sans-serif;max-width:1100px;margin:auto}"
+        "img{max-width:100%}figure{margin:1.5em 0}"
+        "pre{background:#f6f6f6;padding:1em;overflow-x:auto}</style>",
+        "</head><body>",
+        f"<h1>{html.escape(title)}</h1>",
+    ]
+    for section in sections:
+        parts.append(f"<h2>{html.escape((section or 'figures').title())}</h2>")
+        for e in entries:
+            if e["section"] != section:
+                continue
+            files = e["files"]
+            img = files.get("png") or next(iter(files.values()))
+            links = " · ".join(
+                f"<a href=\"{rel(p)}\">{fmt.upper()}</a>" for fmt, p in files.items()
+            )
+            parts.append(
+                f"<figure><img src=\"{rel(img)}\" alt=\"{html.escape(e['title'])}\">"
+                f"<figcaption>{html.escape(e['title'])} ({links})</figcaption></figure>"
+            )
+        if section in texts:
+            parts.append(f"<pre>{html.escape(texts[section])}</pre>")
+    parts.append("</body></html>")
+
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, "report.html")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(parts))
+    return path
@@ -0,0 +1,340 @@
+"""
+SEMESTER REPORT ORCHESTRATOR
+IISER TVM Mess DWBI Project – Varsha 2025
+
+---------------------------------------------------
+STAGE DAG
+---------------------------------------------------
+One entry point for the whole report, run as a dependency graph:
+
+    extract ─> clean ─> prefetch ─┬─> august ... december ─┐
+                                  ├─> benford ─────────────┼─> render
+                                  └─> network ─────────────┘
+
+extract  : fold new fact rows into the summary tables (aggregates.refresh)
+clean    : extract + clean new fact rows into the Parquet snapshot
+           (data_preprocessing.run_incremental)
+prefetch : every aggregate-sized report query (daily totals, digit
+           histogram, edge list, ...), concurrently over the connection
+           pool, into the session cache (backend.prefetch). Row-level
+           reads are never prefetched: the scripts stream them from the
+           snapshot or a server-side cursor (streaming.iter_chunks)
+analyses : the month scripts, Benford and network analysis, each in its
+           own worker process (ProcessPoolExecutor); queries are answered
+           from the prefetched results, each worker is sent only those of
+           its own analysis, and figures are only queued as specs
+           (rendering.batch)
+render   : every queued figure of the semester in one headless batch
+           (rendering.render, Agg, in parallel), then report.html and
+           report.json
+
+Stages that write to the warehouse run in this process; a stage starts
+as soon as all of its dependencies are done.
+
+---------------------------------------------------
+ARTIFACTS
+---------------------------------------------------
+<output-dir>/<stage>/output.txt   everything the script printed
+<output-dir>/<stage>/*.png, *.svg its figures
+<output-dir>/report.html          all figures and printed output
+<output-dir>/report.json          artifacts + per-stage and total timings
+<output-dir>/trace.json           with --trace (or MESS_TRACE): every span of
+                                  the run, workers included (instrumentation.py)
+
+    python run_report.py [--skip-preprocess] [--workers N] [--processes N]
+                         [--output-dir DIR] [--trace [MODE]]
+
+The warehouse is chosen as for every script (MESS_BACKEND, MESS_DB_*,
+see backend.py).
+"""
+
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import runpy
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import pandas as pd
+
+import aggregates
+from anomaly import calendar_query
+import backend
+import instrumentation
+import rendering
+from mess_analysis import semester_bounds
+from mess_units import has_group_column, mess_groups_query
+from push_down import PUSH_DOWN
+from query_builder import (
+    daily_mess_totals_query, digit_histogram_query, grouped_digit_query,
+    vendor_mess_totals_query
+)
+from snapshot import has_snapshot, is_fresh
+
+CODE_DIR = os.path.dirname(os.path.abspath(__file__))
+OUTPUT_DIR = os.environ.get(
+    "MESS_OUTPUT_DIR", os.path.join(CODE_DIR, "..", "report_output")
+)
+
+MONTHS = {
+    "august": (2025, 8),
+    "september": (2025, 9),
+    "october": (2025, 10),
+    "november": (2025, 11),
+    "december": (2025, 12),
+}
+ANALYSES = list(MONTHS) + ["benford", "network"]
+
+
+# -------------------------------------------------
+# 1. IN-PROCESS STAGES (WAREHOUSE WRITES, PREFETCH)
+# -------------------------------------------------
+def planned_queries(conn):
+    """
+    {analysis: {name: (sql, params)}}: the aggregate-sized queries each
+    analysis script will run, given what is fresh right now (summary
+    tables, snapshot, push-down setting). Row-level extracts are left out
+    so they keep streaming in bounded chunks.
+    """
+    daily_fresh = aggregates.is_fresh(conn, ["agg_daily_mess_group"])
+    edges_fresh = aggregates.is_fresh(conn, ["agg_vendor_mess_total"])
+    snapshot_fresh = has_snapshot() and is_fresh(conn)
+    groups = {"mess groups": mess_groups_query()} if has_group_column(conn) else {}
+
+    queries = {name: dict(groups) for name in ANALYSES}
+    # Every month script loads the same semester-wide daily totals and
+    # calendar (plus the history its high wastage days are scored
+    # against, anomaly.py) and slices its month out: one query each
+    start, end = semester_bounds()
+    for name in MONTHS:
+        if daily_fresh:
+            queries[name]["daily totals"] = aggregates.daily_totals_query(start, end)
+        elif PUSH_DOWN:
+            queries[name]["daily totals"] = daily_mess_totals_query(start, end)
+        queries[name]["calendar"] = calendar_query(start, end)
+
+    if not snapshot_fresh and PUSH_DOWN:
+        queries["benford"]["digits"] = digit_histogram_query()
+        queries["benford"]["grouped digits"] = grouped_digit_query()
+
+    if edges_fresh:
+        queries["network"]["edges"] = aggregates.vendor_mess_totals_query()
+    elif not snapshot_fresh:
+        queries["network"]["edges"] = vendor_mess_totals_query()
+
+    return queries
+
+
+def extract_stage(ctx):
+    conn = backend.connect()
+    try:
+        folded = aggregates.refresh(conn)
+    finally:
+        conn.close()
+    return {"fact_rows_folded": folded}
+
+
+def clean_stage(ctx):
+    from data_preprocessing import run_incremental
+
+    conn = backend.connect()
+    try:
+        manifest = run_incremental(conn)
+    finally:
+        conn.close()
+    return {"snapshot_rows": manifest["row_count"],
+            "max_expense_id": manifest["max_expense_id"]}
+
+
+def prefetch_stage(ctx):
+    conn = backend.connect()
+    try:
+        queries = planned_queries(conn)
+    finally:
+        conn.close()
+
+    # Each distinct query runs once; ctx["cache_keys"] records which
+    # cached results every analysis worker gets
+    unique = {}
+    ctx["cache_keys"] = {}
+    for analysis, named in queries.items():
+        keys = ctx["cache_keys"][analysis] = []
+        for name, (sql, params) in named.items():
+            key = (sql, tuple(params))
+            keys.append(key)
+            unique.setdefault(key, f"{analysis} {name}")
+    fetched = backend.prefetch({name: key for key, name in unique.items()},
+                               max_workers=ctx["workers"])
+    # Workers open the embedded file read-only; release our handle on it
+    backend.close_all()
+    return {name: {"rows": n, "seconds": round(s, 4)} for name, (n, s) in fetched.items()}
+
+
+def render_stage(ctx):
+    results = ctx["results"]
+    specs = [spec for name in ANALYSES for spec in results[name].pop("figures")]
+    entries = rendering.render(specs, ctx["output_dir"], processes=ctx["processes"])
+
+    texts = {}
+    for name in ANALYSES:
+        with open(os.path.join(ctx["output_dir"], name, "output.txt"), encoding="utf-8") as f:
+            texts[name] = f.read()
+    html_path = rendering.write_html(entries, ctx["output_dir"], texts=texts)
+
+    for entry in entries:
+        results[entry["section"]]["artifacts"].extend(entry["files"].values())
+
+    report = {
+        "output_dir": os.path.abspath(ctx["output_dir"]),
+        "stages": ctx["results"],
+    }
+    path = os.path.join(ctx["output_dir"], "report.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, default=str)
+    return {"figures": len(entries), "artifacts": [html_path, path]}
+
+
+# -------------------------------------------------
+# 2. WORKER-PROCESS STAGES (ANALYSES)
+# -------------------------------------------------
+def _init_worker():
+    """Process pool initializer: read-only DB."""
+    os.environ["MESS_EMBEDDED_READ_ONLY"] = "1"
+    backend.EMBEDDED_READ_ONLY = True
+
+
+def run_analysis(name, output_dir, cache):
+    """
+    Run <name>_analysis.py in this worker, answering its queries from
+    cache (its own prefetched results); its printed output goes to
+    <output_dir>/<name>/output.txt and its figure specs are returned for
+    the render stage.
+    """
+    backend._session_cache = cache
+    stage_dir = os.path.join(output_dir, name)
+    os.makedirs(stage_dir, exist_ok=True)
+
+    log = os.path.join(stage_dir, "output.txt")
+    with open(log, "w", encoding="utf-8") as f, contextlib.redirect_stdout(f), \
+            rendering.batch() as specs, instrumentation.span(f"stage.{name}"):
+        runpy.run_path(os.path.join(CODE_DIR, f"{name}_analysis.py"), run_name="__main__")
+
+    return {"artifacts": [log], "figures": specs, "spans": instrumentation.drain()}
+
+
+# -------------------------------------------------
+# 3. DAG SCHEDULER
+# -------------------------------------------------
+def build_dag(skip_preprocess=False):
+    """{stage: (dependencies, function, runs_in_pool)}"""
+    dag = {}
+    if not skip_preprocess:
+        dag["extract"] = ((), extract_stage, False)
+        dag["clean"] = (("extract",), clean_stage, False)
+    dag["prefetch"] = (() if skip_preprocess else ("clean",), prefetch_stage, False)
+    for name in ANALYSES:
+        dag[name] = (("prefetch",), name, True)
+    dag["render"] = (tuple(ANALYSES), render_stage, False)
+    return dag
+
+
+def run_dag(dag, ctx, processes=None):
+    """
+    Run every stage once its dependencies are done: pool stages go to a
+    process pool (started after the cache is filled), the rest run here.
+    Returns {stage: {"seconds": ..., **result}}.
+    """
+    results = ctx["results"]
+    started = {}
+    running = {}
+    pool = None
+
+    try:
+        while len(results) < len(dag):
+            ready = [
+                s for s, (deps, _, _) in dag.items()
+                if s not in results and s not in started
+                and all(d in results for d in deps)
+            ]
+            for stage in ready:
+                _, func, in_pool = dag[stage]
+                started[stage] = time.perf_counter()
+                if in_pool:
+                    if pool is None:
+                        pool = ProcessPoolExecutor(
+                            max_workers=processes,
+                            mp_context=multiprocessing.get_context("spawn"),
+                            initializer=_init_worker
+                        )
+                    cache = {key: backend._session_cache[key]
+                             for key in ctx["cache_keys"][stage]}
+                    running[pool.submit(run_analysis, func, ctx["output_dir"], cache)] = stage
+                else:
+                    with instrumentation.span(f"stage.{stage}"):
+                        result = func(ctx)
+                    results[stage] = {"seconds": time.perf_counter() - started[stage], **result}
+                    print(f"[{stage}] done in {results[stage]['seconds']:.2f} s")
+
+            if ready and not running:
+                continue
+            if not running:
+                raise RuntimeError(f"Stage DAG is stuck: {sorted(set(dag) - set(results))}")
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage = running.pop(future)
+                result = future.result()
+                instrumentation.add_records(result.pop("spans"))
+                results[stage] = {"seconds": time.perf_counter() - started[stage], **result}
+                print(f"[{stage}] done in {results[stage]['seconds']:.2f} s")
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the full Varsha 2025 mess report")
+    parser.add_argument("--skip-preprocess", action="store_true",
+                        help="use the snapshot / summary tables as they are")
+    parser.add_argument("--workers", type=int, default=backend.POOL_SIZE,
+                        help="concurrent prefetch queries (default: pool size)")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="analysis / rendering worker processes (default: CPU count)")
+    parser.add_argument("--output-dir", default=OUTPUT_DIR)
+    parser.add_argument("--trace", nargs="?", const="timing",
+                        choices=["timing", "tracemalloc", "cprofile"],
+                        help="record stage spans (instrumentation.py), also in workers")
+    args = parser.parse_args()
+
+    if args.trace:
+        instrumentation.enable(args.trace)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    ctx = {"workers": args.workers, "processes": args.processes,
+           "output_dir": args.output_dir, "results": {}}
+
+    t0 = time.perf_counter()
+    with backend.session():
+        results = run_dag(build_dag(args.skip_preprocess), ctx, args.processes)
+    total = time.perf_counter() - t0
+
+    timings = pd.DataFrame(
+        [(stage, r["seconds"]) for stage, r in results.items()] + [("total", total)],
+        columns=["stage", "seconds"]
+    )
+    timings.to_csv(os.path.join(args.output_dir, "timings.csv"), index=False)
+
+    print("\n--- RUN TIMINGS ---")
+    print(timings.round(3).to_string(index=False))
+    print(f"\nArtifacts written to {os.path.abspath(args.output_dir)}")
+
+    # Spans of this process and of every worker, in one trace
+    instrumentation.report(os.path.join(args.output_dir, "trace.json"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+"""
+COLUMNAR SNAPSHOT OF THE CLEANED DATASET
+IISER TVM Mess DWBI Project – Varsha 2025
+
+---------------------------------------------------
+LAYOUT
+---------------------------------------------------
+mess_snapshot/
+    month=2025-08/part-0-0.parquet
+    month=2025-09/part-0-0.parquet
+    ...
+    _manifest.json
+
+- Columns and dtypes of dataset.SCHEMA: int32 day ordinal, int64
+  amount_paise, vendor_name / mess_unit_name as dictionary columns
+- One Parquet partition per calendar month of the day
+- _dictionaries.json holds the shared name dictionaries (dataset.py),
+  so every reader maps names onto the same codes
+- _manifest.json records max expense_id, row counts, a checksum and the
+  schema version so a reader can tell whether the snapshot is complete,
+  up to date and in the current layout (older layouts count as absent
+  and are rebuilt by the next data_preprocessing run)
+- append_snapshot() adds a delta (rows above the manifest's max
+  expense_id) as new part files without rewriting existing partitions
+
+Reads are memory-mapped Arrow reads, so a cold start costs a file scan
+instead of the fact ⋈ date ⋈ vendor ⋈ mess join in MySQL.
+"""
+
+import json
+import os
+import shutil
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import dataset
+from instrumentation import traced
+
+SNAPSHOT_DIR = os.environ.get(
+    "MESS_SNAPSHOT_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "mess_snapshot")
+)
+
+# Leading underscore: Arrow dataset discovery skips it
+MANIFEST = "_manifest.json"
+
+COLUMNS = dataset.COLUMNS
+
+
+# -------------------------------------------------
+# HELPERS
+# -------------------------------------------------
+def _checksum(df):
+    """
+    Additive checksum: sums of expense_id and amount_paise.
+
+    Being additive, the checksum of an appended delta can simply be
+    added to the manifest's running total.
+    """
+    return {
+        "expense_id_sum": int(df["expense_id"].sum()),
+        "amount_paise_sum": int(df["amount_paise"].sum())
+    }
+
+
+def _to_arrow(df):
+    """Arrow table of the typed columns with a month partition key."""
+    df = dataset.validate(df[COLUMNS].copy())
+    df["month"] = dataset.month_keys(df["day"])
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def read_manifest(path=SNAPSHOT_DIR):
+    """
+    Return the manifest dict, or None if no snapshot exists (or it was
+    written in an older layout than dataset.SCHEMA_VERSION).
+    """
+    fn = os.path.join(path, MANIFEST)
+    if not os.path.exists(fn):
+        return None
+    with open(fn) as f:
+        manifest = json.load(f)
+    if manifest.get("schema_version", 1) != dataset.SCHEMA_VERSION:
+        return None
+    return manifest
+
+
+def _month_counts(df):
+    months = pd.Series(dataset.month_keys(df["day"])).value_counts()
+    return {m: int(n) for m, n in months.items()}
+
+
+def _write_manifest(manifest, path):
+    tmp = os.path.join(path, MANIFEST + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, os.path.join(path, MANIFEST))
+
+
+# -------------------------------------------------
+# WRITE
+# -------------------------------------------------
+def write_snapshot(df, path=SNAPSHOT_DIR):
+    """
+    Replace the snapshot at `path` with the cleaned DataFrame df
+    (output of data_preprocessing.clean). Returns the manifest.
+    """
+    init_snapshot(path)
+    df = dataset.to_typed(df)
+    dataset.save_dictionaries(path)
+
+    pq.write_to_dataset(
+        _to_arrow(df),
+        root_path=path,
+        partition_cols=["month"],
+        basename_template="part-0-{i}.parquet"
+    )
+
+    manifest = {
+        "schema_version": dataset.SCHEMA_VERSION,
+        "max_expense_id": int(df["expense_id"].max()) if len(df) else 0,
+        "row_count": int(len(df)),
+        "rows_per_month": dict(sorted(_month_counts(df).items())),
+        "checksum": _checksum(df),
+        "written_at": pd.Timestamp.now().isoformat()
+    }
+    _write_manifest(manifest, path)
+    return manifest
+
+
+def init_snapshot(path=SNAPSHOT_DIR):
+    """Start an empty snapshot (watermark 0) at path, replacing any old one."""
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    os.makedirs(path)
+
+    manifest = {
+        "schema_version": dataset.SCHEMA_VERSION,
+        "max_expense_id": 0,
+        "row_count": 0,
+        "rows_per_month": {},
+        "checksum": {"expense_id_sum": 0, "amount_paise_sum": 0},
+        "written_at": pd.Timestamp.now().isoformat()
+    }
+    _write_manifest(manifest, path)
+    return manifest
+
+
+@traced("snapshot.append")
+def append_snapshot(delta, watermark, path=SNAPSHOT_DIR):
+    """
+    Merge a cleaned delta into an existing snapshot.
+
+    delta     : cleaned rows extracted above the previous watermark
+    watermark : highest expense_id that was EXTRACTED for this delta
+                (rows dropped by cleaning must not be fetched again)
+
+    New rows go into fresh part files inside their month partitions, so
+    the cost is proportional to the delta, not to the stored history.
+    Returns the updated manifest.
+    """
+    manifest = read_manifest(path)
+    if manifest is None:
+        raise FileNotFoundError(f"No snapshot at {path}; run a full load first")
+
+    if len(delta):
+        # Names new in this delta join the shared dictionaries first
+        dataset.load_dictionaries(path)
+        delta = dataset.to_typed(delta)
+        dataset.save_dictionaries(path)
+
+        pq.write_to_dataset(
+            _to_arrow(delta),
+            root_path=path,
+            partition_cols=["month"],
+            basename_template=f"part-{int(watermark)}-{{i}}.parquet"
+        )
+
+        for m, n in _month_counts(delta).items():
+            manifest["rows_per_month"][m] = manifest["rows_per_month"].get(m, 0) + n
+        manifest["rows_per_month"] = dict(sorted(manifest["rows_per_month"].items()))
+
+        manifest["row_count"] += int(len(delta))
+        for key, value in _checksum(delta).items():
+            manifest["checksum"][key] += value
+
+    manifest["max_expense_id"] = max(manifest["max_expense_id"], int(watermark))
+    manifest["written_at"] = pd.Timestamp.now().isoformat()
+    _write_manifest(manifest, path)
+    return manifest
+
+
+# -------------------------------------------------
+# READ
+# -------------------------------------------------
+def has_snapshot(path=SNAPSHOT_DIR):
+    return read_manifest(path) is not None
+
+
+@traced("snapshot.read")
+def read_snapshot(path=SNAPSHOT_DIR, start=None, end=None, columns=None, verify=False):
+    """
+    Memory-mapped read of the snapshot, optionally limited to [start, end).
+
+    Only the month partitions overlapping the range are opened. Rows come
+    back in the typed layout (dataset.SCHEMA), names on the shared
+    dictionaries. With verify=True the row count and checksum are
+    checked against the manifest (full reads only).
+    """
+    filters = []
+    if start is not None:
+        filters.append(("day", ">=", int(dataset.day_ordinal([start])[0])))
+        filters.append(("month", ">=", pd.Timestamp(start).strftime("%Y-%m")))
+    if end is not None:
+        filters.append(("day", "<", int(dataset.day_ordinal([end])[0])))
+        filters.append(("month", "<=", pd.Timestamp(end).strftime("%Y-%m")))
+
+    table = pq.read_table(
+        path,
+        columns=columns,
+        filters=filters or None,
+        memory_map=True
+    )
+    if "month" in table.column_names:
+        table = table.drop(["month"])
+
+    dataset.load_dictionaries(path)
+    df = dataset.to_typed(table.to_pandas())
+
+    if verify and start is None and end is None:
+        manifest = read_manifest(path)
+        if len(df) != manifest["row_count"] or _checksum(df) != manifest["checksum"]:
+            raise ValueError(f"Snapshot at {path} does not match its manifest")
+
+    if "day" in df.columns:
+        df = df.sort_values("day", kind="stable").reset_index(drop=True)
+    return df
+
+
+def iter_snapshot(path=SNAPSHOT_DIR, columns=None, batch_size=None):
+    """
+    Stream the snapshot as DataFrames of at most batch_size rows, so
+    aggregations over it run in bounded memory as well.
+    """
+    import pyarrow.dataset as ds
+
+    manifest = read_manifest(path)
+    if manifest is None:
+        raise FileNotFoundError(f"No snapshot at {path}; run a full load first")
+    if manifest["row_count"] == 0:
+        return
+
+    dataset.load_dictionaries(path)
+    parts = ds.dataset(path, format="parquet", partitioning="hive")
+    for batch in parts.to_batches(columns=columns, batch_size=batch_size or 1 << 17):
+        if batch.num_rows:
+            yield dataset.to_typed(batch.to_pandas())
+
+
+def is_fresh(conn, path=SNAPSHOT_DIR):
+    """True if the snapshot already holds the newest fact_expense row."""
+    manifest = read_manifest(path)
+    if manifest is None:
+        return False
+    cur = conn.cursor()
+    cur.execute("SELECT COALESCE(MAX(expense_id), 0) FROM fact_expense")
+    (max_id,) = cur.fetchone()
+    cur.close()
+    return int(max_id) <= manifest["max_expense_id"]
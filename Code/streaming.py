@@ -0,0 +1,181 @@
+"""
+CHUNKED STREAMING EXTRACTION
+IISER TVM Mess DWBI Project – Varsha 2025
+
+---------------------------------------------------
+WHY
+---------------------------------------------------
+pd.read_sql(query, conn) materialises the whole result set at once. For
+multi-year or multi-campus data that no longer fits on the analysis box.
+
+Here rows are pulled through an unbuffered (server-side) mysql.connector
+cursor with fetchmany(), cleaned chunk by chunk, and folded into running
+aggregates. Peak memory is bounded by the chunk size, which is derived
+from a configurable memory budget (MESS_MAX_MEMORY_MB, default 256 MB).
+
+---------------------------------------------------
+AGGREGATES
+---------------------------------------------------
+BenfordCounts      -> all Benford digit histograms + summation (benford.py)
+GroupedDigitCounts -> first-digit counts per vendor, mess unit and month
+EdgeWeights        -> SUM(amount_paise) per (vendor_name, mess_unit_name)
+
+Each has update(chunk) and result(); results are identical to running
+the same groupby on the fully materialised DataFrame. Chunks are in the
+typed layout of dataset.py (cleaned chunks, snapshot batches), so every
+running sum is exact int64 paise over shared categorical codes.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from benford import (
+    N_BINS, SCREENING_GROUPS, group_labels, grouped_counts, histogram_from_paise,
+    screen_counts, tests_from_histogram
+)
+from dataset import month_keys, rupees
+from instrumentation import span
+
+MAX_MEMORY_MB = int(os.environ.get("MESS_MAX_MEMORY_MB", "256"))
+
+# Rough in-memory cost of one transaction row in pandas (object strings,
+# Decimal amount, datetime) plus the cursor's raw tuples.
+BYTES_PER_ROW = 400
+
+
+def chunksize_for_memory(max_memory_mb=MAX_MEMORY_MB, bytes_per_row=BYTES_PER_ROW):
+    """Rows per chunk that keep a chunk within max_memory_mb."""
+    return max(1000, int(max_memory_mb * 1024 * 1024 // bytes_per_row))
+
+
+# -------------------------------------------------
+# 1. STREAMING EXTRACTION
+# -------------------------------------------------
+def iter_chunks(conn, query, params=(), chunksize=None):
+    """
+    Yield the result of query as DataFrames of at most chunksize rows.
+
+    mysql.connector cursors are unbuffered unless asked otherwise, so rows
+    stay on the server until fetchmany() pulls them. chunksize=None reads
+    everything as one chunk.
+    """
+    if chunksize is None:
+        chunksize = chunksize_for_memory()
+
+    cur = conn.cursor()
+    try:
+        # Spans split warehouse time (execute) from transfer + DataFrame
+        # materialization (fetch); no span is open across a yield
+        with span("sql.execute"):
+            cur.execute(query, params)
+        columns = [c[0] for c in cur.description]
+        while True:
+            with span("sql.fetch") as s:
+                rows = cur.fetchmany(chunksize)
+                chunk = pd.DataFrame.from_records(rows, columns=columns) if rows else None
+                s.rows_out = len(rows)
+            if chunk is None:
+                break
+            yield chunk
+    finally:
+        cur.close()
+
+
+def iter_clean_chunks(conn, query, params=(), chunksize=None):
+    """iter_chunks + the data_preprocessing cleaning rules per chunk."""
+    from data_preprocessing import clean
+
+    for chunk in iter_chunks(conn, query, params, chunksize):
+        yield clean(chunk)
+
+
+# -------------------------------------------------
+# 2. INCREMENTAL AGGREGATES
+# -------------------------------------------------
+def _add_exact(a, b):
+    """
+    a + b over the union of their keys, as int64. Series.add with
+    fill_value aligns through float64, which rounds sums above 2**53.
+    """
+    index = a.index.union(b.index)
+    total = (a.reindex(index, fill_value=0).to_numpy(np.int64)
+             + b.reindex(index, fill_value=0).to_numpy(np.int64))
+    return pd.Series(total, index=index, name=a.name)
+
+
+class BenfordCounts:
+    """Running benford.digit_histogram; result() runs the full test suite."""
+
+    def __init__(self):
+        self.counts = np.zeros(N_BINS, dtype=np.int64)
+        self.sums = np.zeros(90)
+
+    def update(self, chunk):
+        hist = histogram_from_paise(chunk["amount_paise"])
+        self.counts += hist["counts"]
+        self.sums += hist["sums"]
+        return self
+
+    def result(self):
+        return tests_from_histogram({"counts": self.counts, "sums": self.sums})
+
+
+class GroupedDigitCounts:
+    """
+    Running benford.grouped_counts per vendor, mess unit and month;
+    result() is the ranked anomaly table of benford.screen_counts.
+    """
+
+    def __init__(self, test="first"):
+        self.test = test
+        self.counts = {}
+
+    def update(self, chunk):
+        chunk = chunk.assign(month=month_keys(chunk["day"]))
+        for grouping, by in SCREENING_GROUPS.items():
+            part = grouped_counts(chunk, by, self.test)
+            # Keyed by label: chunks need not share categorical dictionaries
+            part.index = pd.Index(group_labels(part.index), name="group")
+            if grouping in self.counts:
+                part = self.counts[grouping].add(part, fill_value=0).astype(np.int64)
+            self.counts[grouping] = part
+        return self
+
+    def result(self, min_n=None):
+        return screen_counts(self.counts, self.test, min_n)
+
+
+class EdgeWeights:
+    """Running SUM(amount_paise) per (vendor_name, mess_unit_name) pair."""
+
+    def __init__(self):
+        self.weights = None
+
+    def update(self, chunk):
+        part = (
+            chunk.groupby(["vendor_name", "mess_unit_name"], observed=True)["amount_paise"]
+                 .sum()
+        )
+        if self.weights is None:
+            self.weights = part
+        else:
+            self.weights = _add_exact(self.weights, part)
+        return self
+
+    def result(self):
+        if self.weights is None:
+            return pd.DataFrame(columns=["vendor_name", "mess_unit_name", "total_amount"])
+        # Graph weights in rupees, summed exactly in paise
+        edges = self.weights.rename("total_amount").reset_index()
+        edges["total_amount"] = rupees(edges["total_amount"])
+        return edges
+
+
+def stream_aggregate(chunks, *aggregates):
+    """Feed every chunk to every aggregate; return the aggregates."""
+    for chunk in chunks:
+        for agg in aggregates:
+            agg.update(chunk)
+    return aggregates
@@ -0,0 +1,329 @@
+"""
+SYNTHETIC MESS DATA WAREHOUSE
+IISER TVM Mess DWBI Project – Varsha 2025
+
+---------------------------------------------------
+WHY
+---------------------------------------------------
+The only real data is one semester in MySQL, so nothing could be timed
+at larger scale. generate() builds the same star schema (dim_date,
+dim_vendor, dim_mess_unit, fact_expense) deterministically from a seed,
+from one semester (scale=1) up to decades / many campuses (scale=1000).
+
+---------------------------------------------------
+SHAPE OF THE DATA
+---------------------------------------------------
+Scale s is spread over min(s, MAX_SEMESTERS) Varsha semesters (1 Aug –
+31 Dec of consecutive years); the rest of the scale becomes more rows
+per semester, as if more campuses reported into one warehouse.
+
+    rows     : BASE_ROWS * s
+    vendors  : BASE_VENDORS * sqrt(s)   (new vendors grow slower than spend)
+    dates    : weekends get WEEKEND_WEIGHT of a weekday's transactions
+    vendors  : Zipf spend, P(rank r) ~ r^-ZIPF_EXPONENT
+    names    : "<NAME> <TRADE> [<PLACE>]" drawn from word lists, each
+               combination a distinct supplier; ALIAS_RATE of vendors
+               also get 1-2 spelling variants in dim_vendor ("DURGA
+               TRADERS.", "Durga Traders Pvt Ltd", "DURGA TRADRES") and
+               ALIAS_SHARE of their rows use one, so the dedup and graph
+               stages see the same mix at every scale. The true supplier
+               of every dim_vendor row is kept ("vendor_labels") to score
+               vendor_dedup against
+    amounts  : log-uniform over whole decades [10^1, 10^5) rupees, which
+               is exactly Benford-distributed; rounded to paise
+    mess     : MESS_UNITS shares; DIRTY_RATE of rows point at a dirty
+               alias row of dim_mess_unit ("cdh 1", "Café ", ...), the
+               variants name_aliases.json is there to repair
+    nulls    : NULL_RATE of rows lose vendor, mess unit or amount, and
+               INVALID_RATE have amount <= 0 (refunds, zero entries)
+
+Same seed and scale -> identical tables.
+
+    python synthetic.py --scale 10 [--seed 42] [--backend duckdb] [--path FILE]
+"""
+
+import numpy as np
+import pandas as pd
+
+BASE_ROWS = 6000
+BASE_VENDORS = 150
+MAX_SEMESTERS = 20
+FIRST_YEAR = 2025
+
+ZIPF_EXPONENT = 1.1
+WEEKEND_WEIGHT = 0.6
+AMOUNT_DECADES = (1, 5)
+DIRTY_RATE = 0.05
+NULL_RATE = 0.01
+INVALID_RATE = 0.005
+ALIAS_RATE = 0.2
+ALIAS_SHARE = 0.25
+
+VENDOR_NAMES = [
+    "DURGA", "LAKSHMI", "MURUGAN", "GANESH", "AYYAPPA", "KRISHNA", "BHAGAVATHY",
+    "ANNAPOORNA", "SARASWATHI", "PARVATHY", "MAHADEVA", "KAVERI", "PERIYAR",
+    "MALABAR", "TRAVANCORE", "KAIRALI", "NILA", "SAHYADRI", "ANJANEYA",
+    "VINAYAKA", "SUBRAMANIA", "MEENAKSHI", "KAMAKSHI", "BALAJI", "PADMANABHA",
+    "ANANTHA", "CHITHRA", "JYOTHI", "SURYA", "CHANDRIKA", "GOKULAM", "NANDANAM",
+    "AMRUTHA", "ARAFA", "AL AMEEN", "BETHANY", "CARMEL", "ST JOSEPH", "MARIA",
+    "ZAM ZAM", "NOORJAHAN", "FATHIMA", "CRESCENT", "GREEN VALLEY", "HILL VIEW",
+    "SEA VIEW", "PONNU", "THEJUS", "VARSHA", "ONAM",
+]
+VENDOR_TRADES = [
+    "TRADERS", "STORES", "PROVISIONS", "AGENCIES", "ENTERPRISES", "SUPERMARKET",
+    "DAIRY", "POULTRY FARM", "VEGETABLES", "FRUITS", "RICE MILL", "FLOUR MILL",
+    "BAKERY", "OIL MILLS", "SPICES", "FISH MART", "MEAT STALL", "GAS AGENCY",
+    "WATER SUPPLY", "WHOLESALE", "DISTRIBUTORS", "CATERERS", "PACKAGING",
+    "CLEANING SERVICES", "EGG CENTRE",
+]
+VENDOR_PLACES = [
+    "VITHURA", "NEDUMANGAD", "PALODE", "KATTAKADA", "ARYANAD", "PEROORKADA",
+    "KAZHAKUTTAM", "ATTINGAL", "KOLLAM", "KOTTAYAM", "ERNAKULAM", "THRISSUR",
+    "PALAKKAD", "KOZHIKODE", "KANNUR", "ALAPPUZHA", "PATHANAMTHITTA", "IDUKKI",
+    "MALAPPURAM", "WAYANAD", "KASARAGOD", "NAGERCOIL", "TIRUNELVELI", "MADURAI",
+    "COIMBATORE",
+]
+
+# canonical unit -> (share of rows, dirty spellings seen in the source)
+MESS_UNITS = {
+    "CDH-1": (0.36, ["CDH 1", " cdh-1", "CDH I", "CDH-01"]),
+    "CDH-2": (0.34, ["CDH 2", "cdh-2 ", "CDH II", "CDH-02"]),
+    "CAFE": (0.22, ["CAFE-1", "Cafe 1", "Café"]),
+    "ADMIN": (0.08, ["Admin"]),
+}
+
+
+# -------------------------------------------------
+# 1. DIMENSIONS
+# -------------------------------------------------
+def semester_dates(n_semesters, first_year=FIRST_YEAR):
+    """dim_date for n Varsha semesters (August–December)."""
+    dates = pd.DatetimeIndex(np.concatenate([
+        pd.date_range(f"{year}-08-01", f"{year}-12-31").values
+        for year in range(first_year, first_year + n_semesters)
+    ]))
+    return pd.DataFrame({
+        "date_id": np.arange(1, len(dates) + 1),
+        "full_date": dates,
+        "day": dates.day,
+        "month": dates.month,
+        "year": dates.year,
+        "day_name": dates.day_name(),
+        "is_weekend": (dates.dayofweek >= 5).astype(int),
+    })
+
+
+def vendor_names(rng, n_vendors):
+    """
+    n distinct supplier names, drawn without replacement from the word
+    lists. Every combination is its own supplier by definition: whether
+    vendor_dedup keeps them apart is measured against the labels of
+    vendors(), not used to pick them.
+    """
+    combos = [
+        f"{name} {trade}" + (f" {place}" if place else "")
+        for name in VENDOR_NAMES for trade in VENDOR_TRADES
+        for place in [None] + VENDOR_PLACES
+    ]
+    if n_vendors > len(combos):
+        raise ValueError(f"at most {len(combos)} synthetic vendors")
+    # Short names first, as a small supplier base mostly goes by those
+    short = rng.permutation(len(VENDOR_NAMES) * len(VENDOR_TRADES)) * (len(VENDOR_PLACES) + 1)
+    pool = [combos[i] for i in short]
+    pool += [combos[i] for i in rng.permutation(len(combos)) if i % (len(VENDOR_PLACES) + 1)]
+    return pool[:n_vendors]
+
+
+def spelling_variants(rng, name):
+    """
+    1-2 dirty spellings of a vendor name: trailing punctuation, title
+    case, a legal suffix or one transposed letter in its longest word.
+    """
+    longest = max(name.split(), key=len)
+    i = len(longest) // 2
+    typo = longest[:i] + longest[i + 1] + longest[i] + longest[i + 2:]
+    variants = [
+        name + ".",
+        name.title(),
+        name + " PVT LTD",
+        name + " & CO",
+        name.replace(longest, typo, 1),
+    ]
+    picks = rng.choice(len(variants), rng.integers(1, 3), replace=False)
+    # Swapping two equal letters gives the name back
+    return [variants[p] for p in picks if variants[p] != name]
+
+
+def vendors(rng, n_vendors):
+    """
+    dim_vendor with the n canonical vendors first, then every spelling
+    variant as its own row (canonical names are left to vendor_dedup).
+    Returns (frame, alias ids per vendor, labels): labels is the ground
+    truth, vendor_id -> true_vendor_id (the id of the supplier's own row).
+    """
+    names = vendor_names(rng, n_vendors)
+    true_ids = list(range(1, n_vendors + 1))
+    alias_ids = [[] for _ in range(n_vendors)]
+    for v in np.flatnonzero(rng.random(n_vendors) < ALIAS_RATE):
+        for variant in spelling_variants(rng, names[v]):
+            names.append(variant)
+            true_ids.append(v + 1)
+            alias_ids[v].append(len(names))
+
+    frame = pd.DataFrame({
+        "vendor_id": np.arange(1, len(names) + 1),
+        "vendor_name": names,
+        "canonical_vendor_name": None,
+    })
+    labels = pd.DataFrame({
+        "vendor_id": frame["vendor_id"],
+        "vendor_name": names,
+        "true_vendor_id": true_ids,
+    })
+    return frame, alias_ids, labels
+
+
+def mess_units():
+    """
+    dim_mess_unit with the canonical units first, then every dirty alias
+    as its own row. Returns (frame, canonical ids, alias ids per unit).
+    """
+    names, canonical_ids, alias_ids = [], [], []
+    for unit in MESS_UNITS:
+        names.append(unit)
+        canonical_ids.append(len(names))
+    for unit, (_, spellings) in MESS_UNITS.items():
+        ids = []
+        for spelling in spellings:
+            names.append(spelling)
+            ids.append(len(names))
+        alias_ids.append(ids)
+
+    frame = pd.DataFrame({
+        "mess_unit_id": np.arange(1, len(names) + 1),
+        "mess_unit_name": names,
+    })
+    return frame, np.array(canonical_ids), alias_ids
+
+
+# -------------------------------------------------
+# 2. FACTS
+# -------------------------------------------------
+def zipf_weights(n, exponent=ZIPF_EXPONENT):
+    w = np.arange(1, n + 1, dtype=float) ** -exponent
+    return w / w.sum()
+
+
+def benford_amounts(rng, n, decades=AMOUNT_DECADES):
+    """Log-uniform over whole decades (Benford), rounded to paise."""
+    amounts = np.round(10 ** rng.uniform(decades[0], decades[1], n), 2)
+    # rounding can push 99999.999 up to the next decade's leading digit
+    return np.minimum(amounts, 10.0 ** decades[1] - 0.01)
+
+
+def fact_expense(rng, dim_date, vendor_alias_ids, canonical_ids, alias_ids, n_rows):
+    """fact_expense rows; nullable columns use pandas' Int64 / NaN."""
+    day_weight = np.where(dim_date["is_weekend"].to_numpy() == 1, WEEKEND_WEIGHT, 1.0)
+    date_id = rng.choice(dim_date["date_id"].to_numpy(), n_rows, p=day_weight / day_weight.sum())
+
+    # Vendor ranks are shuffled so vendor_id order says nothing about spend
+    n_vendors = len(vendor_alias_ids)
+    rank_to_vendor = rng.permutation(n_vendors) + 1
+    vendor_id = rank_to_vendor[rng.choice(n_vendors, n_rows, p=zipf_weights(n_vendors))]
+    aliased = np.flatnonzero(rng.random(n_rows) < ALIAS_SHARE)
+    for v, ids in enumerate(vendor_alias_ids, start=1):
+        if ids:
+            rows = aliased[vendor_id[aliased] == v]
+            vendor_id[rows] = rng.choice(ids, len(rows))
+
+    shares = np.array([share for share, _ in MESS_UNITS.values()])
+    unit = rng.choice(len(MESS_UNITS), n_rows, p=shares / shares.sum())
+    mess_unit_id = canonical_ids[unit]
+    dirty = np.flatnonzero(rng.random(n_rows) < DIRTY_RATE)
+    for u, ids in enumerate(alias_ids):
+        rows = dirty[unit[dirty] == u]
+        mess_unit_id[rows] = rng.choice(ids, len(rows))
+
+    amount = benford_amounts(rng, n_rows)
+    invalid = rng.random(n_rows) < INVALID_RATE
+    amount[invalid] = -np.round(rng.uniform(0, 500, invalid.sum()), 2)
+
+    fact = pd.DataFrame({
+        "expense_id": np.arange(1, n_rows + 1),
+        "date_id": date_id,
+        "vendor_id": pd.array(vendor_id, dtype="Int64"),
+        "mess_unit_id": pd.array(mess_unit_id, dtype="Int64"),
+        "amount": amount,
+    })
+    # Each null hits one of the three columns
+    nulls = np.flatnonzero(rng.random(n_rows) < NULL_RATE)
+    column = rng.integers(0, 3, len(nulls))
+    fact.loc[nulls[column == 0], "vendor_id"] = pd.NA
+    fact.loc[nulls[column == 1], "mess_unit_id"] = pd.NA
+    fact.loc[nulls[column == 2], "amount"] = np.nan
+
+    # Warehouse order: by date, then arrival
+    fact = fact.sort_values(["date_id", "expense_id"], kind="stable", ignore_index=True)
+    fact["expense_id"] = np.arange(1, n_rows + 1)
+    return fact
+
+
+def generate(scale=1, seed=42):
+    """
+    {table: DataFrame} for the four warehouse tables at `scale` times
+    one semester, plus "vendor_labels" (ground-truth supplier per
+    dim_vendor row, see vendors()), which is not loaded into the
+    warehouse. Deterministic in (scale, seed).
+    """
+    rng = np.random.default_rng([seed, int(scale * 1000)])
+    n_semesters = int(min(max(1, np.ceil(scale)), MAX_SEMESTERS))
+    n_vendors = max(10, int(round(BASE_VENDORS * np.sqrt(scale))))
+    n_rows = int(round(BASE_ROWS * scale))
+
+    dim_date = semester_dates(n_semesters)
+    dim_vendor, vendor_alias_ids, vendor_labels = vendors(rng, n_vendors)
+    dim_mess_unit, canonical_ids, alias_ids = mess_units()
+    return {
+        "dim_date": dim_date,
+        "dim_vendor": dim_vendor,
+        "dim_mess_unit": dim_mess_unit,
+        "fact_expense": fact_expense(rng, dim_date, vendor_alias_ids, canonical_ids,
+                                     alias_ids, n_rows),
+        "vendor_labels": vendor_labels,
+    }
+
+
+def write_warehouse(tables, conn, chunksize=500_000):
+    """Replace the warehouse tables with `tables`; returns {table: rows}."""
+    from backend import TABLES, load_tables
+
+    def chunks(df):
+        for start in range(0, len(df), chunksize):
+            yield df.iloc[start:start + chunksize]
+
+    return load_tables(conn, {name: chunks(tables[name]) for name in TABLES})
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    from backend import connect
+
+    parser = argparse.ArgumentParser(description="Generate a synthetic mess_dw")
+    parser.add_argument("--scale", type=float, default=1, help="multiples of one semester")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--backend", choices=["duckdb", "sqlite"], default="duckdb")
+    parser.add_argument("--path", help="embedded database file (default: MESS_EMBEDDED_PATH)")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    tables = generate(args.scale, args.seed)
+    print(f"Generated in {time.perf_counter() - t0:.2f} s")
+
+    conn = connect(args.backend, args.path)
+    t0 = time.perf_counter()
+    for table, n in write_warehouse(tables, conn).items():
+        print(f"{table}: {n} rows")
+    print(f"Loaded in {time.perf_counter() - t0:.2f} s")
+    conn.close()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The analysis modules are flat scripts in Code/, imported by name
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
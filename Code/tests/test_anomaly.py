@@ -0,0 +1,96 @@
+"""Rolling robust z-scores: batch vs streaming, history seeding, unscored days."""
+
+import numpy as np
+import pandas as pd
+
+from anomaly import MIN_PERIODS, RollingDetector, detect, verify_streaming
+from dataset import day_ordinal
+from mess_analysis import analyse, month_report
+
+FIRST_DAY = day_ordinal(["2025-05-01"])[0]
+
+
+def _series(n_days=150, seed=3):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "day": np.arange(FIRST_DAY, FIRST_DAY + n_days, dtype=np.int32),
+        "amount_paise": rng.integers(4_000_000, 6_000_000, n_days).astype(np.int64),
+    })
+
+
+def test_batch_matches_streaming():
+    assert verify_streaming(_series())
+
+
+def test_streaming_resumes_from_saved_state():
+    series = _series()
+    first, second = series.iloc[:80], series.iloc[80:]
+
+    detector = RollingDetector()
+    detector.update_frame(first)
+    resumed = RollingDetector.from_dict(detector.to_dict()).update_frame(second)
+
+    batch = detect(series).iloc[80:].reset_index(drop=True)
+    pd.testing.assert_frame_equal(batch[resumed.columns], resumed,
+                                  check_dtype=False, rtol=1e-9)
+
+
+def test_spike_scored_against_history_only():
+    series = _series()
+    spike_day = len(series) - 1
+    series.loc[spike_day, "amount_paise"] = 50_000_000
+
+    scored = detect(series)
+    assert scored.loc[spike_day, "spike"]
+    # The spike is not part of its own baseline
+    assert scored.loc[spike_day, "rolling_median"] < 6_000_000
+    assert scored["spike"].sum() == 1
+
+
+def test_days_without_history_are_unscored():
+    scored = detect(_series(40))
+    for _, season in scored.groupby("is_weekend"):
+        early = season.iloc[:MIN_PERIODS]
+        assert early["robust_z"].isna().all()
+        assert not early["spike"].any()
+        assert season.iloc[MIN_PERIODS:]["robust_z"].notna().all()
+
+
+def test_flat_history_scores_zero_or_infinite():
+    series = pd.DataFrame({
+        "day": np.arange(FIRST_DAY, FIRST_DAY + 30, dtype=np.int32),
+        "amount_paise": np.full(30, 1_000_000, dtype=np.int64),
+    })
+    series.loc[29, "amount_paise"] = 1_000_100
+    scored = detect(series, season=None)
+    assert scored.loc[28, "robust_z"] == 0
+    assert scored.loc[29, "robust_z"] == np.inf
+    assert scored.loc[29, "spike"]
+
+
+def _daily_totals(series):
+    return series.assign(mess_unit_name="CDH-1", n_transactions=10)
+
+
+def test_month_start_seeded_by_history():
+    # 2025-05-01 .. 2025-09-27: August is fully preceded by three months
+    daily = _daily_totals(_series())
+    start = "2025-08-01"
+
+    seeded = month_report(analyse(daily, start=start), 2025, 8)
+    assert len(seeded["daily"]) == 31
+    assert seeded["unscored_days"].empty
+
+    alone = daily[daily["day"] >= day_ordinal([start])[0]]
+    unseeded = month_report(analyse(alone, start=start), 2025, 8)
+    # Without history the first MIN_PERIODS days of each season are <NA>,
+    # listed as unscored rather than as normal days
+    assert len(unseeded["unscored_days"]) == 2 * MIN_PERIODS
+    assert unseeded["high_wastage_days"].empty
+
+
+def test_history_left_out_of_results():
+    daily = _daily_totals(_series())
+    result = analyse(daily, start="2025-08-01")
+    assert result["daily"]["full_date"].min() == pd.Timestamp("2025-08-01")
+    assert set(result["monthly"]["month"].astype(str)) == {"2025-08", "2025-09"}
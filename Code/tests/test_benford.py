@@ -0,0 +1,94 @@
+"""Benford statistics: digits, MAD bands, z-scores, BH-FDR and grouped tests."""
+
+import numpy as np
+import pytest
+
+import benford
+# Imported by module: pytest would collect tests_from_histogram / test_groups
+from benford import (
+    MAD_BANDS, benjamini_hochberg, digit_histogram, expected_proportions, z_statistics
+)
+
+
+@pytest.mark.parametrize("test", ["first", "second", "first_two", "last_two", "summation"])
+def test_expected_proportions_sum_to_one(test):
+    assert expected_proportions(test).sum() == pytest.approx(1.0)
+
+
+def test_expected_second_digit():
+    # Nigrini's table: 0 -> 0.11968, 9 -> 0.08500
+    p = expected_proportions("second")
+    assert p[0] == pytest.approx(0.11968, abs=1e-5)
+    assert p[9] == pytest.approx(0.08500, abs=1e-5)
+
+
+def test_digit_histogram():
+    hist = digit_histogram([1.0, "23.45", 0.05, 100, "1e3", None, -7, "abc"])
+    counts = hist["counts"]
+    # first digits 1, 2, 5, 1, 1; missing, negative and unparseable skipped
+    assert counts[1:10].tolist() == [3, 1, 0, 0, 1, 0, 0, 0, 0]
+    # last two rupee digits only for amounts of at least 10
+    assert counts[110 + 23] == 1 and counts[110 + 0] == 2
+    assert hist["sums"][23 - 10] == pytest.approx(23.45)
+
+
+@pytest.mark.parametrize("test", list(MAD_BANDS))
+def test_mad_bands(test):
+    close, acceptable, marginal = MAD_BANDS[test]
+    mad = np.array([0.0, close, close * 1.01, acceptable, marginal, marginal * 1.01])
+    labels = benford._conformity_bands(test, mad).tolist()
+    assert labels == ["close conformity", "close conformity", "acceptable conformity",
+                      "acceptable conformity", "marginal conformity", "nonconformity"]
+    # Scalar and vectorized bands agree
+    assert labels == [benford._conformity(test, m) for m in mad]
+
+
+def test_suite_conformity_on_benford_and_uniform_counts():
+    n = 100_000
+    expected = np.rint(expected_proportions("first") * n)
+    counts = np.zeros(benford.N_BINS, dtype=np.int64)
+    counts[1:10] = expected
+    summary = benford.tests_from_histogram({"counts": counts, "sums": np.zeros(90)})["summary"]
+    first = summary.set_index("test").loc["first"]
+    assert first["conformity"] == "close conformity"
+    assert first["p_value"] > 0.99
+
+    counts[1:10] = n // 9
+    summary = benford.tests_from_histogram({"counts": counts, "sums": np.zeros(90)})["summary"]
+    first = summary.set_index("test").loc["first"]
+    assert first["conformity"] == "nonconformity"
+    assert first["p_value"] < 1e-12
+
+
+def test_z_statistic_continuity_correction():
+    p, n = np.log10(2), 1000
+    se = np.sqrt(p * (1 - p) / n)
+    # |diff| above 1/(2N): the correction is subtracted
+    assert z_statistics(p + 0.05, p, n) == pytest.approx((0.05 - 1 / (2 * n)) / se)
+    assert z_statistics(p - 0.05, p, n) == pytest.approx((0.05 - 1 / (2 * n)) / se)
+    # |diff| below 1/(2N): left as it is
+    assert z_statistics(p + 0.0001, p, n) == pytest.approx(0.0001 / se)
+
+
+def test_benjamini_hochberg():
+    q = benjamini_hochberg([0.01, 0.04, 0.03, 0.005, np.nan])
+    np.testing.assert_allclose(q[:4], [0.02, 0.04, 0.04, 0.02])
+    assert np.isnan(q[4])
+
+
+def test_benjamini_hochberg_caps_and_all_missing():
+    assert benjamini_hochberg([0.9, 0.8]).max() <= 1.0
+    assert np.isnan(benjamini_hochberg([np.nan, np.nan])).all()
+
+
+def test_grouped_tests_flag_only_testable_deviations():
+    n = 2000
+    conforming = np.rint(expected_proportions("first") * n)
+    invented = np.full(9, n // 9)
+    tiny = np.array([3, 1, 1, 0, 0, 0, 0, 0, 0])
+
+    table = benford.test_groups(np.vstack([conforming, invented, tiny]))
+    assert table["flagged"].tolist() == [False, True, False]
+    assert table["tested"].tolist() == [True, True, False]
+    assert table.loc[2, "conformity"] == "too few"
+    assert np.isnan(table.loc[2, "q_value"])
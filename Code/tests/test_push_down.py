@@ -0,0 +1,87 @@
+"""Push-down aggregates against the pandas path, on a synthetic warehouse."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import backend
+import synthetic
+from benford import SCREENING_GROUPS, screen_all
+from dataset import to_typed
+from push_down import (
+    load_daily_totals, load_digit_histogram, load_grouped_digit_counts, verify_push_down
+)
+from query_builder import transactions_query
+from streaming import GroupedDigitCounts, iter_clean_chunks
+
+SCALE = 0.25
+KEYS = ["day", "mess_unit_name"]
+
+# pd.read_sql on a DB-API connection, expected throughout the repo
+pytestmark = pytest.mark.filterwarnings("ignore:pandas only supports SQLAlchemy")
+
+
+@pytest.fixture(scope="module", params=["duckdb", "sqlite"])
+def conn(request, tmp_path_factory):
+    if request.param == "duckdb":
+        pytest.importorskip("duckdb")
+    path = tmp_path_factory.mktemp(request.param) / f"mess_dw.{request.param}"
+    conn = backend.connect(request.param, str(path))
+    synthetic.write_warehouse(synthetic.generate(SCALE, seed=7), conn)
+    yield conn
+    conn.close()
+
+
+def _sorted(df):
+    df = df[KEYS + ["amount_paise", "n_transactions"]].copy()
+    df["mess_unit_name"] = df["mess_unit_name"].astype(str)
+    return df.sort_values(KEYS).reset_index(drop=True)
+
+
+def test_daily_totals_match(conn):
+    pushed = load_daily_totals(conn, push_down=True, use_aggregates=False)
+    local = load_daily_totals(conn, push_down=False, use_aggregates=False)
+    assert len(pushed) > 0
+    pd.testing.assert_frame_equal(_sorted(pushed), _sorted(local), check_dtype=False)
+
+
+def test_daily_totals_match_summary_table(conn):
+    pushed = load_daily_totals(conn, push_down=True, use_aggregates=False)
+    summary = load_daily_totals(conn, use_aggregates=True)
+    pd.testing.assert_frame_equal(_sorted(pushed), _sorted(summary), check_dtype=False)
+
+
+def test_digit_histograms_match(conn):
+    pushed = load_digit_histogram(conn, push_down=True)
+    local = load_digit_histogram(conn, push_down=False)
+    assert pushed["counts"].sum() > 0
+    np.testing.assert_array_equal(pushed["counts"], local["counts"])
+    np.testing.assert_allclose(pushed["sums"], local["sums"], rtol=1e-9)
+
+
+def test_grouped_digit_counts_match(conn):
+    pushed = load_grouped_digit_counts(conn, push_down=True)
+    local = load_grouped_digit_counts(conn, push_down=False)
+    assert set(pushed) == set(SCREENING_GROUPS)
+    for grouping in SCREENING_GROUPS:
+        assert len(pushed[grouping]) > 0
+        pd.testing.assert_frame_equal(pushed[grouping], local[grouping].sort_index(),
+                                      check_dtype=False, check_names=False)
+
+
+def test_chunked_screening_matches_screen_all(conn):
+    query, params = transactions_query()
+    chunks = list(iter_clean_chunks(conn, query, params, chunksize=1000))
+    counter = GroupedDigitCounts()
+    for chunk in chunks:
+        counter.update(chunk)
+
+    keys = ["grouping", "group"]
+    chunked = counter.result().sort_values(keys).reset_index(drop=True)
+    full = screen_all(to_typed(pd.concat(chunks, ignore_index=True)))
+    pd.testing.assert_frame_equal(chunked, full.sort_values(keys).reset_index(drop=True),
+                                  check_dtype=False)
+
+
+def test_verify_push_down(conn):
+    assert verify_push_down(conn)
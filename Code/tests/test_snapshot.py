@@ -0,0 +1,64 @@
+"""Incremental snapshot load on a synthetic warehouse."""
+
+import pytest
+
+import backend
+import synthetic
+from data_preprocessing import run_incremental
+from snapshot import is_fresh, read_snapshot
+
+SCALE = 0.25
+
+# pd.read_sql on a DB-API connection, expected throughout the repo
+pytestmark = pytest.mark.filterwarnings("ignore:pandas only supports SQLAlchemy")
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = backend.connect("sqlite", str(tmp_path / "mess_dw.sqlite"))
+    synthetic.write_warehouse(synthetic.generate(SCALE, seed=7), conn)
+    yield conn
+    conn.close()
+
+
+def _insert_fact(conn, expense_id, vendor_id, amount):
+    cur = conn.cursor()
+    cur.execute(
+        "INSERT INTO fact_expense (expense_id, date_id, vendor_id, mess_unit_id, amount) "
+        "SELECT ?, MIN(date_id), ?, MIN(mess_unit_id), ? FROM dim_date, dim_mess_unit",
+        (expense_id, vendor_id, amount)
+    )
+    conn.commit()
+    cur.close()
+
+
+def _max_expense_id(conn):
+    cur = conn.cursor()
+    cur.execute("SELECT MAX(expense_id) FROM fact_expense")
+    (max_id,) = cur.fetchone()
+    cur.close()
+    return int(max_id)
+
+
+def test_incremental_load_is_fresh(conn, tmp_path):
+    path = str(tmp_path / "snapshot")
+    manifest = run_incremental(conn, path)
+    assert is_fresh(conn, path)
+    assert manifest["row_count"] == len(read_snapshot(path))
+
+
+def test_watermark_passes_rows_the_join_drops(conn, tmp_path):
+    path = str(tmp_path / "snapshot")
+    run_incremental(conn, path)
+
+    # Newest row has no vendor: the inner join never returns it
+    high = _max_expense_id(conn)
+    _insert_fact(conn, high + 1, 1, 100.0)
+    _insert_fact(conn, high + 2, None, 100.0)
+
+    manifest = run_incremental(conn, path)
+    assert manifest["max_expense_id"] == high + 2
+    assert is_fresh(conn, path)
+
+    # A second run has nothing left to extract
+    assert run_incremental(conn, path)["row_count"] == manifest["row_count"]
@@ -0,0 +1,348 @@
+"""
+VENDOR ENTITY RESOLUTION (FUZZY DEDUPLICATION)
+IISER TVM Mess DWBI Project – Varsha 2025
+
+---------------------------------------------------
+WHY
+---------------------------------------------------
+data_preprocessing.py only strips and upper-cases vendor_name, so
+"SREE DURGA TRADERS", "SREE DURGA TRADERS." and "SRI DURGA TRADERS" stay
+three separate vendor nodes in network_analysis.py, which splits their
+weighted degree and distorts community detection.
+
+---------------------------------------------------
+METHOD
+---------------------------------------------------
+1. Key      : accents removed, punctuation dropped, legal suffixes
+              (PVT, LTD, CO, ...) removed, spellings of one honorific
+              (SRI / SHRI / SHREE -> SREE) unified, whitespace collapsed
+2. Blocking : each name is indexed under a few cheap keys
+                - sorted token signature (same tokens, any order)
+                - the name with one token masked, once per token
+                  ("DURGA * KOLLAM": all tokens but one agree)
+                - Soundex of single-token names
+              Only names sharing a key are ever compared. Blocks larger
+              than MAX_BLOCK_SIZE are split by a sorted neighbourhood
+              (each name vs its WINDOW neighbours in key order, forwards
+              and reversed), so there is never an O(n²) all-pairs pass
+              and no block is dropped.
+3. Match    : two keys name the same supplier when they have the same
+              tokens in any order, or differ in exactly one token by a
+              typo: one insertion, deletion, substitution or swap of
+              adjacent letters in a word of MIN_TYPO_LENGTH letters or more
+              (TRADERS / TRADRES). A different word (STORES / SPICES,
+              ARYANAD / WAYANAD), an extra word (DURGA TRADERS /
+              DURGA TRADERS KOLLAM), a different number (STORES 1 /
+              STORES 2) or a short word (MANI / MANU) is another supplier.
+4. Clusters : names in canonical order (below) join the first cluster
+              whose representative they match, else start their own.
+              Every member matches the representative itself, so
+              matches never chain across a block.
+5. Canonical: the representative: highest-spend name in the cluster
+              (most frequent when no spend is given), then shortest
+
+The resulting mapping feeds dim_vendor.canonical_vendor_name
+(see data_preprocessing.py) and can be applied to any extract.
+"""
+
+import logging
+import re
+import unicodedata
+from collections import defaultdict
+
+import pandas as pd
+
+from instrumentation import traced
+from normalization import map_distinct
+
+# A differing word is a typo (one edit) only in words at least this long
+# (MANI / MANU are two names)
+MIN_TYPO_LENGTH = 5
+MAX_BLOCK_SIZE = 200
+# Neighbours compared per name inside an oversized block
+WINDOW = 10
+
+log = logging.getLogger(__name__)
+
+LEGAL_SUFFIXES = {
+    "PVT", "PRIVATE", "LTD", "LIMITED", "CO", "COMPANY", "LLP", "INC", "AND", "&"
+}
+# Spellings of one word, unified in the key
+TOKEN_VARIANTS = {"SRI": "SREE", "SHRI": "SREE", "SHREE": "SREE"}
+
+_PUNCT = re.compile(r"[^A-Z0-9 ]+")
+_SPACES = re.compile(r"\s+")
+
+_SOUNDEX = str.maketrans(
+    "ABCDEFGHIJKLMNOPQRSTUVWXYZ",
+    "01230120022455012623010202"
+)
+
+
+# -------------------------------------------------
+# 1. NAME KEYS
+# -------------------------------------------------
+def name_key(name):
+    """
+    Comparison key: ASCII, upper-case, no punctuation or legal suffixes,
+    honorific spellings unified.
+    """
+    name = unicodedata.normalize("NFKD", str(name)).encode("ascii", "ignore").decode()
+    name = _PUNCT.sub(" ", name.upper())
+    tokens = [TOKEN_VARIANTS.get(t, t) for t in _SPACES.split(name)
+              if t and t not in LEGAL_SUFFIXES]
+    return " ".join(tokens)
+
+
+def soundex(token):
+    """
+    Classic 4-character Soundex code of one token. Tokens with digits
+    (branch numbers, door numbers) are kept as they are.
+    """
+    if any(c.isdigit() for c in token):
+        return token
+    token = "".join(c for c in token if c.isalpha())
+    if not token:
+        return ""
+    digits = token.translate(_SOUNDEX)
+    code = token[0]
+    last = digits[0]
+    for d in digits[1:]:
+        if d != last and d != "0":
+            code += d
+        last = d
+    return (code + "000")[:4]
+
+
+def blocking_keys(key):
+    """The blocking keys a name key is indexed under."""
+    tokens = key.split()
+    keys = ["s:" + " ".join(sorted(tokens))]
+    if len(tokens) > 1:
+        keys += ["m:" + " ".join(tokens[:i] + ["*"] + tokens[i + 1:])
+                 for i in range(len(tokens))]
+    elif tokens:
+        keys.append("x:" + soundex(tokens[0]))
+    return keys
+
+
+def one_edit_apart(a, b):
+    """
+    True when a and b differ by exactly one insertion, deletion,
+    substitution or swap of two adjacent letters. O(len), no DP table.
+    """
+    if len(a) < len(b):
+        a, b = b, a
+    if len(a) - len(b) > 1 or a == b:
+        return False
+    i = 0
+    while i < len(b) and a[i] == b[i]:
+        i += 1
+    if len(a) != len(b):
+        return a[i + 1:] == b[i:]
+    return (a[i + 1:] == b[i + 1:]
+            or (i + 1 < len(a) and a[i] == b[i + 1] and a[i + 1] == b[i]
+                and a[i + 2:] == b[i + 2:]))
+
+
+def _is_typo(a, b):
+    # Digits are never a typo: "STORES 10" / "STORES 11" are two branches
+    return (min(len(a), len(b)) >= MIN_TYPO_LENGTH and one_edit_apart(a, b)
+            and not any(c.isdigit() for c in a + b))
+
+
+def same_supplier(a, b):
+    """True when name keys a and b are spellings of one supplier (METHOD 3)."""
+    if a == b:
+        return True
+    ta, tb = a.split(), b.split()
+    if len(ta) != len(tb):
+        return False
+    if sorted(ta) == sorted(tb):
+        return True
+    diff = [(x, y) for x, y in zip(ta, tb) if x != y]
+    return len(diff) == 1 and _is_typo(*diff[0])
+
+
+# -------------------------------------------------
+# 2. CANDIDATE PAIRS FROM THE BLOCKING INDEX
+# -------------------------------------------------
+def _add_pair(pairs, i, j):
+    pairs.add((i, j) if i < j else (j, i))
+
+
+def candidate_pairs(keys, max_block_size=MAX_BLOCK_SIZE, window=WINDOW):
+    """
+    Index positions by blocking key and return the set of (i, j), i < j,
+    that share at least one block. Members of a block larger than
+    max_block_size are only paired with their `window` neighbours in
+    key order and in reversed-key order (sorted neighbourhood).
+    """
+    index = defaultdict(list)
+    for i, key in enumerate(keys):
+        for bk in blocking_keys(key):
+            index[bk].append(i)
+
+    pairs = set()
+    windowed = set()
+    for members in index.values():
+        if len(members) < 2:
+            continue
+        if len(members) <= max_block_size:
+            for a in range(len(members)):
+                for b in range(a + 1, len(members)):
+                    pairs.add((members[a], members[b]))
+            continue
+        windowed.update(members)
+        for order in (lambda i: keys[i], lambda i: keys[i][::-1]):
+            ranked = sorted(members, key=order)
+            for a in range(len(ranked)):
+                for b in range(a + 1, min(a + 1 + window, len(ranked))):
+                    _add_pair(pairs, ranked[a], ranked[b])
+
+    if windowed:
+        log.info("%d names sit in blocks over %d names; compared with their "
+                 "%d nearest neighbours instead of the whole block",
+                 len(windowed), max_block_size, window)
+    return pairs
+
+
+# -------------------------------------------------
+# 3. CLUSTERING
+# -------------------------------------------------
+@traced("resolve_vendors")
+def resolve_vendors(names, weights=None, max_block_size=MAX_BLOCK_SIZE):
+    """
+    Cluster spelling variants of one vendor name.
+
+    names   : iterable of vendor names (duplicates allowed)
+    weights : optional Series/dict name -> total spend, used to pick the
+              canonical name of each cluster
+
+    Returns a DataFrame with one row per distinct name:
+      vendor_name, canonical_vendor_name, cluster_id
+    """
+    counts = pd.Series(list(names), dtype=object).value_counts()
+    if weights is not None:
+        score = pd.Series(weights, dtype=float).reindex(counts.index).fillna(0)
+    else:
+        score = counts.astype(float)
+
+    # Canonical order: highest score, then shortest name, then alphabetical
+    order = pd.DataFrame({
+        "vendor_name": counts.index,
+        "score": score.to_numpy(),
+        "length": [len(n) for n in counts.index]
+    }).sort_values(["score", "length", "vendor_name"], ascending=[False, True, True])
+    distinct = order["vendor_name"].tolist()
+    keys = [name_key(n) for n in distinct]
+
+    neighbours = defaultdict(list)
+    for i, j in candidate_pairs(keys, max_block_size):
+        neighbours[max(i, j)].append(min(i, j))
+
+    # Each name joins the earliest representative it matches directly
+    rep = list(range(len(distinct)))
+    for i in range(len(distinct)):
+        for j in sorted(neighbours[i]):
+            if rep[j] == j and same_supplier(keys[i], keys[j]):
+                rep[i] = j
+                break
+
+    mapping = pd.DataFrame({
+        "vendor_name": distinct,
+        "canonical_vendor_name": [distinct[r] for r in rep]
+    })
+    mapping["cluster_id"] = pd.factorize(mapping["canonical_vendor_name"])[0]
+
+    return (
+        mapping[["vendor_name", "canonical_vendor_name", "cluster_id"]]
+        .sort_values(["cluster_id", "vendor_name"])
+        .reset_index(drop=True)
+    )
+
+
+def pair_scores(mapping, labels):
+    """
+    Pairwise precision and recall of a resolve_vendors mapping against
+    ground truth (labels: vendor_name, true_vendor_id, e.g. the
+    "vendor_labels" of synthetic.generate). Precision is the share of
+    merged name pairs that are one supplier; recall the share of a
+    supplier's name pairs that were merged.
+    """
+    clusters = labels["vendor_name"].map(
+        mapping.set_index("vendor_name")["cluster_id"]
+    )
+    frame = pd.DataFrame({"cluster": clusters, "truth": labels["true_vendor_id"]})
+
+    def pairs(by):
+        sizes = frame.groupby(by).size()
+        return int((sizes * (sizes - 1) // 2).sum())
+
+    both, merged, true = pairs(["cluster", "truth"]), pairs("cluster"), pairs("truth")
+    return {
+        "precision": both / merged if merged else 1.0,
+        "recall": both / true if true else 1.0,
+    }
+
+
+# -------------------------------------------------
+# 4. APPLYING THE MAPPING
+# -------------------------------------------------
+def apply_mapping(df, mapping, column="vendor_name"):
+    """Replace column with its canonical name (per distinct value)."""
+    lookup = dict(zip(mapping["vendor_name"], mapping["canonical_vendor_name"]))
+    df = df.copy()
+    df[column] = map_distinct(df[column], lambda names: names.map(lambda n: lookup.get(n, n)))
+    return df
+
+
+def update_dim_vendor(conn, mapping):
+    """
+    Write the mapping to dim_vendor.canonical_vendor_name
+    (column DDL documented in data_preprocessing.py).
+    """
+    cur = conn.cursor()
+    cur.executemany(
+        "UPDATE dim_vendor SET canonical_vendor_name = %s WHERE vendor_name = %s",
+        list(zip(mapping["canonical_vendor_name"], mapping["vendor_name"]))
+    )
+    conn.commit()
+    cur.close()
+
+
+if __name__ == "__main__":
+    from backend import connect
+
+    from normalization import normalize_names
+
+    conn = connect()
+
+    # Spend per raw dim_vendor name decides each cluster's canonical name
+    spend = pd.read_sql(
+        """
+        SELECT v.vendor_name, COALESCE(SUM(f.amount), 0) AS total_amount
+        FROM dim_vendor v
+        LEFT JOIN fact_expense f ON f.vendor_id = v.vendor_id
+        GROUP BY v.vendor_name
+        """,
+        conn
+    )
+
+    # Cluster on the cleaned (strip + upper) names, keep the raw ones for
+    # the UPDATE so each dim_vendor row gets its canonical name.
+    spend["clean_name"] = normalize_names(spend["vendor_name"]).astype(str)
+    weights = spend.groupby("clean_name")["total_amount"].sum().astype(float)
+    mapping = resolve_vendors(spend["clean_name"], weights=weights)
+
+    raw_mapping = spend.merge(
+        mapping, left_on="clean_name", right_on="vendor_name", suffixes=("", "_clean")
+    )[["vendor_name", "canonical_vendor_name"]]
+    update_dim_vendor(conn, raw_mapping)
+    conn.close()
+
+    merged = mapping.groupby("cluster_id").filter(lambda g: len(g) > 1)
+    print(f"Distinct vendors: {len(mapping)}")
+    print(f"Canonical vendors: {mapping['cluster_id'].nunique()}")
+    print("\nMerged spelling variants:")
+    print(merged)
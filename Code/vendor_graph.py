@@ -0,0 +1,76 @@
+"""
+BULK VENDOR–MESS GRAPH CONSTRUCTION
+IISER TVM Mess DWBI Project – Varsha 2025
+
+---------------------------------------------------
+WHY
+---------------------------------------------------
+network_analysis.py used to loop over df.iterrows() and call
+G.add_node twice and G.add_edge once per row, re-adding the same few
+mess nodes thousands of times.
+
+Two bulk backends are built straight from the aggregated edge list
+(vendor_name, mess_unit_name, total_amount):
+
+1. NetworkX   : nx.from_pandas_edgelist + one set_node_attributes call
+                per node type (needed for community detection / drawing)
+2. Sparse CSR : vendor × mess weight matrix (scipy.sparse), built from
+                factorized codes; weighted degree and other per-node
+                metrics become row / column sums with no Python loops
+                (centrality.py)
+"""
+
+import networkx as nx
+import pandas as pd
+from scipy import sparse
+
+from instrumentation import traced
+
+VENDOR_COL = "vendor_name"
+MESS_COL = "mess_unit_name"
+WEIGHT_COL = "total_amount"
+
+
+# -------------------------------------------------
+# 1. NETWORKX BACKEND
+# -------------------------------------------------
+@traced("build_graph")
+def build_graph(edges, vendor_col=VENDOR_COL, mess_col=MESS_COL, weight_col=WEIGHT_COL):
+    """Weighted undirected vendor–mess graph with node_type attributes."""
+    edge_list = pd.DataFrame({
+        "source": edges[vendor_col].astype(str).to_numpy(),
+        "target": edges[mess_col].astype(str).to_numpy(),
+        "weight": edges[weight_col].astype(float).to_numpy()
+    })
+
+    G = nx.from_pandas_edgelist(edge_list, edge_attr="weight")
+
+    # Mess labels are set last, as before: a name appearing on both sides
+    # is treated as a mess unit.
+    nx.set_node_attributes(G, dict.fromkeys(edge_list["source"].unique(), "vendor"), "node_type")
+    nx.set_node_attributes(G, dict.fromkeys(edge_list["target"].unique(), "mess"), "node_type")
+    return G
+
+
+# -------------------------------------------------
+# 2. SPARSE MATRIX BACKEND
+# -------------------------------------------------
+@traced("bipartite_matrix")
+def bipartite_matrix(edges, vendor_col=VENDOR_COL, mess_col=MESS_COL, weight_col=WEIGHT_COL):
+    """
+    Vendor × mess CSR weight matrix.
+
+    Returns (W, vendors, messes) where W[i, j] is the total spend of
+    vendors[i] at messes[j]; duplicate pairs are summed.
+    """
+    v_codes, vendors = pd.factorize(edges[vendor_col].astype(str))
+    m_codes, messes = pd.factorize(edges[mess_col].astype(str))
+
+    W = sparse.coo_matrix(
+        (edges[weight_col].astype(float).to_numpy(), (v_codes, m_codes)),
+        shape=(len(vendors), len(messes))
+    ).tocsr()
+    W.sum_duplicates()
+
+    return W, pd.Index(vendors, name="vendor"), pd.Index(messes, name="mess")
+